@@ -15,6 +15,8 @@ load_dotenv()
 
 # Import routes
 from backend.api.routes import data_routes, blockchain_routes
+from backend.blockchain.blockchain_service import get_blockchain_service, shutdown_blockchain_service
+from backend.blockchain.executor import shutdown_executor
 
 # Create FastAPI app
 app = FastAPI(
@@ -40,6 +42,28 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.include_router(data_routes.router)
 app.include_router(blockchain_routes.router)
 
+
+@app.on_event("startup")
+async def startup():
+    """Create the shared blockchain service once for the lifetime of the app"""
+    try:
+        blockchain_service = get_blockchain_service()
+
+        # Follow contract events into the local index
+        if blockchain_service.indexer is not None:
+            blockchain_service.indexer.start()
+    except Exception as e:
+        # Routes retry lazily, so the API can start before the node is up
+        print(f"Warning: Blockchain service not available at startup: {str(e)}")
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Release the pooled blockchain connections and worker threads"""
+    shutdown_blockchain_service()
+    shutdown_executor()
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -6,8 +6,11 @@ import json
 import time
 
 # Import blockchain module
-from backend.blockchain.blockchain_service import BlockchainService
-from backend.encryption.encryption_utils import generate_hash
+from backend.blockchain.blockchain_service import (get_blockchain_service, refresh_blockchain_service,
+                                                  BatchSubmitError)
+from backend.blockchain.anchoring import proof_path_for, verify_anchored_file
+from backend.blockchain.executor import run_blocking
+from backend.encryption.encryption_utils import generate_hash, resolve_cipher_hash, HashAlgorithmUnknown
 
 
 # Models
@@ -16,11 +19,42 @@ class StoreRequest(BaseModel):
     original_file: Optional[str] = None
     metadata_file: Optional[str] = None
     data_id: Optional[str] = None
+    wait: Optional[bool] = True
+    anchor: Optional[bool] = False
+    tenant: Optional[str] = None
+    tier: Optional[str] = None
 
 
 class AccessRequest(BaseModel):
     data_id: str
     address: str
+    wait: Optional[bool] = True
+    tier: Optional[str] = None
+
+
+class BatchStoreRequest(BaseModel):
+    items: List[StoreRequest]
+    wait: Optional[bool] = True
+    tier: Optional[str] = None
+
+
+class BatchAccessRequest(BaseModel):
+    entries: List[AccessRequest]
+    wait: Optional[bool] = True
+    tier: Optional[str] = None
+
+
+class BatchRetrieveRequest(BaseModel):
+    data_ids: List[str]
+
+
+class JobStatusRequest(BaseModel):
+    job_ids: List[str]
+
+
+class AnchorVerifyRequest(BaseModel):
+    encrypted_file: str
+    proof_file: Optional[str] = None
 
 
 # Create router
@@ -34,6 +68,87 @@ def get_upload_folder():
     return upload_folder
 
 
+# Hash the contents of an encrypted file with the algorithm recorded in its metadata, reusing the
+# cached hash when still valid. Returns (cipher_hash, hash_algorithm); 409 when the algorithm is unknown.
+def hash_file(path, metadata_file=None):
+    try:
+        return resolve_cipher_hash(path, metadata_file)
+    except HashAlgorithmUnknown as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+# Compute the data ID and hashes stored on chain for an encrypted file
+def prepare_store_record(request, upload_folder, blockchain_service):
+    encrypted_file = os.path.join(upload_folder, request.encrypted_file)
+
+    # Generate data ID
+    data_id = request.data_id
+    if not data_id:
+        # Generate a unique ID
+        timestamp = int(time.time())
+        filename = os.path.basename(encrypted_file)
+        data_id = blockchain_service.generate_data_id(filename, timestamp)
+
+    # Generate hashes for blockchain storage
+    metadata_file = os.path.join(upload_folder, request.metadata_file) if request.metadata_file else None
+    cipher_hash, _ = hash_file(encrypted_file, metadata_file)
+
+    # Get or generate metadata hash
+    if metadata_file and os.path.exists(metadata_file):
+        with open(metadata_file, 'r') as f:
+            metadata_hash = generate_hash(json.load(f))
+    else:
+        metadata_hash = generate_hash({
+            'original_file': request.original_file or 'unknown',
+            'encrypted_file': request.encrypted_file,
+            'timestamp': time.time()
+        })
+
+    return data_id, cipher_hash, metadata_hash
+
+
+# Format the per-transaction results of a batch operation
+def batch_results(blockchain_service, results, kind, wait):
+    transactions = []
+    for chunk, result in results:
+        data_ids = [entry[0] for entry in chunk]
+
+        if wait:
+            transactions.append({
+                'data_ids': data_ids,
+                'transaction_hash': result.transactionHash.hex(),
+                'block_number': result.blockNumber,
+                'gas_used': result.gasUsed,
+                'status': 'confirmed' if result.status == 1 else 'failed'
+            })
+        else:
+            transactions.append({
+                'data_ids': data_ids,
+                'transaction_hash': result.hex(),
+                'job_id': blockchain_service.receipt_tracker.track(result, kind, {'data_ids': data_ids}),
+                'status': 'pending'
+            })
+
+    return transactions
+
+
+@router.get("/health")
+async def blockchain_health():
+    """Check the blockchain connection, reconnecting if the node went away"""
+    try:
+        blockchain_service = await run_blocking(get_blockchain_service)
+        status = await run_blocking(blockchain_service.health)
+        if not status['connected']:
+            # The node may have restarted; rebuild the connection and contract
+            blockchain_service = await run_blocking(refresh_blockchain_service)
+            status = await run_blocking(blockchain_service.health)
+
+        return status
+
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Blockchain unavailable: {str(e)}")
+
+
 @router.post("/store")
 async def store_on_blockchain(request: StoreRequest):
     """Store encrypted data reference on the blockchain"""
@@ -45,34 +160,46 @@ async def store_on_blockchain(request: StoreRequest):
         raise HTTPException(status_code=404, detail=f"File {request.encrypted_file} not found")
 
     try:
-        # Generate data ID
-        data_id = request.data_id
-        if not data_id:
-            # Generate a unique ID
-            timestamp = int(time.time())
-            filename = os.path.basename(encrypted_file)
-            blockchain_service = BlockchainService()
-            data_id = blockchain_service.generate_data_id(filename, timestamp)
-
-        # Generate hashes for blockchain storage
-        with open(encrypted_file, 'rb') as f:
-            cipher_hash = generate_hash(f.read())
-
-        # Get or generate metadata hash
-        if request.metadata_file and os.path.exists(os.path.join(upload_folder, request.metadata_file)):
-            metadata_file = os.path.join(upload_folder, request.metadata_file)
-            with open(metadata_file, 'r') as f:
-                metadata_hash = generate_hash(json.load(f))
-        else:
-            metadata_hash = generate_hash({
-                'original_file': request.original_file or 'unknown',
-                'encrypted_file': request.encrypted_file,
-                'timestamp': time.time()
-            })
+        blockchain_service = await run_blocking(get_blockchain_service)
+
+        # Anchoring mode: queue the cipher hash for the next Merkle root
+        if request.anchor:
+            metadata_file = os.path.join(upload_folder, request.metadata_file) if request.metadata_file else None
+            cipher_hash, hash_algorithm = await run_blocking(hash_file, encrypted_file, metadata_file)
+
+            # Adding the last hash of a full window sends the anchor transaction
+            proof_file = proof_path_for(encrypted_file)
+            queued = await run_blocking(blockchain_service.merkle_anchor.add, cipher_hash, proof_file,
+                                        hash_algorithm)
+
+            return {
+                'message': 'Data hash queued for Merkle anchoring',
+                'cipher_hash': cipher_hash,
+                'hash_algorithm': hash_algorithm,
+                'proof_file': os.path.basename(proof_file),
+                'queued': queued
+            }
+
+        data_id, cipher_hash, metadata_hash = await run_blocking(
+            prepare_store_record, request, upload_folder, blockchain_service)
+
+        # Submit without waiting; the receipt tracker records the outcome
+        if not request.wait:
+            tx_hash = await run_blocking(blockchain_service.store_encrypted_data, data_id, cipher_hash,
+                                         metadata_hash, wait=False, tenant=request.tenant, tier=request.tier)
+            job_id = blockchain_service.receipt_tracker.track(tx_hash, 'store', {'data_id': data_id})
+
+            return {
+                'message': 'Data reference submitted to blockchain',
+                'data_id': data_id,
+                'transaction_hash': tx_hash.hex(),
+                'job_id': job_id,
+                'status': 'pending'
+            }
 
         # Store on blockchain
-        blockchain_service = BlockchainService()
-        receipt = blockchain_service.store_encrypted_data(data_id, cipher_hash, metadata_hash)
+        receipt = await run_blocking(blockchain_service.store_encrypted_data, data_id, cipher_hash,
+                                     metadata_hash, tenant=request.tenant, tier=request.tier)
 
         return {
             'message': 'Data reference stored on blockchain',
@@ -82,19 +209,59 @@ async def store_on_blockchain(request: StoreRequest):
             'gas_used': receipt.gasUsed
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error storing on blockchain: {str(e)}")
 
 
+@router.post("/retrieve/batch")
+async def retrieve_batch_from_blockchain(request: BatchRetrieveRequest):
+    """Retrieve many data references at once, with a result or error per data ID"""
+    try:
+        # Get the shared blockchain service
+        blockchain_service = await run_blocking(get_blockchain_service)
+
+        # Retrieve data references with batched eth_calls
+        records = await run_blocking(blockchain_service.retrieve_encrypted_data_batch, request.data_ids)
+
+        results = []
+        for data_id in request.data_ids:
+            record = records[data_id]
+            if 'error' in record:
+                results.append({'data_id': data_id, 'error': record['error']})
+            else:
+                results.append({
+                    'data_id': data_id,
+                    'cipher_hash': record['cipher_hash'],
+                    'metadata_hash': record['metadata_hash'],
+                    'timestamp': record['timestamp'],
+                    'timestamp_readable': time.ctime(record['timestamp']),
+                    'owner': record['owner']
+                })
+
+        errors = sum(1 for result in results if 'error' in result)
+
+        return {
+            'results': results,
+            'found': len(results) - errors,
+            'errors': errors
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving batch from blockchain: {str(e)}")
+
+
 @router.get("/retrieve/{data_id}")
 async def retrieve_from_blockchain(data_id: str):
     """Retrieve data reference from the blockchain"""
     try:
-        # Initialize blockchain service
-        blockchain_service = BlockchainService()
+        # Get the shared blockchain service
+        blockchain_service = await run_blocking(get_blockchain_service)
 
         # Retrieve data reference
-        cipher_hash, metadata_hash, timestamp, owner = blockchain_service.retrieve_encrypted_data(data_id)
+        cipher_hash, metadata_hash, timestamp, owner = await run_blocking(
+            blockchain_service.retrieve_encrypted_data, data_id)
 
         return {
             'data_id': data_id,
@@ -113,11 +280,27 @@ async def retrieve_from_blockchain(data_id: str):
 async def grant_access(request: AccessRequest):
     """Grant access to data for a specific address"""
     try:
-        # Initialize blockchain service
-        blockchain_service = BlockchainService()
+        # Get the shared blockchain service
+        blockchain_service = await run_blocking(get_blockchain_service)
+
+        # Submit without waiting; the receipt tracker records the outcome
+        if not request.wait:
+            tx_hash = await run_blocking(blockchain_service.grant_access, request.data_id, request.address,
+                                         wait=False, tier=request.tier)
+            job_id = blockchain_service.receipt_tracker.track(tx_hash, 'grant', {
+                'data_id': request.data_id,
+                'address': request.address
+            })
+
+            return {
+                'message': f'Access grant submitted for {request.address} to data ID {request.data_id}',
+                'transaction_hash': tx_hash.hex(),
+                'job_id': job_id,
+                'status': 'pending'
+            }
 
         # Grant access
-        receipt = blockchain_service.grant_access(request.data_id, request.address)
+        receipt = await run_blocking(blockchain_service.grant_access, request.data_id, request.address, tier=request.tier)
 
         return {
             'message': f'Access granted for {request.address} to data ID {request.data_id}',
@@ -133,11 +316,27 @@ async def grant_access(request: AccessRequest):
 async def revoke_access(request: AccessRequest):
     """Revoke access to data for a specific address"""
     try:
-        # Initialize blockchain service
-        blockchain_service = BlockchainService()
+        # Get the shared blockchain service
+        blockchain_service = await run_blocking(get_blockchain_service)
+
+        # Submit without waiting; the receipt tracker records the outcome
+        if not request.wait:
+            tx_hash = await run_blocking(blockchain_service.revoke_access, request.data_id, request.address,
+                                         wait=False, tier=request.tier)
+            job_id = blockchain_service.receipt_tracker.track(tx_hash, 'revoke', {
+                'data_id': request.data_id,
+                'address': request.address
+            })
+
+            return {
+                'message': f'Access revoke submitted for {request.address} to data ID {request.data_id}',
+                'transaction_hash': tx_hash.hex(),
+                'job_id': job_id,
+                'status': 'pending'
+            }
 
         # Revoke access
-        receipt = blockchain_service.revoke_access(request.data_id, request.address)
+        receipt = await run_blocking(blockchain_service.revoke_access, request.data_id, request.address, tier=request.tier)
 
         return {
             'message': f'Access revoked for {request.address} to data ID {request.data_id}',
@@ -149,23 +348,164 @@ async def revoke_access(request: AccessRequest):
         raise HTTPException(status_code=500, detail=f"Error revoking access: {str(e)}")
 
 
+@router.post("/store/batch")
+async def store_batch_on_blockchain(request: BatchStoreRequest):
+    """Store many encrypted data references using gas-bounded batch transactions"""
+    upload_folder = get_upload_folder()
+
+    # Check that all files exist before sending anything
+    for item in request.items:
+        if not os.path.exists(os.path.join(upload_folder, item.encrypted_file)):
+            raise HTTPException(status_code=404, detail=f"File {item.encrypted_file} not found")
+
+    try:
+        blockchain_service = await run_blocking(get_blockchain_service)
+        records = await run_blocking(
+            lambda: [prepare_store_record(item, upload_folder, blockchain_service) + (item.tenant,)
+                     for item in request.items])
+
+        results = await run_blocking(blockchain_service.store_encrypted_data_batch, records,
+                                     wait=request.wait, tier=request.tier)
+
+        return {
+            'message': f'{len(records)} data references submitted in {len(results)} transaction(s)',
+            'data_ids': [record[0] for record in records],
+            'transactions': batch_results(blockchain_service, results, 'store_batch', request.wait)
+        }
+
+    except HTTPException:
+        raise
+    except BatchSubmitError as e:
+        # Report the transactions already broadcast so their hashes aren't lost
+        raise HTTPException(status_code=500, detail={
+            'message': f"Error storing batch on blockchain: {str(e)}",
+            'transactions': batch_results(blockchain_service, e.submitted, 'store_batch', False),
+            'failed_data_ids': [entry[0] for entry in e.failed]
+        })
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error storing batch on blockchain: {str(e)}")
+
+
+@router.post("/access/grant/batch")
+async def grant_access_batch(request: BatchAccessRequest):
+    """Grant access for many (data ID, address) pairs using batch transactions"""
+    try:
+        blockchain_service = await run_blocking(get_blockchain_service)
+        grants = [(entry.data_id, entry.address) for entry in request.entries]
+
+        results = await run_blocking(blockchain_service.grant_access_batch, grants,
+                                     wait=request.wait, tier=request.tier)
+
+        return {
+            'message': f'{len(grants)} access grants submitted in {len(results)} transaction(s)',
+            'transactions': batch_results(blockchain_service, results, 'grant_batch', request.wait)
+        }
+
+    except BatchSubmitError as e:
+        # Report the transactions already broadcast so their hashes aren't lost
+        raise HTTPException(status_code=500, detail={
+            'message': f"Error granting access in batch: {str(e)}",
+            'transactions': batch_results(blockchain_service, e.submitted, 'grant_batch', False),
+            'failed_data_ids': [entry[0] for entry in e.failed]
+        })
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error granting access in batch: {str(e)}")
+
+
+@router.post("/access/revoke/batch")
+async def revoke_access_batch(request: BatchAccessRequest):
+    """Revoke access for many (data ID, address) pairs using batch transactions"""
+    try:
+        blockchain_service = await run_blocking(get_blockchain_service)
+        revokes = [(entry.data_id, entry.address) for entry in request.entries]
+
+        results = await run_blocking(blockchain_service.revoke_access_batch, revokes,
+                                     wait=request.wait, tier=request.tier)
+
+        return {
+            'message': f'{len(revokes)} access revocations submitted in {len(results)} transaction(s)',
+            'transactions': batch_results(blockchain_service, results, 'revoke_batch', request.wait)
+        }
+
+    except BatchSubmitError as e:
+        # Report the transactions already broadcast so their hashes aren't lost
+        raise HTTPException(status_code=500, detail={
+            'message': f"Error revoking access in batch: {str(e)}",
+            'transactions': batch_results(blockchain_service, e.submitted, 'revoke_batch', False),
+            'failed_data_ids': [entry[0] for entry in e.failed]
+        })
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error revoking access in batch: {str(e)}")
+
+
+@router.post("/anchor/flush")
+async def flush_anchor():
+    """Anchor all queued data hashes now instead of waiting for the window to close"""
+    try:
+        blockchain_service = await run_blocking(get_blockchain_service)
+        anchor = await run_blocking(blockchain_service.merkle_anchor.flush)
+        if anchor is None:
+            return {'message': 'No data hashes queued for anchoring'}
+
+        return anchor
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error anchoring Merkle root: {str(e)}")
+
+
+@router.post("/anchor/verify")
+async def verify_anchor(request: AnchorVerifyRequest):
+    """Verify an encrypted file against its anchored Merkle root"""
+    upload_folder = get_upload_folder()
+    encrypted_file = os.path.join(upload_folder, request.encrypted_file)
+    proof_file = os.path.join(upload_folder, request.proof_file) if request.proof_file else proof_path_for(encrypted_file)
+
+    if not os.path.exists(encrypted_file) or not os.path.exists(proof_file):
+        raise HTTPException(status_code=404, detail=f"File or proof for {request.encrypted_file} not found")
+
+    try:
+        blockchain_service = await run_blocking(get_blockchain_service)
+        return await run_blocking(verify_anchored_file, encrypted_file, proof_file,
+                                  blockchain_service=blockchain_service)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error verifying anchored file: {str(e)}")
+
+
 @router.get("/access/check")
-async def check_access(data_id: str, address: str):
+async def check_access(data_id: str, address: str,
+                       use_index: bool = Query(True, description="Answer from the local event index when possible")):
     """Check if an address has access to data"""
     if not data_id or not address:
         raise HTTPException(status_code=400, detail="Missing data_id or address parameters")
 
     try:
-        # Initialize blockchain service
-        blockchain_service = BlockchainService()
+        # Get the shared blockchain service
+        blockchain_service = await run_blocking(get_blockchain_service)
+        indexer = blockchain_service.indexer
+
+        # Answer from the local index if the data ID has been indexed
+        if use_index and indexer is not None and indexer.is_ready():
+            has_access = indexer.check_access(data_id, address)
+            if has_access is not None:
+                return {
+                    'data_id': data_id,
+                    'address': address,
+                    'has_access': has_access,
+                    'freshness': indexer.freshness()
+                }
 
         # Check access
-        has_access = blockchain_service.check_access(data_id, address)
+        has_access = await run_blocking(blockchain_service.check_access, data_id, address)
 
         return {
             'data_id': data_id,
             'address': address,
-            'has_access': has_access
+            'has_access': has_access,
+            'freshness': {'source': 'chain'}
         }
 
     except Exception as e:
@@ -173,23 +513,109 @@ async def check_access(data_id: str, address: str):
 
 
 @router.get("/data")
-async def get_data_ids(owned: bool = Query(False, description="Whether to return only data IDs owned by the caller")):
-    """Get data IDs (all or owned by the caller)"""
+async def get_data_ids(owned: bool = Query(False, description="Whether to return only data IDs owned by the caller"),
+                       offset: int = Query(0, ge=0, description="Index of the first data ID to return"),
+                       limit: Optional[int] = Query(None, ge=1, description="Maximum number of data IDs to return"),
+                       use_index: bool = Query(True, description="Answer from the local event index when possible"),
+                       tenant: Optional[str] = Query(None, description="Only return data IDs attributed to this tenant")):
+    """Get a page of data IDs (all, owned by the caller or attributed to a tenant)"""
     try:
-        # Initialize blockchain service
-        blockchain_service = BlockchainService()
+        # Get the shared blockchain service
+        blockchain_service = await run_blocking(get_blockchain_service)
+        indexer = blockchain_service.indexer
 
+        owner = None
         if owned:
-            # Get data IDs owned by the caller
-            data_ids = blockchain_service.get_my_data_ids()
+            if not blockchain_service.account:
+                raise ValueError("Private key not set, caller address unknown")
+            owner = blockchain_service.account.address
+
+        if tenant:
+            # Data is owned on chain by pool accounts; the tenant registry attributes it
+            data_ids = blockchain_service.tenants.get_data_ids(tenant, offset=offset, limit=limit)
+            count = blockchain_service.tenants.count_data_ids(tenant)
+            freshness = {'source': 'tenant_registry'}
+        elif use_index and indexer is not None and indexer.is_ready():
+            # Answer from the local index
+            data_ids = indexer.get_data_ids(owner=owner, offset=offset, limit=limit)
+            count = indexer.count_data_ids(owner=owner)
+            freshness = indexer.freshness()
         else:
-            # Get all data IDs
-            data_ids = blockchain_service.get_all_data_ids()
+            # Use the contract's paginated view functions and length getters
+            data_ids = await run_blocking(blockchain_service.get_data_ids_page, offset=offset, limit=limit, owner=owner)
+            count = await run_blocking(blockchain_service.get_data_id_count, owner=owner)
+            freshness = {'source': 'chain'}
 
         return {
             'data_ids': data_ids,
-            'count': len(data_ids)
+            'count': count,
+            'offset': offset,
+            'limit': limit,
+            'freshness': freshness
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting data IDs: {str(e)}")
+
+
+@router.get("/signers")
+async def get_signer_metrics():
+    """Backlog, balance and throughput of every signing account in the pool"""
+    try:
+        blockchain_service = await run_blocking(get_blockchain_service)
+
+        return await run_blocking(blockchain_service.signer_pool.metrics)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting signer metrics: {str(e)}")
+
+
+@router.get("/fees")
+async def get_fee_suggestions():
+    """Current fee suggestions for the fast, standard and economy tiers"""
+    try:
+        blockchain_service = await run_blocking(get_blockchain_service)
+
+        return await run_blocking(blockchain_service.fee_oracle.stats)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting fee suggestions: {str(e)}")
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Hit/miss counters of the retrieveData/checkAccess read cache"""
+    try:
+        blockchain_service = await run_blocking(get_blockchain_service)
+
+        return blockchain_service.read_cache.stats()
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting cache stats: {str(e)}")
+
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Get the status of a transaction submitted without waiting"""
+    blockchain_service = await run_blocking(get_blockchain_service)
+    job = blockchain_service.receipt_tracker.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    return job
+
+
+@router.post("/jobs/status")
+async def get_jobs_status(request: JobStatusRequest):
+    """Get the status of several submitted transactions at once"""
+    try:
+        blockchain_service = await run_blocking(get_blockchain_service)
+        jobs = blockchain_service.receipt_tracker.get_many(request.job_ids)
+
+        return {
+            'jobs': jobs,
+            'pending': sum(1 for job in jobs.values() if job and job['status'] == 'pending')
         }
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error getting data IDs: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error getting job status: {str(e)}")
@@ -4,25 +4,64 @@ from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import os
 import json
+import time
 import shutil
 import uuid
-import pandas as pd
+import secrets
+import threading
 from pathlib import Path
 from werkzeug.utils import secure_filename
-
-# Import data processing and encryption modules
-from backend.data_processing.extract_data import clean_data, convert_to_json
-from backend.encryption.aes_encryption import encrypt_json_file
-from backend.encryption.encryption_utils import generate_hash, create_metadata, save_metadata
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+# Import blockchain and data processing and encryption modules
+from backend.blockchain.blockchain_service import get_blockchain_service
+from backend.blockchain.executor import run_blocking
+from backend.data_processing.extract_data import stream_to_json
+from backend.encryption.aes_encryption import encrypt_and_hash, ENCRYPTION_METHOD, DEFAULT_WORKERS
+from backend.encryption.record_encryption import RecordReader
+from backend.encryption.compression import available_codecs, check_codec
+from backend.encryption.record_integrity import RecordTree, record_tree_path
+from backend.encryption.spatial_encryption import query_bbox
+from backend.encryption.rsa_encryption import save_key_file, load_key_file
+from backend.encryption.encryption_utils import (create_metadata, save_metadata, HASH_ALGORITHMS,
+                                                 DEFAULT_HASH_ALGORITHM, resolve_cipher_hash, HashAlgorithmUnknown)
 
 # Create router
 router = APIRouter(prefix="/api/data", tags=["Data"])
 
+# Seconds a data access challenge stays valid; each challenge can be used once
+ACCESS_CHALLENGE_TTL = float(os.getenv('ACCESS_CHALLENGE_TTL', '300'))
+
+# Outstanding challenges: nonce -> (data ID, expiry)
+_challenges = {}
+_challenges_lock = threading.Lock()
+
 
 # Models
 class EncryptRequest(BaseModel):
     file: str
     use_rsa: Optional[bool] = False
+    stream: Optional[bool] = False
+    records: Optional[bool] = False
+    tiles: Optional[bool] = False
+    hash_algorithm: Optional[str] = DEFAULT_HASH_ALGORITHM
+    compression: Optional[str] = None
+    compression_level: Optional[int] = None
+    record_tree: Optional[bool] = None
+
+
+class RecordsRequest(BaseModel):
+    file: str
+    ids: List[Any]
+    data_id: str
+    nonce: str
+    signature: str
+
+
+class ProofRequest(BaseModel):
+    file: str
+    ids: List[Any]
 
 
 class FileInfo(BaseModel):
@@ -50,6 +89,87 @@ def get_upload_folder():
     return upload_folder
 
 
+# Resolve a file name inside the upload folder, rejecting names that could leave it
+def dataset_path(upload_folder, name):
+    if not name or secure_filename(name) != name:
+        raise HTTPException(status_code=400, detail=f"Invalid file name {name}")
+
+    path = os.path.realpath(os.path.join(upload_folder, name))
+    if os.path.dirname(path) != os.path.realpath(upload_folder):
+        raise HTTPException(status_code=400, detail=f"Invalid file name {name}")
+
+    return path
+
+
+# Message a wallet signs to prove it holds the address asking for a dataset
+def challenge_message(data_id, nonce):
+    return f"Secure Geospatial Blockchain data access\nData ID: {data_id}\nNonce: {nonce}"
+
+
+# Issue a single-use nonce for reading a data ID
+def issue_challenge(data_id):
+    nonce = secrets.token_hex(16)
+    now = time.time()
+
+    with _challenges_lock:
+        # Forget expired challenges so unused ones don't pile up
+        for stale in [key for key, (_, expires) in _challenges.items() if expires < now]:
+            del _challenges[stale]
+        _challenges[nonce] = (data_id, now + ACCESS_CHALLENGE_TTL)
+
+    return nonce
+
+
+# Recover the address that signed a challenge, consuming the challenge
+def recover_signer(data_id, nonce, signature):
+    with _challenges_lock:
+        challenge = _challenges.pop(nonce, None)
+
+    if challenge is None or challenge[0] != data_id or challenge[1] < time.time():
+        raise HTTPException(status_code=403, detail="Unknown, expired or already used challenge")
+
+    try:
+        return Account.recover_message(encode_defunct(text=challenge_message(data_id, nonce)), signature=signature)
+    except Exception:
+        raise HTTPException(status_code=403, detail="Invalid challenge signature")
+
+
+# Check on chain that the signer of a challenge may read a dataset before anything is decrypted
+async def authorize_dataset(data_id, nonce, signature, file_path):
+    # The address is recovered from the signature, never taken from the request
+    address = recover_signer(data_id, nonce, signature)
+    blockchain_service = await run_blocking(get_blockchain_service)
+
+    try:
+        has_access = await run_blocking(blockchain_service.check_access, data_id, address)
+        if not has_access:
+            raise HTTPException(status_code=403, detail=f"{address} has no access to data ID {data_id}")
+
+        cipher_hash = (await run_blocking(blockchain_service.retrieve_encrypted_data, data_id))[0]
+    except HTTPException:
+        raise
+    except Exception as e:
+        if "Data not found" in str(e):
+            raise HTTPException(status_code=404, detail=f"Data ID {data_id} not found on the blockchain")
+        raise HTTPException(status_code=500, detail=f"Error checking access: {str(e)}")
+
+    # The data ID must reference this very file, or access to one dataset would open any other
+    try:
+        file_hash, _ = await run_blocking(resolve_cipher_hash, file_path)
+    except HashAlgorithmUnknown as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if cipher_hash.lower().replace('0x', '') != file_hash.lower():
+        raise HTTPException(status_code=403, detail=f"Data ID {data_id} does not reference this file")
+
+    return address
+
+
+# Decrypt selected records of a record-level file (run off the event loop)
+def _read_records(file_path, aes_key, ids):
+    with RecordReader(file_path, aes_key) as reader:
+        return reader.get(ids)
+
+
 # Routes
 @router.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
@@ -75,40 +195,19 @@ async def upload_file(file: UploadFile = File(...)):
     try:
         file_extension = filename.rsplit('.', 1)[1].lower()
 
-        if file_extension == 'xlsx':
-            # Process Excel file
-            df = pd.read_excel(file_path)
-            df_cleaned = clean_data(df)
-
-            # Convert to JSON
-            json_path = os.path.join(upload_folder,
-                                     f"{filename.rsplit('.', 1)[0]}.json")
-            convert_to_json(df_cleaned, json_path)
-
-            return {
-                'message': 'File processed successfully',
-                'original_file': filename,
-                'processed_file': f"{filename.rsplit('.', 1)[0]}.json",
-                'rows': len(df_cleaned),
-                'columns': df_cleaned.columns.tolist()
-            }
-
-        elif file_extension == 'csv':
-            # Process CSV file
-            df = pd.read_csv(file_path)
-            df_cleaned = clean_data(df)
-
-            # Convert to JSON
+        if file_extension in ('xlsx', 'csv'):
+            # Clean and convert in bounded chunks, so memory stays flat for large uploads; the
+            # conversion runs in the worker pool so other requests aren't stalled meanwhile
             json_path = os.path.join(upload_folder,
                                      f"{filename.rsplit('.', 1)[0]}.json")
-            convert_to_json(df_cleaned, json_path)
+            result = await run_blocking(stream_to_json, file_path, json_path)
 
             return {
                 'message': 'File processed successfully',
                 'original_file': filename,
                 'processed_file': f"{filename.rsplit('.', 1)[0]}.json",
-                'rows': len(df_cleaned),
-                'columns': df_cleaned.columns.tolist()
+                'rows': result['rows'],
+                'columns': result['columns']
             }
 
         elif file_extension == 'json':
@@ -135,26 +234,46 @@ async def encrypt_data(request: EncryptRequest):
     # Check if the file exists
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail=f"File {request.file} not found")
+    if request.hash_algorithm not in HASH_ALGORITHMS:
+        raise HTTPException(status_code=400, detail=f"hash_algorithm must be one of {', '.join(HASH_ALGORITHMS)}")
+    if request.compression and request.compression not in available_codecs():
+        raise HTTPException(status_code=400, detail=f"compression must be one of {', '.join(available_codecs())}")
+    if request.compression_level is not None:
+        if not request.compression:
+            raise HTTPException(status_code=400, detail="compression_level needs a compression codec")
+        try:
+            check_codec(request.compression, request.compression_level)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
     try:
-        # Encrypt the file
-        use_rsa = request.use_rsa
-        encrypted_path, aes_key = encrypt_json_file(file_path)
-
-        # Generate hash for the original data
-        with open(file_path, 'r') as f:
-            original_data = json.load(f)
-        data_hash = generate_hash(original_data)
-
-        # Create and save metadata
+        # Encrypt the file, hashing the source and the container in the same pass
+        if request.stream:
+            # Chunked encryption of the raw bytes, for files too large to load at once
+            layout = 'raw'
+        elif request.tiles:
+            # One encrypted group per geohash tile, with a cleartext tile index for viewport reads
+            layout = 'tiles'
+        elif request.records:
+            # Record groups encrypted individually, so single records can be read back cheaply
+            layout = 'records'
+        else:
+            layout = 'json'
+        result = encrypt_and_hash(file_path, layout=layout, workers=DEFAULT_WORKERS,
+                                  hash_algorithm=request.hash_algorithm, compression=request.compression,
+                                  compression_level=request.compression_level, record_tree=request.record_tree)
+        encrypted_path, aes_key = result['encrypted_file'], result['key']
+
+        # Create and save metadata; the cached cipher hash spares /store a re-read of the file
         metadata_path = f"{encrypted_path}.meta"
-        metadata = create_metadata(file_path, encrypted_path, data_hash)
+        metadata = create_metadata(file_path, encrypted_path, result['data_hash'], ENCRYPTION_METHOD,
+                                   result['cipher_hash'], request.hash_algorithm, result['data_hash_type'],
+                                   result['compression'], result['compression_level'])
         save_metadata(metadata, metadata_path)
 
-        # Save the key (in a real application, this should be securely stored)
+        # Save the key, wrapped with RSA when requested (in a real application, this should be securely stored)
         key_path = f"{encrypted_path}.key"
-        with open(key_path, 'w') as f:
-            f.write(aes_key)
+        save_key_file(aes_key, key_path, request.use_rsa)
 
         return {
             'message': 'Data encrypted successfully',
@@ -168,6 +287,111 @@ async def encrypt_data(request: EncryptRequest):
         raise HTTPException(status_code=500, detail=f"Error encrypting data: {str(e)}")
 
 
+@router.get("/challenge")
+async def get_access_challenge(data_id: str):
+    """Single-use challenge to sign with the wallet that reads a data ID"""
+    nonce = issue_challenge(data_id)
+
+    return {
+        'data_id': data_id,
+        'nonce': nonce,
+        'message': challenge_message(data_id, nonce),
+        'expires_in': ACCESS_CHALLENGE_TTL
+    }
+
+
+@router.post("/records")
+async def get_records(request: RecordsRequest):
+    """Decrypt selected records of a record-level encrypted file for a signer with access"""
+    upload_folder = get_upload_folder()
+    file_path = dataset_path(upload_folder, request.file)
+    key_path = f"{file_path}.key"
+
+    # Check if the file and its key exist
+    if not os.path.exists(file_path) or not os.path.exists(key_path):
+        raise HTTPException(status_code=404, detail=f"File {request.file} or its key not found")
+
+    # Only decrypt for a signer the contract grants access to the data ID
+    await authorize_dataset(request.data_id, request.nonce, request.signature, file_path)
+
+    try:
+        # RSA key files are unwrapped once per dataset, then served from the data key cache
+        aes_key = await run_blocking(load_key_file, key_path, request.data_id)
+        records = await run_blocking(_read_records, file_path, aes_key, request.ids)
+
+        return {
+            'file': request.file,
+            'count': len(records),
+            'records': records
+        }
+
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error decrypting records: {str(e)}")
+
+
+@router.post("/records/proof")
+async def get_record_proofs(request: ProofRequest):
+    """Merkle inclusion proofs of selected records against the dataset's data_hash"""
+    upload_folder = get_upload_folder()
+    file_path = dataset_path(upload_folder, request.file)
+    tree_path = record_tree_path(file_path)
+
+    # Proofs come from the saved leaf digests; the dataset is not decrypted
+    if not os.path.exists(tree_path):
+        raise HTTPException(status_code=404, detail=f"File {request.file} has no record tree")
+
+    try:
+        tree = RecordTree.load(tree_path)
+        proofs = [tree.prove_record(record_id) for record_id in request.ids]
+
+        return {
+            'file': request.file,
+            'root': tree.root,
+            'proofs': proofs
+        }
+
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error building record proofs: {str(e)}")
+
+
+@router.get("/bbox")
+async def get_records_in_bbox(file: str, data_id: str, nonce: str, signature: str,
+                              min_lat: float, min_lon: float, max_lat: float, max_lon: float):
+    """Decrypt the records of a tiled encrypted file inside a bounding box for a signer with access"""
+    upload_folder = get_upload_folder()
+    file_path = dataset_path(upload_folder, file)
+    key_path = f"{file_path}.key"
+
+    # Check if the file and its key exist
+    if not os.path.exists(file_path) or not os.path.exists(key_path):
+        raise HTTPException(status_code=404, detail=f"File {file} or its key not found")
+
+    # Only decrypt for a signer the contract grants access to the data ID
+    await authorize_dataset(data_id, nonce, signature, file_path)
+
+    try:
+        # RSA key files are unwrapped once per dataset, then served from the data key cache
+        aes_key = await run_blocking(load_key_file, key_path, data_id)
+
+        result = await run_blocking(query_bbox, file_path, aes_key, min_lat, min_lon, max_lat, max_lon)
+
+        return {
+            'file': file,
+            'count': len(result['records']),
+            'groups_decrypted': result['groups_decrypted'],
+            'records': result['records']
+        }
+
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"File {file} has no tile index")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error querying records: {str(e)}")
+
+
 @router.get("/files", response_model=FileListResponse)
 async def list_files():
     """List all files in the dataset directory"""
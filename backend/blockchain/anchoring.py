@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import threading
+from backend.encryption.merkle import MerkleTree, verify_proof
+from backend.encryption.encryption_utils import generate_file_hash
+from .config import ANCHOR_MAX_LEAVES, ANCHOR_WINDOW_SECONDS
+
+
+def proof_path_for(encrypted_file):
+    """Path of the inclusion proof stored next to an encrypted file and its .meta"""
+    return f"{encrypted_file}.proof"
+
+
+class MerkleAnchor:
+    """
+    Batches cipher hashes and anchors only their Merkle root on chain
+
+    Hashes are queued until ANCHOR_MAX_LEAVES are collected or
+    ANCHOR_WINDOW_SECONDS have passed since the first one arrived. The root
+    is then stored with a single anchorRoot transaction and every file gets
+    an inclusion proof written next to it.
+    """
+
+    def __init__(self, service, max_leaves=ANCHOR_MAX_LEAVES, window_seconds=ANCHOR_WINDOW_SECONDS):
+        """
+        Initialize the anchor batcher
+
+        Args:
+            service: BlockchainService used to send the anchoring transaction
+            max_leaves: Number of queued hashes that triggers an anchor
+            window_seconds: Maximum time a hash waits before being anchored
+        """
+        self.service = service
+        self.max_leaves = max_leaves
+        self.window_seconds = window_seconds
+        self._pending = []          # list of (cipher_hash, proof_path, hash_algorithm)
+        self._window_start = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the window timer thread if it is not already running"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop_event.clear()
+                self._thread = threading.Thread(target=self._run, name="merkle-anchor", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Stop the window timer thread (queued hashes stay queued)"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def add(self, cipher_hash, proof_path, hash_algorithm='sha256'):
+        """
+        Queue a cipher hash for the next anchor
+
+        Args:
+            cipher_hash: Hex digest of the encrypted file
+            proof_path: Where to write the file's inclusion proof
+            hash_algorithm: Algorithm of cipher_hash, recorded in the proof for verification
+
+        Returns:
+            int: number of hashes waiting in the current window
+        """
+        with self._lock:
+            if not self._pending:
+                self._window_start = time.time()
+            self._pending.append((cipher_hash, proof_path, hash_algorithm))
+            queued = len(self._pending)
+
+        self.start()
+
+        if queued >= self.max_leaves:
+            self.flush()
+
+        return queued
+
+    def pending_count(self):
+        """Number of hashes waiting to be anchored"""
+        with self._lock:
+            return len(self._pending)
+
+    def _run(self):
+        """Flush the queue when the time window elapses"""
+        while not self._stop_event.wait(1.0):
+            with self._lock:
+                expired = (self._pending and
+                           time.time() - self._window_start >= self.window_seconds)
+
+            if expired:
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"Error anchoring Merkle root: {str(e)}")
+
+    def flush(self):
+        """
+        Anchor all queued hashes now
+
+        Returns:
+            dict: anchor details, or None if nothing was queued
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = self._pending
+                self._pending = []
+                self._window_start = None
+
+            if not batch:
+                return None
+
+            try:
+                tree = MerkleTree([cipher_hash for cipher_hash, _, _ in batch])
+                receipt = self.service.anchor_merkle_root(tree.root, len(tree))
+            except Exception:
+                # Put the hashes back so they are anchored by the next flush
+                with self._lock:
+                    self._pending = batch + self._pending
+                    self._window_start = self._window_start or time.time()
+                raise
+
+            anchor = {
+                'root': tree.root,
+                'leaf_count': len(tree),
+                'transaction_hash': receipt.transactionHash.hex(),
+                'block_number': receipt.blockNumber,
+                'contract_address': self.service.contract.address
+            }
+
+            # Write each file's inclusion proof next to it
+            for index, (cipher_hash, proof_path, hash_algorithm) in enumerate(batch):
+                proof = dict(anchor)
+                proof.update({
+                    'leaf': cipher_hash,
+                    'leaf_index': index,
+                    'proof': tree.get_proof(index),
+                    'hash_algorithm': hash_algorithm
+                })
+                with open(proof_path, 'w') as f:
+                    json.dump(proof, f, indent=2)
+
+            print(f"Anchored Merkle root {tree.root} for {len(tree)} files "
+                  f"in transaction {anchor['transaction_hash']}")
+            return anchor
+
+
+def verify_anchored_file(encrypted_file, proof_file=None, blockchain_service=None, trusted_roots=None):
+    """
+    Verify an encrypted file against its anchored Merkle root
+
+    The inclusion proof is checked offline. The root itself is confirmed
+    either against a set of trusted roots or with one getAnchor call per
+    root (not per file) when a blockchain service is given. Without
+    either, the root can't be confirmed and the file is not valid: a
+    proof file alone can name any root.
+
+    Args:
+        encrypted_file: Path to the encrypted file
+        proof_file: Path to the proof (default: encrypted_file + '.proof')
+        blockchain_service: Optional service used to confirm the root on chain
+        trusted_roots: Optional dict/set of roots already confirmed on chain
+
+    Returns:
+        dict: verification result
+    """
+    if proof_file is None:
+        proof_file = proof_path_for(encrypted_file)
+
+    with open(proof_file, 'r') as f:
+        proof = json.load(f)
+
+    # Proofs written before the algorithm was configurable are SHA-256
+    cipher_hash = generate_file_hash(encrypted_file, algorithm=proof.get('hash_algorithm', 'sha256'))
+
+    result = {
+        'file': os.path.basename(encrypted_file),
+        'root': proof['root'],
+        'hash_matches': cipher_hash == proof['leaf'],
+        'proof_valid': verify_proof(cipher_hash, proof['proof'], proof['root']),
+        'root_anchored': None
+    }
+
+    if trusted_roots is not None:
+        result['root_anchored'] = proof['root'] in trusted_roots
+    elif blockchain_service is not None:
+        anchor = blockchain_service.get_anchor(proof['root'])
+        result['root_anchored'] = anchor['timestamp'] > 0
+
+    # Only a root confirmed on chain makes the file valid; None means it wasn't checked
+    result['valid'] = (result['hash_matches'] and result['proof_valid'] and
+                       result['root_anchored'] is True)
+    return result
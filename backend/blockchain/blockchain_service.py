@@ -1,8 +1,116 @@
 import json
+import time
+import functools
 import hashlib
+import threading
+from eth_abi import decode_abi
+from hexbytes import HexBytes
 from web3 import Web3
-from web3.exceptions import ContractLogicError
-from .config import get_contract, get_web3, PRIVATE_KEY
+from web3.datastructures import AttributeDict
+from web3.exceptions import ContractLogicError, TransactionNotFound, TimeExhausted
+from .config import (get_contract, get_web3, get_http_session, close_http_session, PRIVATE_KEYS,
+                     BATCH_GAS_LIMIT, MAX_BATCH_SIZE, INDEXER_ENABLED, DATA_ID_PAGE_SIZE,
+                     CONTRACT_VARIANT, BLOCKCHAIN_PROVIDER, RPC_TIMEOUT, RPC_BATCH_SIZE, GAS_ESTIMATE_MARGIN,
+                     SPEEDUP_AFTER_SECONDS, RECEIPT_TIMEOUT, ANCHOR_FEE_TIER, READ_CACHE_UNINDEXED_TTL)
+from .nonce_manager import is_nonce_error
+from .signer_pool import SignerPool, TenantRegistry
+from .receipt_tracker import ReceiptTracker
+from .anchoring import MerkleAnchor
+from .indexer import EventIndexer
+from .read_cache import ReadCache
+from .fee_oracle import FeeOracle
+
+# How many times a transaction is rebuilt after a nonce conflict
+NONCE_RETRIES = 3
+
+# Seconds between receipt checks while waiting for a transaction
+RECEIPT_POLL_INTERVAL = 0.2
+
+
+def to_bytes32(value):
+    """
+    Convert a 64-character hex string (optionally 0x-prefixed) to bytes32
+
+    Args:
+        value: Hex string such as a SHA-256 digest
+
+    Returns:
+        bytes: 32 raw bytes
+    """
+    if isinstance(value, bytes) and len(value) == 32:
+        return value
+
+    hex_value = value[2:] if value.startswith('0x') else value
+    if len(hex_value) != 64:
+        raise ValueError(f"Expected a 32-byte hex value, got '{value}'")
+
+    return bytes.fromhex(hex_value)
+
+
+def bytes32_to_hex(value):
+    """Convert bytes32 returned by the contract to a 64-character hex string"""
+    return value.hex() if isinstance(value, (bytes, bytearray)) else value
+
+
+# Selector of Solidity's Error(string) revert payload
+ERROR_SELECTOR = '0x08c379a0'
+
+
+def revert_reason(error):
+    """
+    Extract the revert reason from a JSON-RPC error object
+
+    Args:
+        error: The 'error' member of a JSON-RPC response
+
+    Returns:
+        str: revert reason, or the node's error message if none is encoded
+    """
+    data = error.get('data')
+    if isinstance(data, dict):
+        # Hardhat/Ganache nest the revert data in an object
+        data = data.get('data') or data.get('result')
+
+    if isinstance(data, str) and data.startswith(ERROR_SELECTOR):
+        try:
+            return decode_abi(['string'], bytes.fromhex(data[10:]))[0]
+        except Exception:
+            pass
+
+    return error.get('message', 'Unknown error')
+
+
+class BatchSubmitError(Exception):
+    """
+    A batch operation failed after some of its transactions were broadcast
+
+    Attributes:
+        submitted: List of (chunk, transaction hash) tuples already broadcast
+        failed: Chunk whose transaction could not be sent
+    """
+
+    def __init__(self, message, submitted, failed):
+        super().__init__(message)
+        self.submitted = submitted
+        self.failed = failed
+
+
+def parse_receipt(raw):
+    """
+    Convert a receipt from a raw JSON-RPC reply to the form web3 returns
+
+    Only the fields used by this service are converted: status, block
+    number, gas used and transaction hash.
+    """
+    return AttributeDict({
+        'transactionHash': HexBytes(raw['transactionHash']),
+        'blockNumber': int(raw['blockNumber'], 16),
+        'gasUsed': int(raw['gasUsed'], 16),
+        'status': int(raw.get('status') or '0x1', 16),
+        'from': raw.get('from'),
+        'to': raw.get('to'),
+        'logs': raw.get('logs', [])
+    })
 
 
 class BlockchainService:
@@ -12,51 +120,355 @@ class BlockchainService:
         """Initialize the blockchain service"""
         self.contract, self.web3 = get_contract()
 
-        # Set up the account for transaction signing
-        if PRIVATE_KEY:
-            self.account = self.web3.eth.account.from_key(PRIVATE_KEY)
-            print(f"Using account: {self.account.address}")
+        # The compact contract carries IDs and digests as bytes32 instead of hex strings
+        self.compact = CONTRACT_VARIANT == 'bytes32'
+
+        # Tracks receipts of transactions submitted without waiting
+        self.receipt_tracker = ReceiptTracker(self)
+
+        # Batches cipher hashes into Merkle roots for anchoring mode
+        self.merkle_anchor = MerkleAnchor(self)
+        self._anchor_cache = {}
+
+        # Cached retrieveData/checkAccess results
+        self.read_cache = ReadCache()
+
+        # Fee and gas limit suggestions
+        self.fee_oracle = FeeOracle(self.web3)
+
+        # Local event index for listings and access checks (started by the API)
+        self.indexer = EventIndexer(self) if INDEXER_ENABLED else None
+        if self.indexer is not None:
+            # Drop cached results as soon as their events are indexed
+            self.indexer.add_listener(self._on_indexed_events)
+
+        # Set up the signing accounts; each one has its own nonce sequence
+        self.signer_pool = SignerPool(self.web3, PRIVATE_KEYS)
+        self.tenants = TenantRegistry()
+
+        if self.signer_pool.primary:
+            # The first account is used for read calls that need a sender
+            self.account = self.signer_pool.primary.account
+            self.nonce_manager = self.signer_pool.primary.nonce_manager
+            print(f"Using account(s): {', '.join(self.signer_pool.addresses())}")
         else:
             self.account = None
+            self.nonce_manager = None
             print("Warning: No private key provided. Only read operations will work.")
 
-    def _build_txn(self, function):
+    def refresh(self):
+        """Rebuild the Web3 connection and contract instance (e.g. after the node restarts)"""
+        self.contract, self.web3 = get_contract(reload_abi=True)
+        self._chain_id = None
+        self.read_cache.clear()
+        self.fee_oracle = FeeOracle(self.web3)
+
+        if self.account:
+            # The node may have been reset, so local nonces can't be trusted
+            self.signer_pool.reset(self.web3)
+            self.nonce_manager = self.signer_pool.primary.nonce_manager
+
+        return self
+
+    def health(self):
+        """
+        Check the connection to the blockchain node
+
+        Returns:
+            dict: connection status, current block number and contract address
+        """
+        try:
+            block_number = self.web3.eth.block_number
+            connected = True
+        except Exception as e:
+            print(f"Blockchain node unreachable: {str(e)}")
+            block_number = None
+            connected = False
+
+        return {
+            'connected': connected,
+            'block_number': block_number,
+            'contract_address': self.contract.address
+        }
+
+    def _encode(self, value):
+        """Convert a hex ID or digest to the contract's representation"""
+        return to_bytes32(value) if self.compact else value
+
+    def _decode(self, value):
+        """Convert an ID or digest returned by the contract to a hex string"""
+        return bytes32_to_hex(value) if self.compact else value
+
+    def _cache_id(self, data_id):
+        """Data ID as the event index stores it (bare lowercase hex in compact mode)"""
+        return bytes32_to_hex(to_bytes32(data_id)) if self.compact else data_id
+
+    def _invalidate(self, data_id):
+        """Drop cached results of a data ID after a transaction that changes it"""
+        try:
+            self.read_cache.invalidate(self._cache_id(data_id))
+        except ValueError:
+            pass
+
+    def _cache_ttl(self):
+        """
+        Maximum age of cached reads
+
+        Event invalidation only keeps cached results fresh while the indexer
+        follows the chain (the API starts it; scripts usually don't), so
+        results expire after READ_CACHE_UNINDEXED_TTL otherwise.
+        """
+        if self.indexer is not None and self.indexer.is_live():
+            return None
+        return READ_CACHE_UNINDEXED_TTL
+
+    def _on_indexed_events(self, changes):
+        """
+        Indexer listener: DataStored, AccessGranted and AccessRevoked invalidate their data ID,
+        as do Reorg changes for data IDs whose events were rewound
+
+        DataStored events of pool accounts also fill in the tenant registry's
+        signer, for stores whose receipt this process never saw.
+        """
+        stored = []
+        for change in changes:
+            self.read_cache.invalidate(change['data_id'])
+            if change['event'] == 'DataStored' and self.signer_pool.for_address(change['address']):
+                stored.append((change['data_id'], None, change['address']))
+
+        if stored:
+            self.tenants.record(stored)
+
+    def _owner_signer(self, data_id):
+        """
+        Find the pool signer that owns a data ID (grants and revokes must come from it)
+
+        The tenant registry is checked first, then the event index, then the
+        contract itself.
+
+        Returns:
+            Signer: owning signer
+        """
+        if len(self.signer_pool) == 1:
+            return self.signer_pool.primary
+
+        record = self.tenants.get(self._cache_id(data_id))
+        owner = record['signer'] if record else None
+
+        if owner is None and self.indexer is not None:
+            owner = self.indexer.get_owner(self._cache_id(data_id))
+
+        if owner is None:
+            owner = self._chain_owner(data_id)
+
+        signer = self.signer_pool.for_address(owner)
+        if signer is None:
+            raise ValueError(f"Data ID '{data_id}' is owned by {owner}, which is not a pool account")
+
+        return signer
+
+    def _chain_owner(self, data_id):
+        """Read the owner of a data ID from the contract using any pool account that has access"""
+        for signer in self.signer_pool.signers:
+            try:
+                result = self.contract.functions.retrieveData(self._encode(data_id)).call({'from': signer.address})
+                return result[3]
+            except ContractLogicError as e:
+                if "Data not found" in str(e):
+                    raise
+                continue
+
+        raise ValueError(f"No pool account has access to data ID '{data_id}'")
+
+    def _call_options(self, data_id):
+        """Call options for reads of a data ID: sent from its owning signer when it is known"""
+        if len(self.signer_pool) <= 1:
+            return {}
+
+        record = self.tenants.get(self._cache_id(data_id))
+        return {'from': record['signer'] if record else self.account.address}
+
+    def _build_txn(self, function, gas=None, signer=None, tier=None):
         """Build a transaction for contract interaction"""
         if not self.account:
             raise ValueError("Private key not set, cannot create transaction")
 
-        # Get nonce for the account
-        nonce = self.web3.eth.get_transaction_count(self.account.address)
+        # The chain ID never changes for a connection, so look it up once
+        if getattr(self, '_chain_id', None) is None:
+            self._chain_id = self.web3.eth.chain_id
+
+        # Gas limit from the memoized estimate, fees from the oracle's latency tier
+        params = {
+            'from': signer.address,
+            'chainId': self._chain_id,
+            'gas': gas or self.fee_oracle.gas_limit(function, signer.address)
+        }
+        params.update(self.fee_oracle.fee_params(tier))
 
         # Build the transaction
-        txn = function.buildTransaction({
-            'from': self.account.address,
-            'nonce': nonce,
-            'gas': 2000000,
-            'gasPrice': self.web3.toWei('50', 'gwei')
-        })
+        txn = function.buildTransaction(params)
+
+        # Reserve a nonce locally instead of asking the node for every transaction
+        txn['nonce'] = signer.nonce_manager.allocate()
 
         return txn
 
-    def _sign_and_send_txn(self, txn):
-        """Sign and send a transaction"""
-        # Sign the transaction
-        signed_txn = self.web3.eth.account.sign_transaction(txn, PRIVATE_KEY)
+    def _send_txn(self, function, gas=None, signer=None, tier=None, on_mined=None):
+        """
+        Build, sign and broadcast a transaction without waiting for its receipt
 
-        # Send the transaction
-        tx_hash = self.web3.eth.send_raw_transaction(signed_txn.rawTransaction)
+        Nonce conflicts (e.g. transactions sent by another process with the same
+        account) trigger a resync with the node and a rebuilt transaction.
+
+        Args:
+            function: Contract function call to send
+            gas: Gas limit for the transaction (default: memoized estimate)
+            signer: Pool signer to send from (default: the least loaded one)
+            tier: Fee tier, 'fast', 'standard' or 'economy' (default: DEFAULT_FEE_TIER)
+            on_mined: Optional callback run once the transaction is mined successfully
+
+        Returns:
+            transaction hash
+        """
+        if signer is None:
+            signer = self.signer_pool.select()
+
+        for attempt in range(NONCE_RETRIES + 1):
+            txn = self._build_txn(function, gas, signer, tier)
+
+            try:
+                # Sign the transaction
+                signed_txn = self.web3.eth.account.sign_transaction(txn, signer.key)
+
+                # Send the transaction
+                tx_hash = self.web3.eth.send_raw_transaction(signed_txn.rawTransaction)
+
+            except Exception as e:
+                signer.nonce_manager.release(txn['nonce'])
+                if is_nonce_error(e) and attempt < NONCE_RETRIES:
+                    print(f"Nonce conflict ({str(e)}), resyncing and retrying")
+                    signer.nonce_manager.resync()
+                    continue
+                raise
+
+            # Registered as in flight before leaving the reserved set, so a concurrent
+            # resync never sees the nonce as a gap
+            signer.record_sent(tx_hash, txn, on_mined)
+            signer.nonce_manager.confirm(txn['nonce'])
+            return tx_hash
+
+    def speed_up(self, tx_hash):
+        """
+        Replace a pending transaction with the same nonce and higher fees
+
+        Args:
+            tx_hash: Hash of the pending transaction (or of an earlier replacement)
+
+        Returns:
+            hash of the replacement, or None if the transaction is no longer pending
+        """
+        signer, entry = self.signer_pool.find(tx_hash)
+        if signer is None:
+            return None
+
+        txn = dict(entry['txn'])
+        txn.update(self.fee_oracle.replacement_fee_params(entry['txn']))
+
+        try:
+            signed_txn = self.web3.eth.account.sign_transaction(txn, signer.key)
+            new_hash = self.web3.eth.send_raw_transaction(signed_txn.rawTransaction)
+        except Exception as e:
+            if is_nonce_error(e):
+                # The original was mined in the meantime; its receipt will show up
+                return None
+            print(f"Error speeding up transaction {entry['hashes'][-1]}: {str(e)}")
+            raise
+
+        signer.record_replacement(tx_hash, new_hash, txn)
+        print(f"Transaction {entry['hashes'][-1]} replaced by {new_hash.hex()} with higher fees")
+        return new_hash
+
+    def _wait_for_receipt(self, tx_hash):
+        """
+        Wait for a transaction to be mined and credit it to its signer
+
+        If it is still pending after SPEEDUP_AFTER_SECONDS it is replaced with
+        higher fees, and the receipt of whichever version is mined is returned.
+        """
+        hashes = [tx_hash]
+        started = last_sent = time.time()
+
+        while True:
+            for candidate in hashes:
+                try:
+                    tx_receipt = self.web3.eth.get_transaction_receipt(candidate)
+                except TransactionNotFound:
+                    continue
+
+                self.signer_pool.record_receipt(candidate, tx_receipt)
+                return tx_receipt
+
+            now = time.time()
+            if now - started > RECEIPT_TIMEOUT:
+                raise TimeExhausted(f"Transaction {tx_hash.hex()} not mined after {RECEIPT_TIMEOUT} seconds")
+
+            if SPEEDUP_AFTER_SECONDS and now - last_sent >= SPEEDUP_AFTER_SECONDS:
+                new_hash = self.speed_up(hashes[-1])
+                if new_hash is not None:
+                    hashes.append(new_hash)
+                last_sent = now
+
+            time.sleep(RECEIPT_POLL_INTERVAL)
+
+    def _ran_out_of_gas(self, receipt):
+        """Whether a reverted transaction used its whole gas limit"""
+        if receipt.status == 1:
+            return False
+        return receipt.gasUsed >= self.web3.eth.get_transaction(receipt.transactionHash)['gas']
+
+    def _sign_and_send_txn(self, function, wait=True, gas=None, signer=None, tier=None, on_mined=None):
+        """
+        Sign and send a transaction
+
+        A transaction sent with a memoized gas limit that runs out of gas is
+        re-estimated against the current contract state and sent once more.
+
+        Args:
+            function: Contract function call to send
+            wait: Whether to block until the transaction is mined
+            gas: Gas limit for the transaction (default: memoized estimate)
+            signer: Pool signer to send from (default: the least loaded one)
+            tier: Fee tier, 'fast', 'standard' or 'economy' (default: DEFAULT_FEE_TIER)
+            on_mined: Optional callback run once the transaction is mined successfully
+
+        Returns:
+            transaction receipt, or the transaction hash if wait is False
+        """
+        tx_hash = self._send_txn(function, gas, signer, tier, on_mined)
+
+        if not wait:
+            return tx_hash
 
         # Wait for transaction receipt
-        tx_receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
+        tx_receipt = self._wait_for_receipt(tx_hash)
+
+        if gas is None and self._ran_out_of_gas(tx_receipt):
+            print(f"Transaction {tx_receipt.transactionHash.hex()} ran out of gas, re-estimating and resending")
+            self.fee_oracle.forget(function)
+            tx_hash = self._send_txn(function, None, signer, tier, on_mined)
+            tx_receipt = self._wait_for_receipt(tx_hash)
 
         return tx_receipt
 
     def generate_data_id(self, original_file, timestamp):
         """Generate a unique data ID based on file name and timestamp"""
         combined = f"{original_file}_{timestamp}"
-        return hashlib.sha256(combined.encode()).hexdigest()[:32]
+        digest = hashlib.sha256(combined.encode()).hexdigest()
+
+        # The compact contract uses the full digest as a bytes32 ID
+        return digest if self.compact else digest[:32]
 
-    def store_encrypted_data(self, data_id, cipher_hash, metadata_hash):
+    def store_encrypted_data(self, data_id, cipher_hash, metadata_hash, wait=True, tenant=None, tier=None):
         """
         Store encrypted data reference on the blockchain
 
@@ -64,19 +476,28 @@ class BlockchainService:
             data_id: Unique identifier for the data
             cipher_hash: Hash of the encrypted data file
             metadata_hash: Hash of the metadata file
+            wait: Whether to wait for the transaction to be mined
+            tenant: Tenant the data is attributed to (the on-chain owner is a pool account)
+            tier: Fee tier, 'fast', 'standard' or 'economy'
 
         Returns:
-            transaction receipt
+            transaction receipt, or the transaction hash if wait is False
         """
         try:
             # Call the storeData function on the smart contract
-            store_function = self.contract.functions.storeData(data_id, cipher_hash, metadata_hash)
+            store_function = self.contract.functions.storeData(
+                self._encode(data_id), self._encode(cipher_hash), self._encode(metadata_hash))
 
-            # Build transaction
-            txn = self._build_txn(store_function)
+            # Send from the least loaded signer; who owns the data is recorded once the store is mined
+            signer = self.signer_pool.select()
+            entry = (self._cache_id(data_id), tenant, signer.address)
+            tx_receipt = self._sign_and_send_txn(store_function, wait, signer=signer, tier=tier,
+                                                 on_mined=lambda: self.tenants.record([entry]))
+            self._invalidate(data_id)
 
-            # Sign and send transaction
-            tx_receipt = self._sign_and_send_txn(txn)
+            if not wait:
+                print(f"Data store submitted. Transaction hash: {tx_receipt.hex()}")
+                return tx_receipt
 
             print(f"Data stored on blockchain. Transaction hash: {tx_receipt.transactionHash.hex()}")
             return tx_receipt
@@ -105,15 +526,23 @@ class BlockchainService:
             tuple: (cipher_hash, metadata_hash, timestamp, owner)
         """
         try:
+            # Serve from the read cache when possible
+            key = (self._cache_id(data_id), 'record')
+            found, record = self.read_cache.get(key, self._cache_ttl())
+            if found:
+                return record
+            version = self.read_cache.version()
+
             # Call the retrieveData function on the smart contract
-            result = self.contract.functions.retrieveData(data_id).call()
+            result = self.contract.functions.retrieveData(self._encode(data_id)).call(self._call_options(data_id))
 
             # Parse the result
-            cipher_hash = result[0]
-            metadata_hash = result[1]
+            cipher_hash = self._decode(result[0])
+            metadata_hash = self._decode(result[1])
             timestamp = result[2]
             owner = result[3]
 
+            self.read_cache.set(key, (cipher_hash, metadata_hash, timestamp, owner), version)
             return cipher_hash, metadata_hash, timestamp, owner
 
         except ContractLogicError as e:
@@ -131,29 +560,171 @@ class BlockchainService:
             print(f"Error retrieving data from blockchain: {str(e)}")
             raise
 
-    def grant_access(self, data_id, grantee_address):
+    def rpc_batch(self, calls):
+        """
+        Send JSON-RPC calls as batch requests of up to RPC_BATCH_SIZE calls
+
+        Args:
+            calls: List of (method, params) tuples
+
+        Returns:
+            list: one reply per call, in order, each with a 'result' or an 'error'
+            member, or None if the node doesn't support batch requests
+        """
+        replies = []
+        for start in range(0, len(calls), RPC_BATCH_SIZE):
+            chunk = calls[start:start + RPC_BATCH_SIZE]
+            payload = [{'jsonrpc': '2.0', 'id': index, 'method': method, 'params': params}
+                       for index, (method, params) in enumerate(chunk)]
+
+            response = get_http_session().post(BLOCKCHAIN_PROVIDER, json=payload, timeout=RPC_TIMEOUT)
+            response.raise_for_status()
+            chunk_replies = response.json()
+
+            if not isinstance(chunk_replies, list):
+                return None
+
+            # Replies may come back in any order
+            by_id = {reply.get('id'): reply for reply in chunk_replies}
+            replies.extend(by_id.get(index, {'error': {'message': 'No reply'}}) for index in range(len(chunk)))
+
+        return replies
+
+    def retrieve_encrypted_data_batch(self, data_ids):
+        """
+        Retrieve many encrypted data references with JSON-RPC batch requests
+
+        All retrieveData calls are sent as eth_call entries of one JSON-RPC
+        batch per RPC_BATCH_SIZE IDs. A failing ID (e.g. "Data not found" or
+        "Not authorized") only affects its own result.
+
+        Args:
+            data_ids: List of data IDs
+
+        Returns:
+            dict: data_id -> {'cipher_hash', 'metadata_hash', 'timestamp', 'owner'} or {'error': reason}
+        """
+        function_abi = self.contract.get_function_by_name('retrieveData').abi
+        output_types = [output['type'] for output in function_abi['outputs']]
+
+        results = {}
+        requested = []
+        calls = []
+        for data_id in data_ids:
+            try:
+                call_data = self.contract.encodeABI(fn_name='retrieveData', args=[self._encode(data_id)])
+            except Exception as e:
+                results[data_id] = {'error': str(e)}
+                continue
+
+            call = {'to': self.contract.address, 'data': call_data}
+            if self.account:
+                call['from'] = self._call_options(data_id).get('from', self.account.address)
+
+            requested.append(data_id)
+            calls.append(('eth_call', [call, 'latest']))
+
+        if not calls:
+            return results
+
+        replies = self.rpc_batch(calls)
+
+        if replies is None:
+            # The node doesn't support batching; fall back to one call per ID
+            print("Warning: JSON-RPC batch requests not supported, retrieving sequentially")
+            for data_id in requested:
+                try:
+                    cipher_hash, metadata_hash, timestamp, owner = self.retrieve_encrypted_data(data_id)
+                    results[data_id] = {'cipher_hash': cipher_hash, 'metadata_hash': metadata_hash,
+                                        'timestamp': timestamp, 'owner': owner}
+                except Exception as e:
+                    results[data_id] = {'error': str(e)}
+            return results
+
+        for data_id, reply in zip(requested, replies):
+            if 'error' in reply:
+                results[data_id] = {'error': revert_reason(reply['error'])}
+                continue
+
+            result = reply.get('result') or '0x'
+            if result.startswith(ERROR_SELECTOR):
+                # Some nodes return the revert payload as the call result
+                results[data_id] = {'error': revert_reason({'data': result})}
+                continue
+
+            try:
+                cipher_hash, metadata_hash, timestamp, owner = decode_abi(output_types, bytes.fromhex(result[2:]))
+            except Exception as e:
+                results[data_id] = {'error': f"Could not decode result: {str(e)}"}
+                continue
+
+            results[data_id] = {
+                'cipher_hash': self._decode(cipher_hash),
+                'metadata_hash': self._decode(metadata_hash),
+                'timestamp': timestamp,
+                'owner': Web3.toChecksumAddress(owner)
+            }
+
+        return results
+
+    def get_transaction_receipts(self, tx_hashes):
+        """
+        Fetch the receipts of many transactions with JSON-RPC batch requests
+
+        Args:
+            tx_hashes: List of transaction hashes (hex strings or HexBytes)
+
+        Returns:
+            dict: hex transaction hash -> receipt, for the transactions that have been mined
+        """
+        keys = [tx_hash.hex() if hasattr(tx_hash, 'hex') else tx_hash for tx_hash in tx_hashes]
+        replies = self.rpc_batch([('eth_getTransactionReceipt', [key]) for key in keys]) if keys else []
+
+        receipts = {}
+        if replies is None:
+            # The node doesn't support batching; fall back to one call per hash
+            for key in keys:
+                try:
+                    receipts[key] = self.web3.eth.get_transaction_receipt(key)
+                except TransactionNotFound:
+                    continue
+            return receipts
+
+        for key, reply in zip(keys, replies):
+            if 'error' in reply:
+                print(f"Error fetching receipt for {key}: {reply['error'].get('message')}")
+            elif reply.get('result'):
+                receipts[key] = parse_receipt(reply['result'])
+
+        return receipts
+
+    def grant_access(self, data_id, grantee_address, wait=True, tier=None):
         """
         Grant access to data for a specific address
 
         Args:
             data_id: Unique identifier for the data
             grantee_address: Ethereum address to grant access to
+            wait: Whether to wait for the transaction to be mined
+            tier: Fee tier, 'fast', 'standard' or 'economy'
 
         Returns:
-            transaction receipt
+            transaction receipt, or the transaction hash if wait is False
         """
         try:
             # Ensure address is checksum format
             grantee_address = Web3.toChecksumAddress(grantee_address)
 
             # Call the grantAccess function on the smart contract
-            grant_function = self.contract.functions.grantAccess(data_id, grantee_address)
+            grant_function = self.contract.functions.grantAccess(self._encode(data_id), grantee_address)
 
-            # Build transaction
-            txn = self._build_txn(grant_function)
+            # Build, sign and send transaction from the account that owns the data
+            tx_receipt = self._sign_and_send_txn(grant_function, wait, signer=self._owner_signer(data_id), tier=tier)
+            self._invalidate(data_id)
 
-            # Sign and send transaction
-            tx_receipt = self._sign_and_send_txn(txn)
+            if not wait:
+                print(f"Access grant to {grantee_address} for data ID {data_id} submitted")
+                return tx_receipt
 
             print(f"Access granted to {grantee_address} for data ID {data_id}")
             return tx_receipt
@@ -162,29 +733,33 @@ class BlockchainService:
             print(f"Error granting access: {str(e)}")
             raise
 
-    def revoke_access(self, data_id, revokee_address):
+    def revoke_access(self, data_id, revokee_address, wait=True, tier=None):
         """
         Revoke access to data for a specific address
 
         Args:
             data_id: Unique identifier for the data
             revokee_address: Ethereum address to revoke access from
+            wait: Whether to wait for the transaction to be mined
+            tier: Fee tier, 'fast', 'standard' or 'economy'
 
         Returns:
-            transaction receipt
+            transaction receipt, or the transaction hash if wait is False
         """
         try:
             # Ensure address is checksum format
             revokee_address = Web3.toChecksumAddress(revokee_address)
 
             # Call the revokeAccess function on the smart contract
-            revoke_function = self.contract.functions.revokeAccess(data_id, revokee_address)
+            revoke_function = self.contract.functions.revokeAccess(self._encode(data_id), revokee_address)
 
-            # Build transaction
-            txn = self._build_txn(revoke_function)
+            # Build, sign and send transaction from the account that owns the data
+            tx_receipt = self._sign_and_send_txn(revoke_function, wait, signer=self._owner_signer(data_id), tier=tier)
+            self._invalidate(data_id)
 
-            # Sign and send transaction
-            tx_receipt = self._sign_and_send_txn(txn)
+            if not wait:
+                print(f"Access revoke from {revokee_address} for data ID {data_id} submitted")
+                return tx_receipt
 
             print(f"Access revoked from {revokee_address} for data ID {data_id}")
             return tx_receipt
@@ -193,6 +768,247 @@ class BlockchainService:
             print(f"Error revoking access: {str(e)}")
             raise
 
+    def _gas_bounded_chunks(self, build_function, items, signer=None):
+        """
+        Split a list of batch items into chunks whose estimated gas fits BATCH_GAS_LIMIT
+
+        Args:
+            build_function: Callable taking a chunk of items and returning the contract function call
+            items: List of batch items
+            signer: Pool signer the transactions will be sent from (default: the primary account)
+
+        Yields:
+            tuple: (chunk, contract function call, gas limit)
+        """
+        if not self.account:
+            raise ValueError("Private key not set, cannot create transaction")
+
+        start = 0
+        size = min(MAX_BATCH_SIZE, len(items))
+
+        while start < len(items):
+            chunk = items[start:start + size]
+            function = build_function(chunk)
+            sender = signer.address if signer else self.account.address
+            gas = int(function.estimateGas({'from': sender}) * GAS_ESTIMATE_MARGIN)
+
+            # Shrink the chunk in proportion to how far it overshoots the budget
+            if gas > BATCH_GAS_LIMIT and len(chunk) > 1:
+                size = max(1, int(len(chunk) * BATCH_GAS_LIMIT / gas))
+                continue
+
+            yield chunk, function, gas
+            start += len(chunk)
+
+    def _send_batch(self, build_function, items, wait, by_owner=False, on_mined=None, tier=None):
+        """
+        Send a batch operation as one or more gas-bounded transactions
+
+        Every chunk is estimated first, so an item the contract would reject
+        (e.g. an existing data ID) fails the whole batch before anything is
+        sent. All chunks are then broadcast before any receipt is awaited, so
+        the transactions are mined in parallel rather than one after another.
+        Each chunk goes to the least loaded pool signer, unless by_owner is
+        set, in which case items are grouped by the signer owning their data ID.
+
+        Args:
+            build_function: Callable taking a chunk of items and returning the contract function call
+            items: List of batch items, each starting with a data ID
+            wait: Whether to wait for the transactions to be mined
+            by_owner: Send each item from the signer that owns its data ID (grants and revokes)
+            on_mined: Optional callback(chunk, signer) run once a chunk's transaction is mined successfully
+            tier: Fee tier, 'fast', 'standard' or 'economy'
+
+        Returns:
+            list of (chunk, receipt) tuples, or (chunk, transaction hash) if wait is False
+
+        Raises:
+            BatchSubmitError: if a broadcast fails after earlier chunks were sent
+        """
+        if by_owner:
+            groups = {}
+            for item in items:
+                signer = self._owner_signer(item[0])
+                groups.setdefault(signer.address, (signer, []))[1].append(item)
+            groups = list(groups.values())
+        else:
+            groups = [(None, items)]
+
+        # Estimate every chunk before broadcasting any of them
+        planned = [(group_signer, chunk, function, gas)
+                   for group_signer, group in groups
+                   for chunk, function, gas in self._gas_bounded_chunks(build_function, group, group_signer)]
+
+        submitted = []
+        for group_signer, chunk, function, gas in planned:
+            signer = group_signer or self.signer_pool.select()
+            callback = functools.partial(on_mined, chunk, signer) if on_mined else None
+            try:
+                tx_hash = self._send_txn(function, gas, signer, tier, callback)
+            except Exception as e:
+                if not submitted:
+                    raise
+                print(f"Batch stopped after {len(submitted)} of {len(planned)} transaction(s): {str(e)}")
+                raise BatchSubmitError(str(e), submitted, chunk) from e
+
+            print(f"Batch of {len(chunk)} submitted by {signer.address}. Transaction hash: {tx_hash.hex()}")
+            submitted.append((chunk, tx_hash))
+
+        if wait:
+            submitted = [(chunk, self._wait_for_receipt(tx_hash)) for chunk, tx_hash in submitted]
+
+        # Cached results of every data ID in the batch are now stale
+        for chunk, _ in submitted:
+            for entry in chunk:
+                self._invalidate(entry[0])
+
+        return submitted
+
+    def store_encrypted_data_batch(self, records, wait=True, tenant=None, tier=None):
+        """
+        Store many encrypted data references using batch transactions
+
+        Args:
+            records: List of (data_id, cipher_hash, metadata_hash) tuples, optionally
+                     with a fourth tenant element overriding the tenant argument
+            wait: Whether to wait for the transactions to be mined
+            tenant: Tenant the data is attributed to
+            tier: Fee tier, 'fast', 'standard' or 'economy'
+
+        Returns:
+            list of (records chunk, receipt or transaction hash) tuples, one per transaction
+        """
+        try:
+            # The contract rejects the whole transaction if an ID repeats, so check before estimating
+            records = list(records)
+            data_ids = [self._cache_id(record[0]) for record in records]
+            if len(set(data_ids)) != len(data_ids):
+                raise ValueError("Duplicate data IDs in batch")
+
+            def build_function(chunk):
+                data_ids, cipher_hashes, metadata_hashes = (
+                    [self._encode(record[column]) for record in chunk] for column in range(3))
+                return self.contract.functions.storeDataBatch(data_ids, cipher_hashes, metadata_hashes)
+
+            def record_tenants(chunk, signer):
+                self.tenants.record([
+                    (self._cache_id(record[0]), record[3] if len(record) > 3 else tenant, signer.address)
+                    for record in chunk])
+
+            return self._send_batch(build_function, records, wait, on_mined=record_tenants, tier=tier)
+
+        except ContractLogicError as e:
+            print(f"Contract error: {str(e)}")
+            raise
+
+        except Exception as e:
+            print(f"Error storing data batch on blockchain: {str(e)}")
+            raise
+
+    def grant_access_batch(self, grants, wait=True, tier=None):
+        """
+        Grant access for many (data_id, address) pairs using batch transactions
+
+        Args:
+            grants: List of (data_id, grantee_address) tuples
+            wait: Whether to wait for the transactions to be mined
+            tier: Fee tier, 'fast', 'standard' or 'economy'
+
+        Returns:
+            list of (grants chunk, receipt or transaction hash) tuples, one per transaction
+        """
+        try:
+            grants = [(data_id, Web3.toChecksumAddress(address)) for data_id, address in grants]
+
+            def build_function(chunk):
+                data_ids = [self._encode(data_id) for data_id, _ in chunk]
+                addresses = [address for _, address in chunk]
+                return self.contract.functions.grantAccessBatch(data_ids, addresses)
+
+            return self._send_batch(build_function, grants, wait, by_owner=True, tier=tier)
+
+        except Exception as e:
+            print(f"Error granting access in batch: {str(e)}")
+            raise
+
+    def revoke_access_batch(self, revokes, wait=True, tier=None):
+        """
+        Revoke access for many (data_id, address) pairs using batch transactions
+
+        Args:
+            revokes: List of (data_id, revokee_address) tuples
+            wait: Whether to wait for the transactions to be mined
+            tier: Fee tier, 'fast', 'standard' or 'economy'
+
+        Returns:
+            list of (revokes chunk, receipt or transaction hash) tuples, one per transaction
+        """
+        try:
+            revokes = [(data_id, Web3.toChecksumAddress(address)) for data_id, address in revokes]
+
+            def build_function(chunk):
+                data_ids = [self._encode(data_id) for data_id, _ in chunk]
+                addresses = [address for _, address in chunk]
+                return self.contract.functions.revokeAccessBatch(data_ids, addresses)
+
+            return self._send_batch(build_function, revokes, wait, by_owner=True, tier=tier)
+
+        except Exception as e:
+            print(f"Error revoking access in batch: {str(e)}")
+            raise
+
+    def anchor_merkle_root(self, root, leaf_count, wait=True, tier=ANCHOR_FEE_TIER):
+        """
+        Anchor the Merkle root of a batch of cipher hashes on the blockchain
+
+        Args:
+            root: Hex Merkle root
+            leaf_count: Number of hashes under the root
+            wait: Whether to wait for the transaction to be mined
+            tier: Fee tier (anchoring is latency sensitive, so 'fast' by default)
+
+        Returns:
+            transaction receipt, or the transaction hash if wait is False
+        """
+        try:
+            anchor_function = self.contract.functions.anchorRoot(Web3.toBytes(hexstr=root), leaf_count)
+
+            # Build, sign and send transaction
+            return self._sign_and_send_txn(anchor_function, wait, tier=tier)
+
+        except Exception as e:
+            print(f"Error anchoring Merkle root: {str(e)}")
+            raise
+
+    def get_anchor(self, root):
+        """
+        Look up an anchored Merkle root
+
+        Anchors are immutable once mined, so confirmed roots are cached.
+
+        Args:
+            root: Hex Merkle root
+
+        Returns:
+            dict: leaf_count, timestamp (0 if not anchored) and submitter
+        """
+        if root in self._anchor_cache:
+            return self._anchor_cache[root]
+
+        try:
+            leaf_count, timestamp, submitter = self.contract.functions.getAnchor(
+                Web3.toBytes(hexstr=root)).call()
+
+            anchor = {'root': root, 'leaf_count': leaf_count, 'timestamp': timestamp, 'submitter': submitter}
+            if timestamp > 0:
+                self._anchor_cache[root] = anchor
+
+            return anchor
+
+        except Exception as e:
+            print(f"Error getting Merkle anchor: {str(e)}")
+            raise
+
     def check_access(self, data_id, address):
         """
         Check if an address has access to data
@@ -208,9 +1024,17 @@ class BlockchainService:
             # Ensure address is checksum format
             address = Web3.toChecksumAddress(address)
 
+            # Serve from the read cache when possible
+            key = (self._cache_id(data_id), 'access', address)
+            found, has_access = self.read_cache.get(key, self._cache_ttl())
+            if found:
+                return has_access
+            version = self.read_cache.version()
+
             # Call the checkAccess function on the smart contract
-            has_access = self.contract.functions.checkAccess(data_id, address).call()
+            has_access = self.contract.functions.checkAccess(self._encode(data_id), address).call()
 
+            self.read_cache.set(key, has_access, version)
             return has_access
 
         except Exception as e:
@@ -225,10 +1049,8 @@ class BlockchainService:
             list: List of data IDs
         """
         try:
-            # Call the getAllDataIds function on the smart contract
-            data_ids = self.contract.functions.getAllDataIds().call()
-
-            return data_ids
+            # Page through the IDs instead of copying the whole array in one eth_call
+            return self.get_data_ids_page()
 
         except Exception as e:
             print(f"Error getting all data IDs: {str(e)}")
@@ -245,8 +1067,128 @@ class BlockchainService:
             # Call the getMyDataIds function on the smart contract
             data_ids = self.contract.functions.getMyDataIds().call({'from': self.account.address})
 
-            return data_ids
+            return [self._decode(data_id) for data_id in data_ids]
 
         except Exception as e:
             print(f"Error getting my data IDs: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    def get_data_id_count(self, owner=None):
+        """
+        Get the number of data IDs stored in the contract
+
+        Args:
+            owner: Only count data IDs owned by this address
+
+        Returns:
+            int: number of data IDs
+        """
+        try:
+            if owner:
+                return self.contract.functions.getOwnerDataIdCount(Web3.toChecksumAddress(owner)).call()
+
+            return self.contract.functions.getDataIdCount().call()
+
+        except Exception as e:
+            print(f"Error getting data ID count: {str(e)}")
+            raise
+
+    def get_data_ids_page(self, offset=0, limit=None, owner=None):
+        """
+        Get a page of data IDs using the contract's paginated view functions
+
+        Args:
+            offset: Index of the first data ID to return
+            limit: Maximum number of data IDs (None for all from offset on)
+            owner: Only return data IDs owned by this address
+
+        Returns:
+            list: data IDs
+        """
+        try:
+            if owner:
+                owner = Web3.toChecksumAddress(owner)
+
+            def fetch(page_offset, page_limit):
+                if owner:
+                    page = self.contract.functions.getOwnerDataIds(owner, page_offset, page_limit).call()
+                else:
+                    page = self.contract.functions.getDataIdsPaginated(page_offset, page_limit).call()
+                return [self._decode(data_id) for data_id in page]
+
+            if limit is not None:
+                return fetch(offset, limit)
+
+            # Walk the whole list in bounded pages so no single eth_call hits the gas cap
+            data_ids = []
+            while True:
+                page = fetch(offset + len(data_ids), DATA_ID_PAGE_SIZE)
+                data_ids.extend(page)
+                if len(page) < DATA_ID_PAGE_SIZE:
+                    return data_ids
+
+        except Exception as e:
+            print(f"Error getting data ID page: {str(e)}")
+            raise
+
+
+# Process-wide service shared by all API routes
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_blockchain_service():
+    """
+    Get the shared BlockchainService, creating it on first use
+
+    Returns:
+        BlockchainService instance
+    """
+    global _service
+
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = BlockchainService()
+
+    return _service
+
+
+def refresh_blockchain_service():
+    """
+    Reconnect the shared service to the node, creating it if needed
+
+    Returns:
+        BlockchainService instance
+    """
+    global _service
+
+    with _service_lock:
+        if _service is None:
+            _service = BlockchainService()
+        else:
+            _service.refresh()
+
+    return _service
+
+
+def shutdown_blockchain_service():
+    """Stop background work, drop the shared service and close its pooled HTTP connections"""
+    global _service
+
+    with _service_lock:
+        if _service is not None:
+            _service.receipt_tracker.stop()
+            _service.merkle_anchor.stop()
+            if _service.indexer is not None:
+                _service.indexer.close()
+
+            # Anchor whatever is still queued so no proof is lost
+            try:
+                _service.merkle_anchor.flush()
+            except Exception as e:
+                print(f"Warning: Could not anchor queued hashes on shutdown: {str(e)}")
+            _service.tenants.close()
+        _service = None
+
+    close_http_session()
@@ -1,6 +1,9 @@
 import os
 import json
+import threading
 from pathlib import Path
+import requests
+from requests.adapters import HTTPAdapter
 from web3 import Web3
 from dotenv import load_dotenv
 
@@ -15,22 +18,155 @@ BLOCKCHAIN_PROVIDER = os.getenv('BLOCKCHAIN_PROVIDER', 'http://127.0.0.1:8545')
 CONTRACT_ADDRESS = os.getenv('CONTRACT_ADDRESS', '')  # Fill this from deployment
 PRIVATE_KEY = os.getenv('PRIVATE_KEY', '')  # Account private key for signing transactions
 
+# Pool of signing keys (comma-separated); transactions are spread across them.
+# Falls back to PRIVATE_KEY when not set.
+PRIVATE_KEYS = [key.strip() for key in os.getenv('PRIVATE_KEYS', '').split(',') if key.strip()] or \
+    ([PRIVATE_KEY] if PRIVATE_KEY else [])
+
+# Signer balance checks: cached for SIGNER_BALANCE_TTL seconds, signers below the minimum are skipped
+SIGNER_BALANCE_TTL = float(os.getenv('SIGNER_BALANCE_TTL', '30'))
+SIGNER_MIN_BALANCE_ETH = float(os.getenv('SIGNER_MIN_BALANCE_ETH', '0.01'))
+
+# SQLite database recording which tenant and signer each stored data ID belongs to
+TENANT_DB_PATH = os.getenv('TENANT_DB_PATH', str(BASE_DIR / 'tenant_records.sqlite'))
+
+# Contract layout: 'string' (GeoDataStorage) or 'bytes32' (GeoDataStorageCompact)
+CONTRACT_VARIANT = os.getenv('CONTRACT_VARIANT', 'string').lower()
+CONTRACT_NAMES = {
+    'string': 'GeoDataStorage',
+    'bytes32': 'GeoDataStorageCompact'
+}
+
+# Batch transaction limits: each batch transaction is split so its estimated gas fits the budget
+BATCH_GAS_LIMIT = int(os.getenv('BATCH_GAS_LIMIT', '8000000'))
+MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', '200'))
+
+# Safety margin applied to gas estimates
+GAS_ESTIMATE_MARGIN = float(os.getenv('GAS_ESTIMATE_MARGIN', '1.2'))
+
+# Fee oracle: eth_feeHistory window and cache, memoized gas estimates and default latency tier
+FEE_HISTORY_BLOCKS = int(os.getenv('FEE_HISTORY_BLOCKS', '20'))
+FEE_CACHE_SECONDS = float(os.getenv('FEE_CACHE_SECONDS', '3'))
+GAS_ESTIMATE_TTL = float(os.getenv('GAS_ESTIMATE_TTL', '300'))
+DEFAULT_FEE_TIER = os.getenv('DEFAULT_FEE_TIER', 'standard').lower()
+ANCHOR_FEE_TIER = os.getenv('ANCHOR_FEE_TIER', 'fast').lower()
+
+# Pending transactions are replaced with higher fees after this many seconds (0 disables speed-up)
+SPEEDUP_AFTER_SECONDS = float(os.getenv('SPEEDUP_AFTER_SECONDS', '60'))
+RECEIPT_TIMEOUT = float(os.getenv('RECEIPT_TIMEOUT', '300'))
+
+# Page size used when walking the full data ID list through paginated view calls
+DATA_ID_PAGE_SIZE = int(os.getenv('DATA_ID_PAGE_SIZE', '500'))
+
+# Merkle anchoring window: a root is anchored once this many hashes are queued or the window elapses
+ANCHOR_MAX_LEAVES = int(os.getenv('ANCHOR_MAX_LEAVES', '1000'))
+ANCHOR_WINDOW_SECONDS = float(os.getenv('ANCHOR_WINDOW_SECONDS', '60'))
+
+# Local event index (SQLite) used to answer listings and access checks without RPC calls
+INDEXER_ENABLED = os.getenv('INDEXER_ENABLED', 'true').lower() == 'true'
+INDEX_DB_PATH = os.getenv('INDEX_DB_PATH', str(BASE_DIR / 'chain_index.sqlite'))
+INDEXER_POLL_INTERVAL = float(os.getenv('INDEXER_POLL_INTERVAL', '2'))
+INDEXER_BLOCK_RANGE = int(os.getenv('INDEXER_BLOCK_RANGE', '2000'))
+INDEXER_START_BLOCK = int(os.getenv('INDEXER_START_BLOCK', '0'))
+
+# Blocks this close to the chain head can still be reorganized away, so the index stops short of them
+INDEXER_CONFIRMATIONS = int(os.getenv('INDEXER_CONFIRMATIONS', '2'))
+
+# The index counts as live (and keeps cached reads fresh by invalidating them) while it synced this recently
+INDEXER_STALE_SECONDS = float(os.getenv('INDEXER_STALE_SECONDS', '30'))
+
+# Worker threads that run blocking web3 calls for the async API routes
+BLOCKCHAIN_IO_WORKERS = int(os.getenv('BLOCKCHAIN_IO_WORKERS', '100'))
+
+# Threads besides the I/O workers that make RPC calls (receipt tracker, indexer, anchor flusher, main)
+RPC_BACKGROUND_THREADS = 4
+
+# HTTP connection pool settings for the JSON-RPC provider. The pool must hold a
+# connection per thread that can call the node at once, otherwise urllib3 discards
+# the extra connections ("Connection pool is full") and every call reconnects.
+RPC_POOL_SIZE = int(os.getenv('RPC_POOL_SIZE', str(BLOCKCHAIN_IO_WORKERS + RPC_BACKGROUND_THREADS)))
+RPC_TIMEOUT = float(os.getenv('RPC_TIMEOUT', '30'))
+
+if RPC_POOL_SIZE < BLOCKCHAIN_IO_WORKERS + RPC_BACKGROUND_THREADS:
+    print(f"Warning: RPC_POOL_SIZE ({RPC_POOL_SIZE}) is smaller than BLOCKCHAIN_IO_WORKERS plus "
+          f"{RPC_BACKGROUND_THREADS} background threads; connections beyond the pool will not be reused")
+
+# Maximum number of calls sent in one JSON-RPC batch request
+RPC_BATCH_SIZE = int(os.getenv('RPC_BATCH_SIZE', '100'))
+
+# Read-through cache for retrieveData and checkAccess results (size 0 disables it)
+READ_CACHE_SIZE = int(os.getenv('READ_CACHE_SIZE', '10000'))
+READ_CACHE_TTL = float(os.getenv('READ_CACHE_TTL', '300'))
+
+# Without a live event indexer nothing invalidates cached results, so they expire after this many seconds
+READ_CACHE_UNINDEXED_TTL = float(os.getenv('READ_CACHE_UNINDEXED_TTL', '5'))
+
+# Shared keep-alive session and parsed ABI (created on first use)
+_http_session = None
+_contract_abi = None
+_lock = threading.Lock()
+
+
+def get_http_session():
+    """Return the process-wide pooled keep-alive HTTP session for RPC calls"""
+    global _http_session
+
+    with _lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=RPC_POOL_SIZE, pool_maxsize=RPC_POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _http_session = session
+
+        return _http_session
+
+
+def close_http_session():
+    """Close the pooled HTTP session (called on application shutdown)"""
+    global _http_session
+
+    with _lock:
+        if _http_session is not None:
+            _http_session.close()
+            _http_session = None
+
 
 # Initialize Web3 connection
 def get_web3():
-    """Initialize and return Web3 instance"""
-    return Web3(Web3.HTTPProvider(BLOCKCHAIN_PROVIDER))
+    """Initialize and return Web3 instance backed by the pooled HTTP session"""
+    provider = Web3.HTTPProvider(
+        BLOCKCHAIN_PROVIDER,
+        request_kwargs={'timeout': RPC_TIMEOUT},
+        session=get_http_session()
+    )
+    return Web3(provider)
 
 
 # Load contract ABI from artifact file
-def load_contract_abi():
-    """Load the contract ABI from the Hardhat artifacts"""
-    artifact_path = BASE_DIR / 'smart_contracts' / 'artifacts' / 'contracts' / 'GeoDataStorage.sol' / 'GeoDataStorage.json'
+def load_contract_abi(reload=False):
+    """
+    Load the contract ABI from the Hardhat artifacts
+
+    The parsed ABI is cached after the first read; pass reload=True to
+    re-read the artifact (e.g. after recompiling the contract).
+    """
+    global _contract_abi
+
+    if _contract_abi is not None and not reload:
+        return _contract_abi
+
+    if CONTRACT_VARIANT not in CONTRACT_NAMES:
+        raise ValueError(f"Unknown CONTRACT_VARIANT '{CONTRACT_VARIANT}', expected one of {list(CONTRACT_NAMES)}")
+
+    contract_name = CONTRACT_NAMES[CONTRACT_VARIANT]
+    artifact_path = BASE_DIR / 'smart_contracts' / 'artifacts' / 'contracts' / f'{contract_name}.sol' / f'{contract_name}.json'
 
     try:
         with open(artifact_path) as f:
             contract_json = json.load(f)
-            return contract_json['abi']
+            _contract_abi = contract_json['abi']
+            return _contract_abi
     except FileNotFoundError:
         print(f"Error: Contract artifact not found at {artifact_path}")
         print("Did you compile the contract with 'npx hardhat compile'?")
@@ -47,7 +183,7 @@ def load_contract_abi():
 
 
 # Get contract instance
-def get_contract():
+def get_contract(reload_abi=False):
     """Get the deployed contract instance"""
     web3 = get_web3()
 
@@ -61,7 +197,7 @@ def get_contract():
         print(f"Current block number: {web3.eth.block_number}")
 
         # Get contract ABI
-        abi = load_contract_abi()
+        abi = load_contract_abi(reload=reload_abi)
 
         # Create contract instance
         contract_address = Web3.toChecksumAddress(CONTRACT_ADDRESS)
@@ -0,0 +1,53 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .config import BLOCKCHAIN_IO_WORKERS
+
+
+# Shared executor for blocking blockchain calls (created on first use)
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide bounded executor used for blocking web3 calls"""
+    global _executor
+
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=BLOCKCHAIN_IO_WORKERS,
+                                           thread_name_prefix="blockchain-io")
+
+        return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking blockchain call without stalling the event loop
+
+    The web3 client is synchronous, so calls such as eth_call,
+    send_raw_transaction and wait_for_transaction_receipt are handed to a
+    bounded thread pool and awaited. Requests beyond BLOCKCHAIN_IO_WORKERS
+    queue in the executor instead of blocking other routes.
+
+    Args:
+        func: Blocking callable
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        The return value of func (exceptions are re-raised in the caller)
+    """
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executor(wait=True):
+    """Shut down the executor (called on application shutdown)"""
+    global _executor
+
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
@@ -0,0 +1,222 @@
+import time
+import threading
+from .config import (FEE_HISTORY_BLOCKS, FEE_CACHE_SECONDS, GAS_ESTIMATE_TTL, GAS_ESTIMATE_MARGIN,
+                     DEFAULT_FEE_TIER)
+
+# Latency tiers: priority fee percentile of recent blocks, headroom of the max fee
+# over the next base fee, and gas price multiplier on legacy networks
+FEE_TIERS = {
+    'economy': {'percentile': 10, 'base_fee_multiplier': 1.25, 'legacy_multiplier': 1.0},
+    'standard': {'percentile': 50, 'base_fee_multiplier': 2.0, 'legacy_multiplier': 1.1},
+    'fast': {'percentile': 90, 'base_fee_multiplier': 3.0, 'legacy_multiplier': 1.3},
+}
+
+# Minimum increase nodes accept for a replacement transaction with the same nonce
+REPLACEMENT_BUMP = 1.125
+
+# Fallback priority fee when recent blocks carry no tips (e.g. an idle dev chain)
+MIN_PRIORITY_FEE = 10 ** 9
+
+# Storage slots a call may write for the first time depending on contract state rather
+# than on its arguments: the signer's first ownerDataIds entry and the first dataIds
+# entry for storeData, an access flag that may or may not be set yet for grants and revokes.
+# A memoized estimate may come from the cheaper path, so limits get this headroom.
+STATE_DEPENDENT_SLOTS = {
+    'storeData': 2,
+    'grantAccess': 1,
+    'revokeAccess': 1,
+}
+
+# Extra cost of writing a zero storage slot (SSTORE set) over rewriting a non-zero one
+SSTORE_SET_GAS = 20000
+
+
+class FeeOracle:
+    """
+    Fee and gas limit suggestions for contract transactions
+
+    EIP-1559 fees are derived from eth_feeHistory, which is fetched once per
+    FEE_CACHE_SECONDS and shared by all transactions. Nodes without
+    EIP-1559 support fall back to legacy gas prices. Gas limits come from
+    estimateGas, memoized by function and argument shape so repeated calls
+    such as storeData don't pay an estimate round trip each time. Because
+    the cost of a call also depends on contract state, each limit carries
+    STATE_DEPENDENT_SLOTS headroom, and a transaction that still runs out of
+    gas drops its memoized estimate (see forget).
+    """
+
+    def __init__(self, web3):
+        """
+        Initialize the oracle
+
+        Args:
+            web3: Web3 instance used for fee and gas queries
+        """
+        self.web3 = web3
+        self._lock = threading.Lock()
+        self._history = None
+        self._history_at = 0
+        self._gas_estimates = {}     # call shape -> (estimate, timestamp)
+
+    def _fee_history(self):
+        """Recent base fees and priority fee percentiles, cached for FEE_CACHE_SECONDS"""
+        with self._lock:
+            if self._history is not None and time.time() - self._history_at < FEE_CACHE_SECONDS:
+                return self._history
+
+        percentiles = sorted(tier['percentile'] for tier in FEE_TIERS.values())
+
+        try:
+            history = self.web3.eth.fee_history(FEE_HISTORY_BLOCKS, 'latest', percentiles)
+            base_fees = history['baseFeePerGas']
+            supported = bool(base_fees) and base_fees[-1] is not None
+        except Exception as e:
+            print(f"Fee history unavailable, using legacy gas price: {str(e)}")
+            history, base_fees, supported = None, [], False
+
+        if supported:
+            # Average each percentile's tip over the blocks that had transactions
+            rewards = [block_rewards for block_rewards in history.get('reward') or [] if any(block_rewards)]
+            tips = {}
+            for index, percentile in enumerate(percentiles):
+                values = [block_rewards[index] for block_rewards in rewards]
+                tips[percentile] = max(MIN_PRIORITY_FEE, sum(values) // len(values)) if values else MIN_PRIORITY_FEE
+
+            # The last entry is the base fee of the next block
+            result = {'eip1559': True, 'next_base_fee': base_fees[-1], 'tips': tips}
+        else:
+            result = {'eip1559': False, 'gas_price': self.web3.eth.gas_price}
+
+        with self._lock:
+            self._history = result
+            self._history_at = time.time()
+
+        return result
+
+    def fee_params(self, tier=None):
+        """
+        Fee fields for a transaction
+
+        Args:
+            tier: 'fast', 'standard' or 'economy' (default: DEFAULT_FEE_TIER)
+
+        Returns:
+            dict: maxFeePerGas and maxPriorityFeePerGas, or gasPrice on legacy networks
+        """
+        tier = tier or DEFAULT_FEE_TIER
+        if tier not in FEE_TIERS:
+            raise ValueError(f"Unknown fee tier '{tier}', expected one of {list(FEE_TIERS)}")
+
+        settings = FEE_TIERS[tier]
+        history = self._fee_history()
+
+        if not history['eip1559']:
+            return {'gasPrice': int(history['gas_price'] * settings['legacy_multiplier'])}
+
+        tip = history['tips'][settings['percentile']]
+        return {
+            'maxPriorityFeePerGas': tip,
+            'maxFeePerGas': int(history['next_base_fee'] * settings['base_fee_multiplier']) + tip
+        }
+
+    def replacement_fee_params(self, txn):
+        """
+        Fee fields for replacing a stuck transaction (speed-up)
+
+        The new fees are at least REPLACEMENT_BUMP times the old ones, so the
+        node accepts the replacement, and at least the current 'fast' tier.
+
+        Args:
+            txn: The transaction being replaced
+
+        Returns:
+            dict: fee fields for the replacement
+        """
+        fast = self.fee_params('fast')
+
+        def bumped(value):
+            return int(value * REPLACEMENT_BUMP) + 1
+
+        if 'gasPrice' in txn:
+            return {'gasPrice': max(bumped(txn['gasPrice']), fast.get('gasPrice', fast.get('maxFeePerGas', 0)))}
+
+        return {field: max(bumped(txn[field]), fast.get(field, 0))
+                for field in ('maxPriorityFeePerGas', 'maxFeePerGas')}
+
+    def gas_limit(self, function, sender):
+        """
+        Gas limit for a contract call, memoized by call shape
+
+        Args:
+            function: Contract function call
+            sender: Address the transaction is sent from
+
+        Returns:
+            int: estimated gas plus GAS_ESTIMATE_MARGIN and the state headroom of the function
+        """
+        key = _call_shape(function)
+        headroom = STATE_DEPENDENT_SLOTS.get(function.fn_name, 0) * SSTORE_SET_GAS
+
+        with self._lock:
+            cached = self._gas_estimates.get(key)
+        if cached is not None and time.time() - cached[1] < GAS_ESTIMATE_TTL:
+            return int(cached[0] * GAS_ESTIMATE_MARGIN) + headroom
+
+        estimate = function.estimateGas({'from': sender})
+
+        with self._lock:
+            # Keep the largest estimate seen for the shape so cheaper calls don't lower the limit
+            previous = self._gas_estimates.get(key)
+            if previous is not None and time.time() - previous[1] < GAS_ESTIMATE_TTL:
+                estimate = max(estimate, previous[0])
+            self._gas_estimates[key] = (estimate, time.time())
+
+        return int(estimate * GAS_ESTIMATE_MARGIN) + headroom
+
+    def forget(self, function=None):
+        """
+        Drop memoized gas estimates after a transaction ran out of gas
+
+        Args:
+            function: Contract function call whose shape is dropped (default: all shapes)
+        """
+        with self._lock:
+            if function is None:
+                self._gas_estimates.clear()
+            else:
+                self._gas_estimates.pop(_call_shape(function), None)
+
+    def stats(self):
+        """
+        Current fee suggestions per tier
+
+        Returns:
+            dict: tier -> fee fields, plus the next base fee when known
+        """
+        result = {tier: self.fee_params(tier) for tier in FEE_TIERS}
+        history = self._fee_history()
+        result['next_base_fee'] = history.get('next_base_fee')
+        result['memoized_gas_estimates'] = len(self._gas_estimates)
+        return result
+
+
+def _call_shape(function):
+    """
+    Memoization key of a contract call
+
+    Gas cost depends on the function and on the size of its arguments
+    (batch length, string length in storage slots), not on their values.
+    Solidity keeps strings shorter than 32 bytes in a single slot and longer
+    ones in a length slot plus one slot per 32 bytes, so a 31- and a 32-byte
+    string have different shapes.
+    """
+    shape = []
+    for arg in function.args:
+        if isinstance(arg, (list, tuple)):
+            shape.append(('list', len(arg)))
+        elif isinstance(arg, (str, bytes, bytearray)):
+            shape.append(('bytes', 1 if len(arg) < 32 else 1 + (len(arg) + 31) // 32))
+        else:
+            shape.append(type(arg).__name__)
+
+    return function.fn_name, tuple(shape)
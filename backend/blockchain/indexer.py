@@ -0,0 +1,539 @@
+import time
+import sqlite3
+import threading
+from web3 import Web3
+from web3.exceptions import BlockNotFound
+from .config import (INDEX_DB_PATH, INDEXER_POLL_INTERVAL, INDEXER_BLOCK_RANGE, INDEXER_START_BLOCK,
+                     INDEXER_CONFIRMATIONS, INDEXER_STALE_SECONDS)
+
+
+# Contract events mirrored into the local index
+INDEXED_EVENTS = ('DataStored', 'AccessGranted', 'AccessRevoked')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS data_records (
+    data_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    transaction_hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_records_owner ON data_records (owner);
+CREATE INDEX IF NOT EXISTS idx_records_timestamp ON data_records (timestamp);
+CREATE INDEX IF NOT EXISTS idx_records_order ON data_records (block_number, log_index);
+
+CREATE TABLE IF NOT EXISTS access_grants (
+    data_id TEXT NOT NULL,
+    grantee TEXT NOT NULL,
+    granted INTEGER NOT NULL,
+    block_number INTEGER NOT NULL,
+    PRIMARY KEY (data_id, grantee)
+);
+CREATE INDEX IF NOT EXISTS idx_access_grantee ON access_grants (grantee);
+
+-- Every applied event, so the state tables can be rebuilt when blocks are reorganized away
+CREATE TABLE IF NOT EXISTS events (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    data_id TEXT NOT NULL,
+    address TEXT NOT NULL,
+    timestamp INTEGER,
+    transaction_hash TEXT NOT NULL,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS idx_events_data_id ON events (data_id);
+
+CREATE TABLE IF NOT EXISTS checkpoints (
+    contract_address TEXT PRIMARY KEY,
+    block_number INTEGER NOT NULL,
+    block_hash TEXT
+);
+
+-- Hashes of recently checkpointed blocks, to find where a reorganized chain forked
+CREATE TABLE IF NOT EXISTS block_hashes (
+    contract_address TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    block_hash TEXT NOT NULL,
+    PRIMARY KEY (contract_address, block_number)
+);
+"""
+
+# Bumped when the tables change; the index is rebuilt from the chain instead of migrated
+SCHEMA_VERSION = 1
+
+# Number of checkpointed block hashes kept to find a fork point
+REORG_HISTORY = 64
+
+
+class EventIndexer:
+    """
+    Local SQLite index of GeoDataStorage events
+
+    A background thread follows DataStored, AccessGranted and AccessRevoked
+    logs from the last checkpointed block and mirrors them into SQLite, so
+    data ID listings and access checks can be answered without RPC calls.
+    Only blocks at least `confirmations` deep are indexed, and the
+    checkpoint stores its block hash: if that block is no longer on the
+    chain when indexing resumes, the index is rewound to the newest
+    checkpointed block that still is. Listeners are told about every
+    applied event (and every data ID a rewind touched), e.g. to invalidate caches.
+    """
+
+    def __init__(self, service, db_path=INDEX_DB_PATH, poll_interval=INDEXER_POLL_INTERVAL,
+                 block_range=INDEXER_BLOCK_RANGE, start_block=INDEXER_START_BLOCK,
+                 confirmations=INDEXER_CONFIRMATIONS):
+        """
+        Initialize the indexer
+
+        Args:
+            service: BlockchainService providing the Web3 connection and contract
+            db_path: Path of the SQLite database file
+            poll_interval: Seconds between polls for new blocks
+            block_range: Maximum number of blocks fetched per eth_getLogs call
+            start_block: Block to start from when there is no checkpoint
+            confirmations: Blocks below the chain head left unindexed until they are this deep
+        """
+        self.service = service
+        self.db_path = str(db_path)
+        self.poll_interval = poll_interval
+        self.block_range = block_range
+        self.start_block = start_block
+        self.confirmations = confirmations
+
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._create_schema()
+        self._db_lock = threading.Lock()
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._chain_block = None
+        self._last_synced_at = None
+        self._topics = {}
+        self._topics_contract = None
+        self._listeners = []
+
+    def _create_schema(self):
+        """Create the tables, dropping an index written with an older schema"""
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self._conn.executescript("""
+                DROP TABLE IF EXISTS data_records;
+                DROP TABLE IF EXISTS access_grants;
+                DROP TABLE IF EXISTS events;
+                DROP TABLE IF EXISTS checkpoints;
+                DROP TABLE IF EXISTS block_hashes;
+            """)
+
+        self._conn.executescript(SCHEMA)
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @property
+    def contract_address(self):
+        return self.service.contract.address
+
+    def add_listener(self, callback):
+        """
+        Register a callback for applied events
+
+        Args:
+            callback: Called with a list of dicts (event, data_id, address) after
+                      each range of blocks is committed to the index
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, changes):
+        """Pass applied events to the listeners"""
+        for callback in self._listeners:
+            try:
+                callback(changes)
+            except Exception as e:
+                print(f"Event indexer listener error: {str(e)}")
+
+    def start(self):
+        """Start following contract events in the background"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="event-indexer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval * 2)
+            self._thread = None
+
+    def close(self):
+        """Stop indexing and close the database"""
+        self.stop()
+        with self._db_lock:
+            self._conn.close()
+
+    def _run(self):
+        """Polling loop"""
+        while not self._stop_event.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"Event indexer error: {str(e)}")
+
+            self._stop_event.wait(self.poll_interval)
+
+    def checkpoint(self):
+        """Last block fully indexed for the current contract, or None"""
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT block_number FROM checkpoints WHERE contract_address = ?",
+                (self.contract_address,)).fetchone()
+        return row[0] if row else None
+
+    def sync(self):
+        """
+        Index all events up to `confirmations` blocks below the chain head
+
+        Returns:
+            int: number of events applied
+        """
+        web3 = self.service.web3
+        head = web3.eth.block_number
+        self._chain_block = head
+
+        # Blocks closer to the head can still be reorganized away; they are indexed on a later poll
+        safe_head = head - self.confirmations
+
+        checkpoint = self._verified_checkpoint()
+        from_block = self.start_block if checkpoint is None else checkpoint + 1
+        applied = 0
+
+        while from_block <= safe_head:
+            to_block = min(from_block + self.block_range - 1, safe_head)
+            block_hash = self._block_hash(to_block)
+            logs = web3.eth.get_logs({
+                'address': self.contract_address,
+                'fromBlock': from_block,
+                'toBlock': to_block
+            })
+
+            # The logs only match the hash if the chain didn't change while they were fetched
+            if block_hash is None or self._block_hash(to_block) != block_hash:
+                print(f"Event indexer: block {to_block} changed while indexing, retrying on the next poll")
+                break
+
+            events = [self._decode(log) for log in logs]
+            changes = self._apply([event for event in events if event is not None], to_block, block_hash)
+            if changes:
+                self._notify(changes)
+
+            applied += len(logs)
+            from_block = to_block + 1
+
+        self._last_synced_at = time.time()
+        return applied
+
+    def _block_hash(self, block_number):
+        """Hex hash of a block on the current chain, or None if the chain has no such block"""
+        try:
+            block = self.service.web3.eth.get_block(block_number)
+        except BlockNotFound:
+            return None
+        return block['hash'].hex() if block else None
+
+    def _verified_checkpoint(self):
+        """
+        Last indexed block, after rewinding the index if that block was reorganized away
+
+        Returns:
+            int: block to resume after, or None to start from start_block
+        """
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT block_number, block_hash FROM checkpoints WHERE contract_address = ?",
+                (self.contract_address,)).fetchone()
+        if row is None:
+            return None
+
+        block_number, block_hash = row
+        if block_hash is not None and self._block_hash(block_number) == block_hash:
+            return block_number
+
+        # Step 1: find the newest checkpointed block that is still on the chain
+        with self._db_lock:
+            history = self._conn.execute(
+                """SELECT block_number, block_hash FROM block_hashes
+                   WHERE contract_address = ? AND block_number < ? ORDER BY block_number DESC""",
+                (self.contract_address, block_number)).fetchall()
+
+        fork_block = None
+        for number, known_hash in history:
+            if self._block_hash(number) == known_hash:
+                fork_block = number
+                break
+
+        # Step 2: drop everything indexed after it
+        print(f"Event indexer: block {block_number} is no longer on the chain, rewinding to "
+              f"{fork_block if fork_block is not None else 'the start block'}")
+        changes = self._rewind(fork_block)
+        if changes:
+            self._notify(changes)
+
+        return fork_block
+
+    def _rewind(self, fork_block):
+        """
+        Remove events after a block and rebuild the state of the data IDs they touched
+
+        Args:
+            fork_block: Last block to keep, or None to clear the index
+
+        Returns:
+            list: one Reorg change per affected data ID
+        """
+        cutoff = -1 if fork_block is None else fork_block
+
+        with self._db_lock, self._conn:
+            affected = [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT data_id FROM events WHERE block_number > ?", (cutoff,))]
+
+            self._conn.execute("DELETE FROM events WHERE block_number > ?", (cutoff,))
+            self._conn.execute(
+                "DELETE FROM block_hashes WHERE contract_address = ? AND block_number > ?",
+                (self.contract_address, cutoff))
+
+            for data_id in affected:
+                self._rebuild(data_id)
+
+            if fork_block is None:
+                self._conn.execute(
+                    "DELETE FROM checkpoints WHERE contract_address = ?", (self.contract_address,))
+            else:
+                self._conn.execute(
+                    """UPDATE checkpoints SET block_number = ?,
+                       block_hash = (SELECT block_hash FROM block_hashes
+                                     WHERE contract_address = ? AND block_number = ?)
+                       WHERE contract_address = ?""",
+                    (fork_block, self.contract_address, fork_block, self.contract_address))
+
+        return [{'event': 'Reorg', 'data_id': data_id, 'address': None} for data_id in affected]
+
+    def _rebuild(self, data_id):
+        """Recompute a data ID's record and grants from its remaining events (caller holds the lock)"""
+        events = self._conn.execute(
+            """SELECT event, address, timestamp, block_number, log_index, transaction_hash
+               FROM events WHERE data_id = ? ORDER BY block_number, log_index""",
+            (data_id,)).fetchall()
+
+        stores = [event for event in events if event[0] == 'DataStored']
+        self._conn.execute("DELETE FROM data_records WHERE data_id = ?", (data_id,))
+        if stores:
+            first, last = stores[0], stores[-1]
+            self._conn.execute(
+                """INSERT INTO data_records
+                   (data_id, owner, timestamp, block_number, log_index, transaction_hash)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (data_id, first[1], last[2], first[3], first[4], first[5]))
+
+        # The latest grant or revoke per grantee wins
+        grants = {}
+        for event, address, _, block_number, _, _ in events:
+            if event in ('AccessGranted', 'AccessRevoked'):
+                grants[address] = (1 if event == 'AccessGranted' else 0, block_number)
+
+        self._conn.execute("DELETE FROM access_grants WHERE data_id = ?", (data_id,))
+        self._conn.executemany(
+            "INSERT INTO access_grants (data_id, grantee, granted, block_number) VALUES (?, ?, ?, ?)",
+            [(data_id, grantee, granted, block_number) for grantee, (granted, block_number) in grants.items()])
+
+    def _event_topics(self):
+        """Map of event signature topic -> contract event, rebuilt if the contract changes"""
+        contract = self.service.contract
+        if self._topics_contract is not contract:
+            self._topics = {}
+            for name in INDEXED_EVENTS:
+                event = getattr(contract.events, name)()
+                self._topics[Web3.keccak(text=_event_signature(event.abi))] = event
+            self._topics_contract = contract
+
+        return self._topics
+
+    def _decode(self, log):
+        """Decode a raw log into an event, or None if it is not an indexed event"""
+        if not log['topics']:
+            return None
+
+        event = self._event_topics().get(log['topics'][0])
+        return event.processLog(log) if event is not None else None
+
+    def _apply(self, events, to_block, block_hash):
+        """
+        Apply decoded events and move the checkpoint in one SQLite transaction
+
+        Returns:
+            list: applied events as dicts of event name, data ID and address
+        """
+        changes = []
+        with self._db_lock, self._conn:
+            for event in events:
+                args = dict(event['args'])
+
+                # The compact contract emits bytes32 IDs; the index always stores hex
+                if isinstance(args['dataId'], (bytes, bytearray)):
+                    args['dataId'] = args['dataId'].hex()
+
+                if event['event'] == 'AccessGranted':
+                    address = args['grantee']
+                elif event['event'] == 'AccessRevoked':
+                    address = args['revokee']
+                else:
+                    address = args['owner']
+
+                self._conn.execute(
+                    """INSERT OR REPLACE INTO events
+                       (block_number, log_index, event, data_id, address, timestamp, transaction_hash)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    (event['blockNumber'], event['logIndex'], event['event'], args['dataId'], address,
+                     args.get('timestamp'), event['transactionHash'].hex()))
+
+                if event['event'] == 'DataStored':
+                    # DataStored is emitted by both storeData and updateData
+                    self._conn.execute(
+                        """INSERT INTO data_records
+                           (data_id, owner, timestamp, block_number, log_index, transaction_hash)
+                           VALUES (?, ?, ?, ?, ?, ?)
+                           ON CONFLICT (data_id) DO UPDATE SET timestamp = excluded.timestamp""",
+                        (args['dataId'], args['owner'], args['timestamp'], event['blockNumber'],
+                         event['logIndex'], event['transactionHash'].hex()))
+                    changes.append({'event': event['event'], 'data_id': args['dataId'], 'address': args['owner']})
+
+                else:
+                    self._conn.execute(
+                        """INSERT OR REPLACE INTO access_grants (data_id, grantee, granted, block_number)
+                           VALUES (?, ?, ?, ?)""",
+                        (args['dataId'], address, 1 if event['event'] == 'AccessGranted' else 0,
+                         event['blockNumber']))
+                    changes.append({'event': event['event'], 'data_id': args['dataId'], 'address': address})
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (contract_address, block_number, block_hash) VALUES (?, ?, ?)",
+                (self.contract_address, to_block, block_hash))
+
+            # Remember recent checkpoints, so a reorg only rewinds to where the chains forked
+            self._conn.execute(
+                "INSERT OR REPLACE INTO block_hashes (contract_address, block_number, block_hash) VALUES (?, ?, ?)",
+                (self.contract_address, to_block, block_hash))
+            self._conn.execute(
+                """DELETE FROM block_hashes WHERE contract_address = ? AND block_number NOT IN
+                   (SELECT block_number FROM block_hashes WHERE contract_address = ?
+                    ORDER BY block_number DESC LIMIT ?)""",
+                (self.contract_address, self.contract_address, REORG_HISTORY))
+
+        return changes
+
+    def is_ready(self):
+        """Whether the index has caught up with the chain at least once"""
+        return self._last_synced_at is not None
+
+    def is_live(self):
+        """Whether the background thread is following the chain, so listeners hear about new events"""
+        return (self._thread is not None and self._thread.is_alive() and self._last_synced_at is not None
+                and time.time() - self._last_synced_at <= max(INDEXER_STALE_SECONDS, self.poll_interval * 2))
+
+    def freshness(self):
+        """
+        Describe how up to date the index is
+
+        Returns:
+            dict: indexed block, last known chain block, lag in blocks (including the
+            confirmation depth) and seconds since last sync
+        """
+        indexed_block = self.checkpoint()
+        lag_blocks = None
+        if indexed_block is not None and self._chain_block is not None:
+            lag_blocks = max(0, self._chain_block - indexed_block)
+
+        return {
+            'source': 'index',
+            'indexed_block': indexed_block,
+            'chain_block': self._chain_block,
+            'lag_blocks': lag_blocks,
+            'confirmations': self.confirmations,
+            'seconds_since_sync': round(time.time() - self._last_synced_at, 3) if self._last_synced_at else None
+        }
+
+    def get_data_ids(self, owner=None, offset=0, limit=None):
+        """
+        List indexed data IDs in the order they were stored
+
+        Args:
+            owner: Only return IDs owned by this address
+            offset: Number of IDs to skip
+            limit: Maximum number of IDs to return (None for all)
+
+        Returns:
+            list: data IDs
+        """
+        query = "SELECT data_id FROM data_records"
+        params = []
+        if owner:
+            query += " WHERE owner = ?"
+            params.append(Web3.toChecksumAddress(owner))
+        query += " ORDER BY block_number, log_index LIMIT ? OFFSET ?"
+        params.extend([limit if limit is not None else -1, offset])
+
+        with self._db_lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        return [row[0] for row in rows]
+
+    def count_data_ids(self, owner=None):
+        """Number of indexed data IDs (optionally only those owned by an address)"""
+        with self._db_lock:
+            if owner:
+                row = self._conn.execute(
+                    "SELECT COUNT(*) FROM data_records WHERE owner = ?",
+                    (Web3.toChecksumAddress(owner),)).fetchone()
+            else:
+                row = self._conn.execute("SELECT COUNT(*) FROM data_records").fetchone()
+
+        return row[0]
+
+    def get_owner(self, data_id):
+        """Owner address of an indexed data ID, or None if it is not in the index"""
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT owner FROM data_records WHERE data_id = ?", (data_id,)).fetchone()
+
+        return row[0] if row else None
+
+    def check_access(self, data_id, address):
+        """
+        Check access from the index
+
+        Args:
+            data_id: Unique identifier for the data
+            address: Ethereum address to check
+
+        Returns:
+            bool, or None if the data ID is not in the index
+        """
+        address = Web3.toChecksumAddress(address)
+
+        with self._db_lock:
+            record = self._conn.execute(
+                "SELECT owner FROM data_records WHERE data_id = ?", (data_id,)).fetchone()
+            if record is None:
+                return None
+
+            grant = self._conn.execute(
+                "SELECT granted FROM access_grants WHERE data_id = ? AND grantee = ?",
+                (data_id, address)).fetchone()
+
+        return record[0] == address or bool(grant and grant[0])
+
+
+def _event_signature(event_abi):
+    """Canonical signature of an event ABI, e.g. DataStored(string,address,uint256)"""
+    types = ','.join(arg['type'] for arg in event_abi['inputs'])
+    return f"{event_abi['name']}({types})"
@@ -0,0 +1,123 @@
+import threading
+
+
+# Substrings of node error messages that mean our local nonce view is stale
+NONCE_ERRORS = (
+    'nonce too low',
+    'nonce is too low',
+    'already known',
+    'known transaction',
+    'replacement transaction underpriced',
+    'nonce has already been used',
+)
+
+
+def is_nonce_error(error):
+    """Check whether an exception raised by the node is a nonce conflict"""
+    message = str(error).lower()
+    return any(pattern in message for pattern in NONCE_ERRORS)
+
+
+class NonceManager:
+    """
+    Thread-safe local nonce allocator for a single signing account
+
+    Nonces are reserved in-process so several transactions can be built and
+    broadcast without waiting for the previous receipt. The allocator syncs
+    with the node's pending transaction count on first use and whenever a
+    nonce conflict or gap is detected.
+    """
+
+    def __init__(self, web3, address, broadcast_nonces=None):
+        """
+        Initialize the nonce manager
+
+        Args:
+            web3: Web3 instance used to query the transaction count
+            address: Checksum address of the signing account
+            broadcast_nonces: Optional callable returning the nonces of transactions
+                broadcast but not yet mined, which must never be handed out again
+        """
+        self.web3 = web3
+        self.address = address
+        self._broadcast_nonces = broadcast_nonces or (lambda: ())
+        self._lock = threading.Lock()
+        self._next_nonce = None
+        self._reserved = set()   # allocated but not yet broadcast
+        self._released = []      # gaps to be reused before new nonces
+
+    def _chain_nonce(self):
+        """Get the next nonce according to the node (including pending transactions)"""
+        return self.web3.eth.get_transaction_count(self.address, 'pending')
+
+    def allocate(self):
+        """
+        Reserve the next nonce for a new transaction
+
+        Returns:
+            int: nonce to use
+        """
+        with self._lock:
+            if self._next_nonce is None:
+                self._next_nonce = self._chain_nonce()
+
+            # Fill gaps left by failed sends first so later transactions don't stall
+            if self._released:
+                self._released.sort()
+                nonce = self._released.pop(0)
+            else:
+                nonce = self._next_nonce
+                self._next_nonce += 1
+
+            self._reserved.add(nonce)
+            return nonce
+
+    def confirm(self, nonce):
+        """Mark a reserved nonce as broadcast to the network"""
+        with self._lock:
+            self._reserved.discard(nonce)
+
+    def release(self, nonce):
+        """
+        Return a reserved nonce whose transaction was never broadcast
+
+        Args:
+            nonce: Nonce previously returned by allocate()
+        """
+        with self._lock:
+            self._reserved.discard(nonce)
+            if self._next_nonce is not None and nonce == self._next_nonce - 1:
+                self._next_nonce -= 1
+            elif nonce not in self._released:
+                self._released.append(nonce)
+
+    def resync(self):
+        """
+        Resynchronize with the node after a nonce conflict
+
+        Nonces below the node's pending count are discarded. Nonces between the
+        pending count and our local counter that are neither reserved nor
+        broadcast are gaps and will be reused by the next allocations. The node's
+        pending count stops at the first gap, so broadcast transactions queued
+        behind it are excluded explicitly rather than sent again.
+        """
+        with self._lock:
+            chain_nonce = self._chain_nonce()
+            local_nonce = self._next_nonce if self._next_nonce is not None else chain_nonce
+            broadcast = set(self._broadcast_nonces())
+
+            self._released = [n for n in self._released if n >= chain_nonce and n not in broadcast]
+
+            for nonce in range(chain_nonce, local_nonce):
+                if nonce not in self._reserved and nonce not in self._released and nonce not in broadcast:
+                    self._released.append(nonce)
+
+            self._next_nonce = max(chain_nonce, local_nonce)
+            print(f"Nonce manager resynced for {self.address}: next nonce {self._next_nonce}")
+
+    def reset(self):
+        """Forget all local state; the next allocation re-reads the nonce from the node"""
+        with self._lock:
+            self._next_nonce = None
+            self._reserved.clear()
+            self._released = []
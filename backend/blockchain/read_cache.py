@@ -0,0 +1,141 @@
+import time
+import threading
+from collections import OrderedDict
+from .config import READ_CACHE_SIZE, READ_CACHE_TTL
+
+
+class ReadCache:
+    """
+    Bounded LRU cache with a time-to-live for contract view call results
+
+    Keys are tuples whose first element is the data ID, so every entry
+    belonging to a data ID can be dropped when one of its events arrives.
+    A version counter is bumped on every invalidation; a result fetched
+    before an invalidation is not stored afterwards, so a slow call racing
+    with an event can't put a stale value back. Callers pass a shorter ttl
+    to get when nothing is invalidating entries.
+    """
+
+    def __init__(self, max_entries=READ_CACHE_SIZE, ttl=READ_CACHE_TTL):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum number of cached results (least recently used are evicted)
+            ttl: Seconds a cached result stays valid
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (stored_at, value)
+        self._keys_by_id = {}           # data ID -> set of keys
+        self._version = 0               # bumped on every invalidation
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def version(self):
+        """Current invalidation version (read it before fetching, pass it back to set)"""
+        with self._lock:
+            return self._version
+
+    def get(self, key, ttl=None):
+        """
+        Look up a cached result
+
+        Args:
+            key: Tuple starting with the data ID
+            ttl: Maximum age in seconds accepted for this lookup (default: the cache's ttl)
+
+        Returns:
+            tuple: (found, value)
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] + ttl < time.time():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def set(self, key, value, version=None):
+        """
+        Cache a result
+
+        Args:
+            key: Tuple starting with the data ID
+            value: Result to cache
+            version: Version read before the result was fetched; the result is
+                     dropped if anything was invalidated in the meantime
+        """
+        data_id = key[0]
+
+        with self._lock:
+            if self.max_entries <= 0 or (version is not None and version != self._version):
+                return
+
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            self._keys_by_id.setdefault(data_id, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, data_id):
+        """
+        Drop every cached result of a data ID
+
+        Args:
+            data_id: Data ID whose records or access flags changed
+        """
+        with self._lock:
+            self._version += 1
+            for key in self._keys_by_id.pop(data_id, ()):
+                self._entries.pop(key, None)
+            self.invalidations += 1
+
+    def clear(self):
+        """Drop all cached results (e.g. after switching contracts)"""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._keys_by_id.clear()
+
+    def _remove(self, key):
+        """Remove one entry (caller holds the lock)"""
+        self._entries.pop(key, None)
+        keys = self._keys_by_id.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_id[key[0]]
+
+    def stats(self):
+        """
+        Hit/miss counters
+
+        Returns:
+            dict: entries, hits, misses, hit_rate, evictions and invalidations
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,271 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from .config import SPEEDUP_AFTER_SECONDS, RECEIPT_TIMEOUT
+
+
+class ReceiptTracker:
+    """
+    Background tracker for submitted transactions
+
+    Transactions submitted without waiting are registered as jobs. A single
+    polling thread checks the node for new blocks and, when one arrives,
+    fetches the receipts of all pending transactions in JSON-RPC batches and
+    records the block number, gas used and status of each. Jobs still
+    pending after SPEEDUP_AFTER_SECONDS are replaced with higher fees.
+
+    A job is marked 'dropped' when its nonce was mined by a transaction
+    that isn't one of its hashes (replaced outside speed_up), or when it is
+    still pending after RECEIPT_TIMEOUT and the node no longer knows any of
+    its hashes.
+    """
+
+    def __init__(self, service, poll_interval=1.0, max_jobs=10000):
+        """
+        Initialize the tracker
+
+        Args:
+            service: BlockchainService whose Web3 connection is used for polling
+            poll_interval: Seconds between checks for a new block
+            max_jobs: Maximum number of finished jobs kept in memory
+        """
+        self.service = service
+        self.poll_interval = poll_interval
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._last_block = None
+
+    def start(self):
+        """Start the polling thread if it is not already running"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop_event.clear()
+                self._thread = threading.Thread(target=self._run, name="receipt-tracker", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Stop the polling thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval * 2)
+            self._thread = None
+
+    def track(self, tx_hash, kind, details=None):
+        """
+        Register a submitted transaction as a job
+
+        Args:
+            tx_hash: Transaction hash returned by the node
+            kind: Type of operation (e.g. 'store', 'grant', 'revoke')
+            details: Extra fields to return with the job status
+
+        Returns:
+            str: job ID
+        """
+        job_id = uuid.uuid4().hex
+
+        # The sender and nonce let the poller notice when the nonce is used by another transaction
+        signer, entry = self.service.signer_pool.find(tx_hash)
+
+        job = {
+            'job_id': job_id,
+            'kind': kind,
+            'transaction_hash': tx_hash.hex() if hasattr(tx_hash, 'hex') else tx_hash,
+            'status': 'pending',
+            'submitted_at': time.time(),
+            'confirmed_at': None,
+            'block_number': None,
+            'gas_used': None,
+            'error': None,
+            'replaced': [],
+            'sender': signer.address if signer else None,
+            'nonce': entry['txn']['nonce'] if entry else None,
+            'gas_limit': entry['txn'].get('gas') if entry else None,
+            'last_sent_at': time.time(),
+            'details': details or {}
+        }
+
+        with self._lock:
+            self._jobs[job_id] = job
+            self._pending.add(job_id)
+            self._evict()
+
+        self.start()
+        return job_id
+
+    def get(self, job_id):
+        """Get a copy of a job's status, or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def get_many(self, job_ids):
+        """
+        Get the status of several jobs
+
+        Returns:
+            dict: job ID -> job status (None for unknown IDs)
+        """
+        with self._lock:
+            return {job_id: dict(self._jobs[job_id]) if job_id in self._jobs else None
+                    for job_id in job_ids}
+
+    def pending_count(self):
+        """Number of jobs still waiting for a receipt"""
+        with self._lock:
+            return len(self._pending)
+
+    def _evict(self):
+        """Drop the oldest finished jobs once the job table is full"""
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+
+        for job_id in list(self._jobs.keys()):
+            if excess <= 0:
+                break
+            if job_id not in self._pending:
+                del self._jobs[job_id]
+                excess -= 1
+
+    def _run(self):
+        """Polling loop"""
+        while not self._stop_event.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Receipt tracker error: {str(e)}")
+
+            self._stop_event.wait(self.poll_interval)
+
+    def poll(self):
+        """Check all pending jobs once a new block has been mined"""
+        with self._lock:
+            pending = [dict(self._jobs[job_id], hashes=[self._jobs[job_id]['transaction_hash']] +
+                            self._jobs[job_id]['replaced'])
+                       for job_id in self._pending]
+
+        if not pending:
+            return
+
+        # Receipts can only appear with a new block, so skip polling until one arrives
+        web3 = self.service.web3
+        block_number = web3.eth.block_number
+        if block_number == self._last_block:
+            return
+        self._last_block = block_number
+
+        # Mined nonces are read before the receipts: a nonce below them whose
+        # receipt is then missing was used by some other transaction
+        mined_nonces = {}
+        for sender in {job['sender'] for job in pending if job['sender']}:
+            try:
+                mined_nonces[sender] = web3.eth.get_transaction_count(sender, 'latest')
+            except Exception as e:
+                print(f"Error reading the nonce of {sender}: {str(e)}")
+
+        receipts = self.service.get_transaction_receipts([tx_hash for job in pending for tx_hash in job['hashes']])
+
+        now = time.time()
+        expired = []
+        for job in pending:
+            receipt = next((receipts[tx_hash] for tx_hash in job['hashes'] if tx_hash in receipts), None)
+
+            if receipt is not None:
+                self._record_receipt(job['job_id'], receipt)
+            elif job['nonce'] is not None and mined_nonces.get(job['sender'], -1) > job['nonce']:
+                self._drop(job, 'Nonce used by another transaction', release_nonce=False)
+            elif now - job['submitted_at'] >= RECEIPT_TIMEOUT:
+                expired.append(job)
+            elif SPEEDUP_AFTER_SECONDS and now - job['last_sent_at'] >= SPEEDUP_AFTER_SECONDS:
+                self._speed_up(job['job_id'], job['hashes'][0])
+
+        if expired:
+            self._expire(expired)
+
+    def _expire(self, jobs):
+        """Drop timed-out jobs that the node has forgotten; the others stay pending"""
+        calls = [('eth_getTransactionByHash', [tx_hash]) for job in jobs for tx_hash in job['hashes']]
+        replies = self.service.rpc_batch(calls)
+        if replies is None:
+            return
+
+        known = {params[0] for (_, params), reply in zip(calls, replies) if reply.get('result')}
+        for job in jobs:
+            if not known.intersection(job['hashes']):
+                self._drop(job, f"Not known to the node after {RECEIPT_TIMEOUT:.0f} seconds", release_nonce=True)
+
+    def _drop(self, job, reason, release_nonce):
+        """
+        Mark a job as dropped and stop tracking its transaction
+
+        Args:
+            job: Snapshot of the pending job
+            reason: Error recorded on the job
+            release_nonce: Hand the nonce back to the signer, since no transaction used it
+        """
+        with self._lock:
+            current = self._jobs.get(job['job_id'])
+            if current is None or job['job_id'] not in self._pending:
+                return
+
+            current['status'] = 'dropped'
+            current['error'] = reason
+            current['confirmed_at'] = time.time()
+            self._pending.discard(job['job_id'])
+
+        print(f"Transaction {job['transaction_hash']} dropped: {reason}")
+
+        signer = self.service.signer_pool.for_address(job['sender']) if job['sender'] else None
+        if signer is not None and signer.record_dropped(job['transaction_hash']) is not None and release_nonce:
+            signer.nonce_manager.release(job['nonce'])
+
+    def _speed_up(self, job_id, tx_hash):
+        """Replace a stuck job's transaction with higher fees"""
+        try:
+            new_hash = self.service.speed_up(tx_hash)
+        except Exception as e:
+            print(f"Error speeding up {tx_hash}: {str(e)}")
+            new_hash = None
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+
+            # Wait another full period before the next attempt either way
+            job['last_sent_at'] = time.time()
+            if new_hash is not None:
+                job['replaced'].append(job['transaction_hash'])
+                job['transaction_hash'] = new_hash.hex()
+
+    def _record_receipt(self, job_id, receipt):
+        """Store the outcome of a mined transaction"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+
+            job['status'] = 'confirmed' if receipt.status == 1 else 'failed'
+            job['block_number'] = receipt.blockNumber
+            job['gas_used'] = receipt.gasUsed
+            job['confirmed_at'] = time.time()
+            out_of_gas = receipt.status != 1 and job['gas_limit'] and receipt.gasUsed >= job['gas_limit']
+            if receipt.status != 1:
+                job['error'] = 'Out of gas' if out_of_gas else 'Transaction reverted'
+
+            self._pending.discard(job_id)
+            job['transaction_hash'] = receipt.transactionHash.hex()
+            tx_hash = job['transaction_hash']
+
+        # Credit the transaction to the pool signer that sent it
+        self.service.signer_pool.record_receipt(tx_hash, receipt)
+
+        # The memoized gas limit was too low for the current contract state
+        if out_of_gas:
+            self.service.fee_oracle.forget()
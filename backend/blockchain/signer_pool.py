@@ -0,0 +1,433 @@
+import time
+import sqlite3
+import threading
+from collections import deque
+from web3 import Web3
+from .config import SIGNER_BALANCE_TTL, SIGNER_MIN_BALANCE_ETH, TENANT_DB_PATH
+from .nonce_manager import NonceManager
+
+# Window over which per-signer throughput is reported
+THROUGHPUT_WINDOW_SECONDS = 60
+
+
+class Signer:
+    """
+    One signing account of the pool with its own nonce sequence
+
+    Keeps the transactions broadcast but not yet mined (the backlog), a
+    cached balance and counters for throughput metrics.
+    """
+
+    def __init__(self, web3, private_key):
+        """
+        Initialize the signer
+
+        Args:
+            web3: Web3 instance used for nonce and balance queries
+            private_key: Private key of the account
+        """
+        self.web3 = web3
+        self.account = web3.eth.account.from_key(private_key)
+        self.address = self.account.address
+        self.key = private_key
+        self.nonce_manager = NonceManager(web3, self.address, self.pending_nonces)
+
+        self._lock = threading.Lock()
+        self._in_flight = {}            # nonce -> {'txn', 'hashes', 'sent_at'}
+        self._nonce_by_hash = {}        # tx hash (including replaced ones) -> nonce
+        self._sent_times = deque()      # broadcast timestamps within the throughput window
+        self._balance = None
+        self._balance_at = 0
+
+        self.sent = 0
+        self.confirmed = 0
+        self.failed = 0
+        self.gas_used = 0
+        self.replaced = 0
+
+    def backlog(self):
+        """Number of broadcast transactions still waiting to be mined"""
+        with self._lock:
+            return len(self._in_flight)
+
+    def pending_nonces(self):
+        """Nonces of the broadcast transactions still waiting to be mined"""
+        with self._lock:
+            return list(self._in_flight)
+
+    def record_sent(self, tx_hash, txn, on_mined=None):
+        """
+        Register a broadcast transaction (kept so it can be replaced if it gets stuck)
+
+        Args:
+            tx_hash: Hash returned by the node
+            txn: The signed transaction's fields
+            on_mined: Optional callback run once any version of the transaction is
+                mined successfully (not if it reverts or is dropped)
+        """
+        now = time.time()
+        with self._lock:
+            self._in_flight[txn['nonce']] = {'txn': txn, 'hashes': [_hash_key(tx_hash)], 'sent_at': now,
+                                             'on_mined': on_mined}
+            self._nonce_by_hash[_hash_key(tx_hash)] = txn['nonce']
+            self._sent_times.append(now)
+            self.sent += 1
+
+    def in_flight(self, tx_hash):
+        """
+        Look up a pending transaction by any of its hashes
+
+        Returns:
+            dict: txn, hashes and sent_at, or None if it was mined or isn't ours
+        """
+        with self._lock:
+            nonce = self._nonce_by_hash.get(_hash_key(tx_hash))
+            entry = self._in_flight.get(nonce) if nonce is not None else None
+            return dict(entry, hashes=list(entry['hashes'])) if entry else None
+
+    def record_replacement(self, tx_hash, new_hash, new_txn):
+        """Register a replacement broadcast with the same nonce as tx_hash"""
+        with self._lock:
+            nonce = self._nonce_by_hash.get(_hash_key(tx_hash))
+            entry = self._in_flight.get(nonce) if nonce is not None else None
+            if entry is None:
+                return
+
+            entry['txn'] = new_txn
+            entry['hashes'].append(_hash_key(new_hash))
+            entry['sent_at'] = time.time()
+            self._nonce_by_hash[_hash_key(new_hash)] = nonce
+            self.replaced += 1
+
+    def _forget(self, nonce):
+        """Drop a pending transaction and all of its hashes (caller holds the lock)"""
+        entry = self._in_flight.pop(nonce, None)
+        if entry is not None:
+            for tx_hash in entry['hashes']:
+                self._nonce_by_hash.pop(tx_hash, None)
+        return entry
+
+    def record_receipt(self, tx_hash, receipt):
+        """
+        Register a mined transaction
+
+        Returns:
+            bool: True if the transaction was sent by this signer
+        """
+        with self._lock:
+            nonce = self._nonce_by_hash.get(_hash_key(tx_hash))
+            entry = self._forget(nonce) if nonce is not None else None
+            if entry is None:
+                return False
+
+            if receipt.status == 1:
+                self.confirmed += 1
+            else:
+                self.failed += 1
+            self.gas_used += receipt.gasUsed
+
+        if receipt.status == 1 and entry['on_mined'] is not None:
+            try:
+                entry['on_mined']()
+            except Exception as e:
+                print(f"Error handling mined transaction {_hash_key(tx_hash)}: {str(e)}")
+        return True
+
+    def record_dropped(self, tx_hash):
+        """
+        Stop tracking a transaction that will never be mined
+
+        Returns:
+            int: its nonce, or None if it wasn't pending
+        """
+        with self._lock:
+            nonce = self._nonce_by_hash.get(_hash_key(tx_hash))
+            if nonce is None or self._forget(nonce) is None:
+                return None
+
+            self.failed += 1
+            return nonce
+
+    def reconcile(self):
+        """
+        Drop backlog entries that were mined without a receipt being seen
+
+        Every in-flight nonce below the account's mined transaction count has
+        been included in a block (e.g. a transaction sent without waiting and
+        never tracked).
+        """
+        mined_nonce = self.web3.eth.get_transaction_count(self.address, 'latest')
+        with self._lock:
+            for nonce in list(self._in_flight):
+                if nonce < mined_nonce:
+                    self._forget(nonce)
+        return mined_nonce
+
+    def balance(self, refresh=False):
+        """
+        Account balance in wei, cached for SIGNER_BALANCE_TTL seconds
+
+        Args:
+            refresh: Query the node even if the cached value is still fresh
+        """
+        if refresh or self._balance is None or time.time() - self._balance_at > SIGNER_BALANCE_TTL:
+            self._balance = self.web3.eth.get_balance(self.address)
+            self._balance_at = time.time()
+
+            # Balance checks are infrequent, so use them to clean up the backlog too
+            self.reconcile()
+
+        return self._balance
+
+    def has_funds(self):
+        """Whether the balance is above SIGNER_MIN_BALANCE_ETH"""
+        return self.balance() >= Web3.toWei(SIGNER_MIN_BALANCE_ETH, 'ether')
+
+    def throughput(self):
+        """Transactions broadcast per minute over the throughput window"""
+        cutoff = time.time() - THROUGHPUT_WINDOW_SECONDS
+        with self._lock:
+            while self._sent_times and self._sent_times[0] < cutoff:
+                self._sent_times.popleft()
+            return len(self._sent_times) * 60 / THROUGHPUT_WINDOW_SECONDS
+
+    def metrics(self):
+        """
+        Per-signer metrics
+
+        Returns:
+            dict: address, backlog, balance, counters and throughput
+        """
+        try:
+            balance = self.balance(refresh=True)
+            pending_nonce = self.web3.eth.get_transaction_count(self.address, 'pending')
+            mined_nonce = self.web3.eth.get_transaction_count(self.address, 'latest')
+        except Exception as e:
+            print(f"Error reading signer state for {self.address}: {str(e)}")
+            balance = self._balance
+            pending_nonce = mined_nonce = None
+
+        with self._lock:
+            metrics = {
+                'address': self.address,
+                'backlog': len(self._in_flight),
+                'node_pending': pending_nonce - mined_nonce if pending_nonce is not None else None,
+                'balance_eth': float(Web3.fromWei(balance, 'ether')) if balance is not None else None,
+                'sent': self.sent,
+                'confirmed': self.confirmed,
+                'failed': self.failed,
+                'gas_used': self.gas_used,
+                'replaced': self.replaced
+            }
+
+        metrics['tx_per_minute'] = self.throughput()
+        return metrics
+
+
+class SignerPool:
+    """
+    Pool of signing accounts used to send transactions in parallel
+
+    Each account has its own nonce sequence, so transactions from different
+    signers never wait on each other. New transactions go to the funded
+    signer with the smallest backlog; grants and revokes must go to the
+    signer that owns the data.
+    """
+
+    def __init__(self, web3, private_keys):
+        """
+        Initialize the pool
+
+        Args:
+            web3: Web3 instance shared by all signers
+            private_keys: List of private keys
+        """
+        self.signers = [Signer(web3, key) for key in private_keys]
+        self._by_address = {signer.address: signer for signer in self.signers}
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def __len__(self):
+        return len(self.signers)
+
+    @property
+    def primary(self):
+        """First signer, used for read calls that need a sender"""
+        return self.signers[0] if self.signers else None
+
+    def addresses(self):
+        """Addresses of all pool accounts"""
+        return [signer.address for signer in self.signers]
+
+    def for_address(self, address):
+        """Signer for an address, or None if it is not a pool account"""
+        return self._by_address.get(Web3.toChecksumAddress(address))
+
+    def select(self):
+        """
+        Pick the signer for a new transaction
+
+        Returns:
+            Signer: funded signer with the smallest backlog (round robin on ties)
+        """
+        if not self.signers:
+            raise ValueError("Private key not set, cannot create transaction")
+
+        with self._lock:
+            # Rotate the starting point so equally loaded signers take turns
+            start = self._next
+            self._next = (self._next + 1) % len(self.signers)
+        candidates = self.signers[start:] + self.signers[:start]
+
+        funded = []
+        for signer in candidates:
+            try:
+                if signer.has_funds():
+                    funded.append(signer)
+            except Exception as e:
+                print(f"Error checking balance of {signer.address}: {str(e)}")
+
+        if not funded:
+            print("Warning: No signer above the minimum balance, using the least loaded one")
+            funded = candidates
+
+        return min(funded, key=lambda signer: signer.backlog())
+
+    def find(self, tx_hash):
+        """
+        Find the signer and pending transaction for a hash
+
+        Returns:
+            tuple: (signer, in-flight entry), or (None, None) if not pending
+        """
+        for signer in self.signers:
+            entry = signer.in_flight(tx_hash)
+            if entry is not None:
+                return signer, entry
+        return None, None
+
+    def record_receipt(self, tx_hash, receipt):
+        """Credit a mined transaction to the signer that sent it"""
+        for signer in self.signers:
+            if signer.record_receipt(tx_hash, receipt):
+                return signer
+        return None
+
+    def reset(self, web3):
+        """
+        Rebind every signer to a new connection and forget local nonce state
+
+        Args:
+            web3: New Web3 instance (e.g. after the node restarts)
+        """
+        for signer in self.signers:
+            signer.web3 = web3
+            signer.nonce_manager = NonceManager(web3, signer.address, signer.pending_nonces)
+
+    def metrics(self):
+        """
+        Metrics of every signer plus pool totals
+
+        Returns:
+            dict: signers list and totals
+        """
+        signers = [signer.metrics() for signer in self.signers]
+
+        return {
+            'signers': signers,
+            'total_backlog': sum(signer['backlog'] for signer in signers),
+            'total_sent': sum(signer['sent'] for signer in signers),
+            'total_tx_per_minute': sum(signer['tx_per_minute'] for signer in signers)
+        }
+
+
+TENANT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tenant_records (
+    data_id TEXT PRIMARY KEY,
+    tenant TEXT,
+    signer TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tenant_records_tenant ON tenant_records (tenant, created_at);
+"""
+
+
+class TenantRegistry:
+    """
+    Records which tenant and pool signer each stored data ID belongs to
+
+    On chain every record is owned by the pool account that sent it, so
+    this table is what attributes the data to a tenant and tells grants
+    and revokes which signer has to send them.
+    """
+
+    def __init__(self, db_path=TENANT_DB_PATH):
+        """
+        Initialize the registry
+
+        Args:
+            db_path: Path of the SQLite database file
+        """
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(TENANT_SCHEMA)
+        self._lock = threading.Lock()
+
+    def record(self, entries):
+        """
+        Record the tenant and signer of stored data IDs
+
+        Only called for stores that were mined successfully (or seen as
+        DataStored events), so the signer is always the on-chain owner and
+        replaces whatever was recorded before. A known tenant is never
+        overwritten with None.
+
+        Args:
+            entries: List of (data_id, tenant, signer_address) tuples
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """INSERT INTO tenant_records (data_id, tenant, signer, created_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (data_id) DO UPDATE SET
+                       signer = excluded.signer,
+                       tenant = COALESCE(excluded.tenant, tenant_records.tenant)""",
+                [(data_id, tenant, signer, now) for data_id, tenant, signer in entries])
+
+    def get(self, data_id):
+        """
+        Look up a data ID
+
+        Returns:
+            dict: tenant and signer, or None if the data ID is unknown
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT tenant, signer FROM tenant_records WHERE data_id = ?", (data_id,)).fetchone()
+        return {'tenant': row[0], 'signer': row[1]} if row else None
+
+    def get_data_ids(self, tenant, offset=0, limit=None):
+        """List the data IDs of a tenant in the order they were stored"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data_id FROM tenant_records WHERE tenant = ? ORDER BY created_at, rowid LIMIT ? OFFSET ?",
+                (tenant, limit if limit is not None else -1, offset)).fetchall()
+        return [row[0] for row in rows]
+
+    def count_data_ids(self, tenant):
+        """Number of data IDs of a tenant"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM tenant_records WHERE tenant = ?", (tenant,)).fetchone()[0]
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self._conn.close()
+
+
+def _hash_key(tx_hash):
+    """Normalize a transaction hash (HexBytes or hex string) to a 0x-prefixed lowercase string"""
+    if isinstance(tx_hash, (bytes, bytearray)):
+        return '0x' + bytes(tx_hash).hex()
+    return tx_hash.lower() if tx_hash.startswith('0x') else '0x' + tx_hash.lower()
@@ -1,11 +1,20 @@
+import numpy as np
 import pandas as pd
 import os
 import json
+import textwrap
+from openpyxl import load_workbook
 
 # Create the datasets directory path
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 DATASET_DIR = os.path.join(BASE_DIR, 'datasets')
 
+# Rows read, cleaned and written at a time by the streaming ingestion path
+INGEST_CHUNK_ROWS = int(os.getenv('INGEST_CHUNK_ROWS', '10000'))
+
+# Width reserved for metadata.count, which is only known once all rows are written
+COUNT_WIDTH = 20
+
 
 def extract_geospatial_data():
     """
@@ -114,6 +123,226 @@ def convert_to_json(df, output_path):
         json.dump(json_data, f, indent=2)
 
 
+def clean_chunk(df, seen_rows):
+    """
+    Clean one chunk of rows the way clean_data cleans a whole table
+
+    Duplicates are detected across chunks through a set of 64-bit row
+    hashes, so memory grows by one integer per distinct row rather than
+    by the rows themselves. Rows are hashed in their text form, so a row
+    matches its earlier copies whichever chunk they were read in.
+
+    Args:
+        df: DataFrame holding the chunk
+        seen_rows: Set of row hashes from earlier chunks (updated in place)
+
+    Returns:
+        DataFrame: the cleaned chunk
+    """
+    # Drop duplicates within the chunk and of rows seen earlier
+    row_hashes = pd.util.hash_pandas_object(df.astype(str), index=False)
+    keep = ~row_hashes.duplicated() & ~row_hashes.map(seen_rows.__contains__).astype(bool)
+    seen_rows.update(row_hashes[keep].tolist())
+    df = df[keep]
+
+    # Same coordinate checks as clean_data
+    if 'latitude' in df.columns and 'longitude' in df.columns:
+        df = df.dropna(subset=['latitude', 'longitude'])
+    if 'latitude' in df.columns:
+        df = df[(df['latitude'] >= -90) & (df['latitude'] <= 90)]
+    if 'longitude' in df.columns:
+        df = df[(df['longitude'] >= -180) & (df['longitude'] <= 180)]
+
+    return df
+
+
+def _csv_chunks(input_path, chunk_rows, dtypes=None):
+    """Column names and an iterator of DataFrame chunks of a CSV file"""
+    columns = pd.read_csv(input_path, nrows=0).columns.tolist()
+    return columns, pd.read_csv(input_path, chunksize=chunk_rows, dtype=dtypes)
+
+
+def _frame(rows, columns, dtypes=None):
+    """DataFrame of sheet rows, with empty cells as NaN like pd.read_excel"""
+    df = pd.DataFrame(rows, columns=columns).replace({None: np.nan})
+    return df.astype(dtypes) if dtypes else df
+
+
+def _xlsx_chunks(input_path, chunk_rows, dtypes=None):
+    """Column names and an iterator of DataFrame chunks of the first sheet of an XLSX file"""
+    # Read-only mode streams rows from the sheet XML instead of loading the workbook
+    workbook = load_workbook(input_path, read_only=True, data_only=True)
+    rows = workbook.worksheets[0].iter_rows(values_only=True)
+    columns = [str(value) for value in next(rows, ())]
+
+    def chunks():
+        try:
+            batch = []
+            for row in rows:
+                # Skip the empty rows read-only sheets can report past the data
+                if any(value is not None for value in row):
+                    batch.append(row[:len(columns)])
+                if len(batch) == chunk_rows:
+                    yield _frame(batch, columns, dtypes)
+                    batch = []
+            if batch:
+                yield _frame(batch, columns, dtypes)
+        finally:
+            workbook.close()
+
+    return columns, chunks()
+
+
+def _merge_dtype(dtype, other):
+    """Dtype holding the values of two chunks of a column"""
+    if dtype is None or dtype == other:
+        return other
+    if dtype.kind in 'iuf' and other.kind in 'iuf':
+        return np.dtype('float64')
+    return np.dtype(object)
+
+
+def infer_dtypes(columns, chunks):
+    """
+    Column dtypes of a whole table from the dtypes inferred for each chunk
+
+    Reading the table at once would infer one dtype per column; inferring
+    per chunk instead can read the same value as 1 in one chunk and 1.0 or
+    "1" in another.
+
+    Args:
+        columns: Column names
+        chunks: Iterator of DataFrame chunks of the table
+
+    Returns:
+        dict: column name -> numpy dtype
+    """
+    dtypes = {}
+    has_nulls = set()
+    for chunk in chunks:
+        for column in columns:
+            values = chunk[column]
+            nulls = values.isna()
+            if nulls.any():
+                has_nulls.add(column)
+            # A chunk with no values says nothing about the column's type
+            if not nulls.all():
+                dtypes[column] = _merge_dtype(dtypes.get(column), values.dtype)
+
+    # Empty cells turn int columns into float and bool columns into object, as in a whole-table read
+    for column in columns:
+        dtype = dtypes.get(column, np.dtype('float64'))
+        if column in has_nulls and dtype.kind in 'iu':
+            dtype = np.dtype('float64')
+        elif column in has_nulls and dtype.kind == 'b':
+            dtype = np.dtype(object)
+        dtypes[column] = dtype
+
+    return dtypes
+
+
+class JSONRecordWriter:
+    """
+    Writes the convert_to_json document one batch of records at a time
+
+    The layout matches json.dump(..., indent=2). metadata.count is written
+    as a fixed-width placeholder and patched in close(), once the number of
+    records is known.
+    """
+
+    def __init__(self, output_path, columns):
+        """
+        Open the output and write the metadata
+
+        Args:
+            output_path: Path of the JSON file to write
+            columns: Column names recorded in the metadata
+        """
+        self.count = 0
+        self._file = open(output_path, 'w')
+
+        metadata = json.dumps({
+            "count": "__count__",
+            "generated_at": pd.Timestamp.now().isoformat(),
+            "columns": columns
+        }, indent=2)
+        head, tail = textwrap.indent(metadata, '  ').split('"__count__"')
+
+        self._file.write('{\n  "metadata": ' + head.lstrip())
+        self._count_offset = self._file.tell()
+        self._file.write(' ' * COUNT_WIDTH + tail + ',\n  "data": [')
+
+    def write_records(self, records):
+        """Append a list of record dictionaries"""
+        if not records:
+            return
+
+        # Each record is indented to its depth inside "data", as json.dump would do
+        text = ',\n'.join('    ' + json.dumps(record, indent=2).replace('\n', '\n    ') for record in records)
+        self._file.write((',\n' if self.count else '\n') + text)
+        self.count += len(records)
+
+    def close(self):
+        """Finish the document and fill in metadata.count"""
+        self._file.write('\n  ]\n}' if self.count else ']\n}')
+        self._file.seek(self._count_offset)
+        self._file.write(str(self.count).ljust(COUNT_WIDTH))
+        self._file.close()
+
+
+def stream_to_json(input_path, output_path, chunk_rows=INGEST_CHUNK_ROWS):
+    """
+    Clean a CSV or XLSX file and convert it to JSON in bounded memory
+
+    The streaming counterpart of clean_data + convert_to_json: rows are
+    read chunk_rows at a time (XLSX in openpyxl's read-only mode), cleaned
+    and appended to the output, so memory stays flat for any file size.
+    A first pass over the file infers the column types, which every chunk
+    is then read with, so values come out as clean_data would give them.
+
+    Args:
+        input_path: Path to a .csv or .xlsx file
+        output_path: Path of the JSON file to write
+        chunk_rows: Rows per chunk
+
+    Returns:
+        dict: rows written, rows dropped while cleaning, and columns
+    """
+    extension = input_path.rsplit('.', 1)[-1].lower()
+    if extension == 'csv':
+        read_chunks = _csv_chunks
+    elif extension == 'xlsx':
+        read_chunks = _xlsx_chunks
+    else:
+        raise ValueError(f"Unsupported file type: {extension}")
+
+    # Pin the column types of the whole file, then read it again with them
+    dtypes = infer_dtypes(*read_chunks(input_path, chunk_rows))
+    columns, chunks = read_chunks(input_path, chunk_rows, dtypes)
+
+    writer = JSONRecordWriter(output_path, columns)
+    seen_rows = set()
+    read_rows = 0
+
+    try:
+        for chunk in chunks:
+            read_rows += len(chunk)
+            writer.write_records(clean_chunk(chunk, seen_rows).to_dict(orient='records'))
+    except Exception:
+        # Don't leave a truncated document behind
+        writer.close()
+        os.remove(output_path)
+        raise
+    writer.close()
+
+    print(f"Streamed {read_rows} rows from {input_path}: wrote {writer.count}, dropped {read_rows - writer.count}")
+    return {
+        'rows': writer.count,
+        'dropped': read_rows - writer.count,
+        'columns': columns
+    }
+
+
 if __name__ == "__main__":
     # Make sure the datasets directory exists
     os.makedirs(DATASET_DIR, exist_ok=True)
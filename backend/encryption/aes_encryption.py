@@ -2,9 +2,15 @@ import os
 import json
 import base64
 from Crypto.Cipher import AES
-from Crypto.Util.Padding import pad, unpad
+from Crypto.Util.Padding import unpad
 from Crypto.Random import get_random_bytes
-
+from .container import (DEFAULT_CHUNK_SIZE, DEFAULT_WORKERS, ENCRYPTION_METHOD, FLAG_JSON, FLAG_RECORDS,
+                        ContainerReader, decrypt_file, encrypt_bytes, encrypt_file, is_container)
+from .compression import check_codec
+from .encryption_utils import DEFAULT_HASH_ALGORITHM, new_digest
+from .record_encryption import encrypt_records
+from .record_integrity import DATA_HASH_TYPE, RecordTree, record_tree_path
+from .spatial_encryption import encrypt_tiles
 
 class AESCipher:
     """
@@ -22,63 +28,47 @@ class AESCipher:
             # Generate a random 32-byte key for AES-256
             self.key = get_random_bytes(32)
 
-    def encrypt_data(self, data):
+    def encrypt_data(self, data, workers=1):
         """
-        Encrypt data using AES-256 in CBC mode
+        Encrypt data into a binary container (AES-256-GCM)
+
+        The key is not part of the result; keep it separately.
 
         Args:
-            data: Dictionary or string to encrypt
+            data: Dictionary, string or bytes to encrypt
+            workers: Number of threads encrypting chunks
 
         Returns:
-            dict: Contains base64 encoded iv, ciphertext, and original key
+            bytes: the encrypted container
         """
         # Convert data to JSON string if it's a dictionary
         if isinstance(data, dict):
-            plaintext = json.dumps(data).encode('utf-8')
-        else:
-            plaintext = data.encode('utf-8') if isinstance(data, str) else data
-
-        # Generate a random initialization vector (IV)
-        iv = get_random_bytes(16)
-
-        # Create cipher and encrypt
-        cipher = AES.new(self.key, AES.MODE_CBC, iv)
-
-        # Pad data to be a multiple of 16 bytes (AES block size)
-        padded_data = pad(plaintext, AES.block_size)
+            return encrypt_bytes(json.dumps(data).encode('utf-8'), self.key, flags=FLAG_JSON, workers=workers)
 
-        # Encrypt the data
-        ciphertext = cipher.encrypt(padded_data)
-
-        # Return base64 encoded values for safe storage and transmission
-        result = {
-            'iv': base64.b64encode(iv).decode('utf-8'),
-            'ciphertext': base64.b64encode(ciphertext).decode('utf-8'),
-            'key': base64.b64encode(self.key).decode('utf-8')
-        }
-
-        return result
+        plaintext = data.encode('utf-8') if isinstance(data, str) else data
+        return encrypt_bytes(plaintext, self.key, workers=workers)
 
     def decrypt_data(self, encrypted_data):
         """
-        Decrypt data using AES-256 in CBC mode
+        Decrypt a container, or a legacy JSON payload (AES-256-CBC)
 
         Args:
-            encrypted_data: Dictionary containing iv, ciphertext, and key
+            encrypted_data: Container bytes, ContainerReader, or legacy dictionary with iv and ciphertext
 
         Returns:
             The decrypted data (dictionary if JSON, otherwise string/bytes)
         """
-        # Decode base64 values
-        iv = base64.b64decode(encrypted_data['iv'])
-        ciphertext = base64.b64decode(encrypted_data['ciphertext'])
-
-        # Create cipher for decryption
-        cipher = AES.new(self.key, AES.MODE_CBC, iv)
-
-        # Decrypt and remove padding
-        padded_plaintext = cipher.decrypt(ciphertext)
-        plaintext = unpad(padded_plaintext, AES.block_size)
+        if isinstance(encrypted_data, ContainerReader):
+            plaintext = encrypted_data.read_all(self.key)
+        elif isinstance(encrypted_data, (bytes, bytearray)):
+            with ContainerReader(encrypted_data) as reader:
+                plaintext = reader.read_all(self.key)
+        else:
+            # Legacy layout: base64 IV and CBC ciphertext
+            iv = base64.b64decode(encrypted_data['iv'])
+            ciphertext = base64.b64decode(encrypted_data['ciphertext'])
+            cipher = AES.new(self.key, AES.MODE_CBC, iv)
+            plaintext = unpad(cipher.decrypt(ciphertext), AES.block_size)
 
         # Try to convert to JSON if it was originally a dictionary
         try:
@@ -90,49 +80,158 @@ class AESCipher:
     def save_encrypted_data(self, encrypted_data, output_path):
         """
         Save encrypted data to a file
+
+        Containers are written as they are; legacy dictionaries as JSON.
         """
-        with open(output_path, 'w') as f:
-            json.dump(encrypted_data, f, indent=2)
+        if isinstance(encrypted_data, (bytes, bytearray)):
+            with open(output_path, 'wb') as f:
+                f.write(encrypted_data)
+        else:
+            with open(output_path, 'w') as f:
+                json.dump(encrypted_data, f, indent=2)
 
         return output_path
 
     def load_encrypted_data(self, input_path):
         """
         Load encrypted data from a file
+
+        Returns:
+            ContainerReader (memory-mapped) for containers, dictionary for legacy JSON files
         """
+        if is_container(input_path):
+            return ContainerReader(input_path)
+
         with open(input_path, 'r') as f:
             return json.load(f)
 
 
-def encrypt_json_file(input_path, output_path=None):
+def encrypt_and_hash(input_path, output_path=None, key=None, layout='json', workers=1,
+                     chunk_size=DEFAULT_CHUNK_SIZE, hash_algorithm=DEFAULT_HASH_ALGORITHM, compression=None,
+                     compression_level=None, record_tree=None):
     """
-    Encrypt a JSON file using AES-256
+    Encrypt a file and compute its plaintext and ciphertext digests in one pass
+
+    The source is read once: its bytes are hashed as they are read, and
+    the container is hashed as it is written, so neither file has to be
+    read again to anchor or describe it.
+
+    Layouts:
+        json: a JSON document, streamed in chunks as it is (not parsed)
+        raw: any file, streamed in chunks with constant memory
+        records, tiles: a {"metadata", "data"} document for selective decryption
+
+    For {"metadata", "data"} documents with a record tree, data_hash is
+    the root of a Merkle tree over the records, whose leaves are saved to
+    record_tree_path(output_path); otherwise it is the digest of the source bytes.
 
     Args:
-        input_path: Path to the JSON file to encrypt
-        output_path: Path to save the encrypted data (default: input_path + '.enc')
+        input_path: Path to the file to encrypt
+        output_path: Path to save the container (default: input_path + '.enc')
+        key: 32-byte key or base64 encoded key (default: a new random key)
+        layout: One of json, raw, records or tiles
+        workers: Number of threads encrypting chunks
+        chunk_size: Plaintext bytes per chunk (json and raw layouts)
+        hash_algorithm: Digest algorithm of both hashes (see encryption_utils.new_digest)
+        compression: Optional codec chunks are compressed with before encryption (see compression.py)
+        compression_level: Compression level (default: the codec's default)
+        record_tree: Build the record tree (default: for the records and tiles layouts, which
+            parse the document anyway; the json layout then parses it after encrypting)
 
     Returns:
-        tuple: (output_path, encryption_key)
+        dict: encrypted_file, key (base64), data_hash and its data_hash_type, cipher_hash and its
+        hash_algorithm, compression and compression_level, and cipher_size
     """
     if output_path is None:
         output_path = input_path + '.enc'
 
-    # Load the JSON data
+    # Decode key if needed, or generate a new one
+    if isinstance(key, str):
+        key = base64.b64decode(key)
+    key = key or get_random_bytes(32)
+
+    # Resolve the codec's default level up front, so it can be recorded
+    if compression:
+        compression_level = check_codec(compression, compression_level)
+    elif compression_level is not None:
+        raise ValueError("A compression level needs a compression codec")
+
+    if record_tree is None:
+        record_tree = layout in ('records', 'tiles')
+
+    plain_digest = new_digest(hash_algorithm, workers)
+    cipher_digest = new_digest(hash_algorithm, workers)
+    document = None
+
+    if layout in ('json', 'raw'):
+        # Stream the source chunk by chunk; only the json flag tells the two apart
+        encrypt_file(input_path, output_path, key, chunk_size, workers, plain_digest, cipher_digest, compression,
+                     compression_level, FLAG_JSON if layout == 'json' else 0)
+
+        if layout == 'json' and record_tree:
+            document = _load_document(input_path)
+    elif layout in ('records', 'tiles'):
+        # Read the source once; the digest covers its exact bytes
+        try:
+            with open(input_path, 'rb') as f:
+                source = f.read()
+            document = json.loads(source)
+        except Exception as e:
+            raise Exception(f"Error reading input file: {str(e)}")
+        plain_digest.update(source)
+        del source
+
+        if layout == 'records':
+            encrypt_records(document, output_path, key, workers=workers, digest=cipher_digest,
+                            compression=compression, compression_level=compression_level)
+        else:
+            encrypt_tiles(document, output_path, key, workers=workers, digest=cipher_digest,
+                          compression=compression, compression_level=compression_level)
+    else:
+        raise ValueError(f"Unknown layout {layout}")
+
+    # Datasets get a record tree, so single records can be proven against data_hash
+    tree = None
+    if record_tree and isinstance(document, dict) and isinstance(document.get('data'), list):
+        tree = RecordTree(document['data'])
+        tree.save(record_tree_path(output_path))
+
+    return {
+        'encrypted_file': output_path,
+        'key': base64.b64encode(key).decode('utf-8'),
+        'data_hash': tree.root if tree else plain_digest.hexdigest(),
+        'data_hash_type': DATA_HASH_TYPE if tree else hash_algorithm,
+        'cipher_hash': cipher_digest.hexdigest(),
+        'hash_algorithm': hash_algorithm,
+        'compression': compression,
+        'compression_level': compression_level,
+        'cipher_size': os.path.getsize(output_path)
+    }
+
+
+def _load_document(input_path):
+    """Parse a JSON source file"""
     try:
-        with open(input_path, 'r') as f:
-            data = json.load(f)
+        with open(input_path, 'rb') as f:
+            return json.load(f)
     except Exception as e:
         raise Exception(f"Error reading input file: {str(e)}")
 
-    # Initialize AES cipher and encrypt
-    cipher = AESCipher()
-    encrypted_data = cipher.encrypt_data(data)
 
-    # Save encrypted data
-    cipher.save_encrypted_data(encrypted_data, output_path)
+def encrypt_json_file(input_path, output_path=None, workers=1):
+    """
+    Encrypt a JSON file into a binary container
 
-    return output_path, base64.b64encode(cipher.key).decode('utf-8')
+    Args:
+        input_path: Path to the JSON file to encrypt
+        output_path: Path to save the encrypted data (default: input_path + '.enc')
+        workers: Number of threads encrypting chunks
+
+    Returns:
+        tuple: (output_path, encryption_key)
+    """
+    result = encrypt_and_hash(input_path, output_path, layout='json', workers=workers)
+    return result['encrypted_file'], result['key']
 
 
 def decrypt_json_file(input_path, key, output_path=None):
@@ -157,15 +256,100 @@ def decrypt_json_file(input_path, key, output_path=None):
     # Initialize AES cipher with the provided key
     cipher = AESCipher(key)
 
-    # Load encrypted data
+    # Load and decrypt data
     encrypted_data = cipher.load_encrypted_data(input_path)
-
-    # Decrypt data
-    decrypted_data = cipher.decrypt_data(encrypted_data)
+    try:
+        decrypted_data = cipher.decrypt_data(encrypted_data)
+    finally:
+        if isinstance(encrypted_data, ContainerReader):
+            encrypted_data.close()
 
     # Save decrypted data if it's a dictionary
     if isinstance(decrypted_data, dict):
         with open(output_path, 'w') as f:
             json.dump(decrypted_data, f, indent=2)
 
-    return output_path, decrypted_data
\ No newline at end of file
+    return output_path, decrypted_data
+
+
+def is_stream_file(path):
+    """
+    Check whether a file holds raw bytes to be decrypted with decrypt_file_stream
+
+    True for containers written by encrypt_file_stream; False for encrypted
+    JSON documents, record files and files that are not containers.
+    """
+    if not is_container(path):
+        return False
+
+    with ContainerReader(path) as reader:
+        return not reader.flags & (FLAG_JSON | FLAG_RECORDS)
+
+
+def encrypt_file_stream(input_path, output_path=None, key=None, chunk_size=DEFAULT_CHUNK_SIZE, workers=1):
+    """
+    Encrypt any file into a chunked container in constant memory
+
+    The input is treated as raw bytes, so no JSON parsing is needed.
+
+    Args:
+        input_path: Path to the file to encrypt
+        output_path: Path to save the container (default: input_path + '.enc')
+        key: 32-byte key or base64 encoded key (default: a new random key)
+        chunk_size: Plaintext bytes per chunk
+        workers: Number of threads encrypting chunks (DEFAULT_WORKERS uses every core)
+
+    Returns:
+        tuple: (output_path, encryption_key)
+    """
+    if output_path is None:
+        output_path = input_path + '.enc'
+
+    # Decode key if needed, or generate a new one
+    if isinstance(key, str):
+        key = base64.b64decode(key)
+    key = key or get_random_bytes(32)
+
+    encrypt_file(input_path, output_path, key, chunk_size, workers)
+
+    return output_path, base64.b64encode(key).decode('utf-8')
+
+
+def decrypt_file_stream(input_path, key, output_path=None, workers=1):
+    """
+    Decrypt a container to a file in constant memory
+
+    Every chunk is authenticated before it is written. The output is written
+    to a temporary file and only moved into place once the whole file has
+    been verified.
+
+    Args:
+        input_path: Path to the encrypted file
+        key: Base64 encoded encryption key or bytes
+        output_path: Path to save the decrypted data (default: input_path - '.enc')
+        workers: Number of threads decrypting container chunks
+
+    Returns:
+        output path
+    """
+    if output_path is None:
+        output_path = input_path[:-len('.enc')] if input_path.endswith('.enc') else input_path + '.dec'
+
+    # Decode key if needed
+    if isinstance(key, str):
+        key = base64.b64decode(key)
+
+    partial_path = output_path + '.part'
+    try:
+        with open(partial_path, 'wb') as dst:
+            decrypt_file(input_path, dst, key, workers)
+
+        os.replace(partial_path, output_path)
+
+    except Exception:
+        # Never leave unauthenticated plaintext behind
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+    return output_path
@@ -0,0 +1,117 @@
+import bz2
+import lzma
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Codec IDs stored in bits 8-11 of the container flags; 0 means uncompressed
+CODEC_IDS = {
+    'zlib': 1,
+    'bz2': 2,
+    'lzma': 3,
+    'zstd': 4
+}
+CODEC_SHIFT = 8
+CODEC_MASK = 0x0F00
+
+# Level used when none is given
+DEFAULT_LEVELS = {
+    'zlib': 6,
+    'bz2': 9,
+    'lzma': 6,
+    'zstd': 3
+}
+
+# Levels each codec accepts (zlib -1 is its own default)
+LEVEL_RANGES = {
+    'zlib': (-1, 9),
+    'bz2': (1, 9),
+    'lzma': (0, 9),
+    'zstd': (1, 22)
+}
+
+
+def available_codecs():
+    """Codecs usable here (zstd needs the optional zstandard package)"""
+    return [codec for codec in CODEC_IDS if codec != 'zstd' or zstandard is not None]
+
+
+def check_codec(codec, level=None):
+    """
+    Validate a codec and level
+
+    Args:
+        codec: zlib, bz2, lzma or zstd
+        level: Compression level (default: DEFAULT_LEVELS[codec])
+
+    Returns:
+        int: the level to use
+    """
+    if codec not in CODEC_IDS:
+        raise ValueError(f"Unknown compression codec {codec}")
+    if codec == 'zstd' and zstandard is None:
+        raise ValueError("zstd compression requires the zstandard package")
+    if level is None:
+        return DEFAULT_LEVELS[codec]
+
+    # Out-of-range levels would fail mid-encryption or be clamped silently
+    low, high = LEVEL_RANGES[codec]
+    if isinstance(level, bool) or not isinstance(level, int) or not low <= level <= high:
+        raise ValueError(f"{codec} compression level must be an integer from {low} to {high}, got {level}")
+    return level
+
+
+def codec_flags(codec):
+    """Container flag bits recording a codec (0 for no compression)"""
+    return CODEC_IDS[codec] << CODEC_SHIFT if codec else 0
+
+
+def codec_from_flags(flags):
+    """Codec recorded in container flags, or None"""
+    codec_id = (flags & CODEC_MASK) >> CODEC_SHIFT
+    if not codec_id:
+        return None
+
+    for codec, value in CODEC_IDS.items():
+        if value == codec_id:
+            return codec
+    raise ValueError(f"Unknown compression codec ID {codec_id}")
+
+
+def compress(data, codec, level=None):
+    """
+    Compress bytes as one self-contained frame
+
+    Args:
+        data: Bytes to compress
+        codec: zlib, bz2, lzma or zstd
+        level: Compression level (default: DEFAULT_LEVELS[codec])
+
+    Returns:
+        bytes: the compressed frame
+    """
+    level = check_codec(codec, level)
+
+    if codec == 'zlib':
+        return zlib.compress(data, level)
+    if codec == 'bz2':
+        return bz2.compress(data, level)
+    if codec == 'lzma':
+        return lzma.compress(data, preset=level)
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def decompress(data, codec):
+    """Decompress one frame written by compress"""
+    check_codec(codec)
+
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    if codec == 'bz2':
+        return bz2.decompress(data)
+    if codec == 'lzma':
+        return lzma.decompress(data)
+    return zstandard.ZstdDecompressor().decompress(data)
@@ -0,0 +1,546 @@
+import io
+import os
+import mmap
+import struct
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+from .compression import check_codec, codec_flags, codec_from_flags, compress, decompress
+
+# Binary container layout (all integers big-endian):
+#
+#   header       magic, version, cipher, flags, chunk size, chunk count,
+#                plaintext size, nonce prefix
+#   chunk table  one (offset, length) entry per chunk
+#   data         ciphertext + GCM tag of each chunk at its offset
+#
+# Each chunk is encrypted with AES-256-GCM under nonce prefix + chunk index,
+# with the header and chunk index as associated data. Changing the header,
+# reordering, dropping or truncating chunks therefore fails authentication.
+# Chunk lengths are known before encryption, so the header and table are
+# written first and the whole file is produced (and hashed) front to back.
+CONTAINER_MAGIC = b'GENC'
+CONTAINER_VERSION = 2
+CIPHER_AES_256_GCM = 1
+HEADER = struct.Struct('>4sBBHIIQ8s')
+TABLE_ENTRY = struct.Struct('>QI')
+TAG_SIZE = 16
+
+# Header flags: the plaintext is a JSON document (written by AESCipher.encrypt_data),
+# or chunk 0 is a record index and every other chunk a record group (record_encryption).
+# Bits 8-11 name a compression codec (see compression.py): every chunk is then
+# compressed on its own before encryption, and the header's plaintext size and
+# chunk size describe the uncompressed data.
+FLAG_JSON = 0x1
+FLAG_RECORDS = 0x2
+
+# Plaintext bytes per chunk; memory use stays at a few chunks regardless of file size
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Compressed chunks are spooled in memory up to this size before going to a temporary file
+COMPRESSION_SPOOL_SIZE = 64 * 1024 * 1024
+
+# Threads used for chunk encryption by default; AES-GCM releases the GIL, so this scales with cores
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# Value recorded as encryption_method in the metadata of container files
+ENCRYPTION_METHOD = 'AES-256-GCM-CHUNKED'
+
+
+def is_container(path):
+    """Check whether a file is an encrypted container"""
+    with open(path, 'rb') as f:
+        return f.read(len(CONTAINER_MAGIC)) == CONTAINER_MAGIC
+
+
+def chunk_lengths_for(size, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Plaintext length of each fixed-size chunk for size bytes (an empty input still has one chunk)"""
+    count = max(1, -(-size // chunk_size))
+    return [chunk_size] * (count - 1) + [size - chunk_size * (count - 1)]
+
+
+def _map_chunks(func, count, workers):
+    """
+    Apply func to every chunk index on a thread pool
+
+    At most a few chunks per worker are in flight, so memory stays bounded
+    for any file size. Results are yielded in index order.
+    """
+    if workers <= 1:
+        for index in range(count):
+            yield func(index)
+        return
+
+    window = workers * 2
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='container') as pool:
+        futures = [pool.submit(func, index) for index in range(min(window, count))]
+        for index in range(count):
+            result = futures[index % window].result()
+            if index + window < count:
+                futures[index % window] = pool.submit(func, index + window)
+            yield result
+
+
+def _chunk_cipher(key, header, nonce_prefix, index):
+    """AES-256-GCM cipher for one chunk, bound to the header and the chunk index"""
+    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce_prefix + struct.pack('>I', index), mac_len=TAG_SIZE)
+    cipher.update(header + struct.pack('>I', index))
+    return cipher
+
+
+class ContainerWriter:
+    """
+    Writes an encrypted container front to back
+
+    Chunk lengths are fixed up front, so the header and the complete chunk
+    table are written immediately and every chunk has a known offset.
+    Chunks are then appended in order, or written at their offsets by
+    several threads and registered in order with append_chunk.
+    """
+
+    def __init__(self, fileobj, key, chunk_lengths, chunk_size=DEFAULT_CHUNK_SIZE, flags=0, digest=None,
+                 plaintext_size=None):
+        """
+        Initialize the writer
+
+        Args:
+            fileobj: Binary file opened for writing
+            key: 32-byte AES key
+            chunk_lengths: Plaintext length of every chunk as stored (after compression)
+            chunk_size: Nominal chunk size (0 for variable-size chunks)
+            flags: Format flags stored in the header
+            digest: Optional hashlib object fed every byte of the container in order
+            plaintext_size: Total size before compression (default: sum of chunk_lengths)
+        """
+        self.fileobj = fileobj
+        self.key = key
+        self.chunk_lengths = list(chunk_lengths)
+        self.chunk_count = len(self.chunk_lengths)
+        self.digest = digest
+        self.nonce_prefix = get_random_bytes(8)
+        self.header = HEADER.pack(CONTAINER_MAGIC, CONTAINER_VERSION, CIPHER_AES_256_GCM, flags, chunk_size,
+                                  self.chunk_count,
+                                  sum(self.chunk_lengths) if plaintext_size is None else plaintext_size,
+                                  self.nonce_prefix)
+
+        # Offsets follow from the lengths: each chunk is its ciphertext plus the tag
+        self.data_start = fileobj.tell() + HEADER.size + self.chunk_count * TABLE_ENTRY.size
+        self.offsets = []
+        offset = self.data_start
+        for length in self.chunk_lengths:
+            self.offsets.append(offset)
+            offset += length + TAG_SIZE
+        self.end = offset
+        self._next_index = 0
+
+        table = b''.join(TABLE_ENTRY.pack(offset, length + TAG_SIZE)
+                         for offset, length in zip(self.offsets, self.chunk_lengths))
+        self._emit(self.header + table)
+
+    def _emit(self, data, write=True):
+        """Write bytes at the current position and feed them to the digest"""
+        if write:
+            self.fileobj.write(data)
+        if self.digest is not None:
+            self.digest.update(data)
+
+    def encrypt_chunk(self, index, plaintext):
+        """
+        Encrypt one chunk without writing it (safe to call from several threads)
+
+        Returns:
+            bytes: ciphertext followed by the tag
+        """
+        if len(plaintext) != self.chunk_lengths[index]:
+            raise ValueError(f"Chunk {index} has {len(plaintext)} bytes, expected {self.chunk_lengths[index]}")
+
+        ciphertext, tag = _chunk_cipher(self.key, self.header, self.nonce_prefix, index).encrypt_and_digest(plaintext)
+        return ciphertext + tag
+
+    def write_chunk(self, plaintext):
+        """
+        Encrypt and append the next chunk
+
+        Returns:
+            int: index of the chunk
+        """
+        return self.append_chunk(self.encrypt_chunk(self._next_index, plaintext))
+
+    def append_chunk(self, sealed, written=False):
+        """
+        Append the next chunk, already encrypted with encrypt_chunk
+
+        Args:
+            sealed: Ciphertext and tag of the chunk
+            written: The chunk was already written at its offset (only digest it)
+
+        Returns:
+            int: index of the chunk
+        """
+        index = self._next_index
+        if index >= self.chunk_count:
+            raise ValueError(f"Container was created for {self.chunk_count} chunks")
+
+        self._emit(sealed, write=not written)
+        self._next_index += 1
+        return index
+
+    def close(self):
+        """Check that every chunk was written"""
+        if self._next_index != self.chunk_count:
+            raise ValueError(f"Container is missing {self.chunk_count - self._next_index} chunk(s)")
+
+
+class ContainerReader:
+    """
+    Reads an encrypted container from a file (memory-mapped) or from bytes
+
+    The header and chunk table are parsed up front; chunks are decrypted
+    on demand, so reading one chunk touches only its own bytes.
+    """
+
+    def __init__(self, source):
+        """
+        Open a container
+
+        Args:
+            source: Path to a container file, or the container as bytes
+        """
+        self._file = None
+        self._mmap = None
+
+        if isinstance(source, (bytes, bytearray)):
+            self._buffer = source
+        else:
+            self._file = open(source, 'rb')
+            if os.fstat(self._file.fileno()).st_size < HEADER.size:
+                self.close()
+                raise ValueError("Not an encrypted container: header too short")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._buffer = self._mmap
+
+        self.header = bytes(self._buffer[:HEADER.size])
+        if len(self.header) != HEADER.size:
+            self.close()
+            raise ValueError("Not an encrypted container: header too short")
+
+        (magic, version, cipher, self.flags, self.chunk_size, self.chunk_count,
+         self.plaintext_size, self.nonce_prefix) = HEADER.unpack(self.header)
+
+        if magic != CONTAINER_MAGIC:
+            self.close()
+            raise ValueError("Not an encrypted container")
+        if version != CONTAINER_VERSION or cipher != CIPHER_AES_256_GCM:
+            self.close()
+            raise ValueError(f"Unsupported container version {version} or cipher {cipher}")
+
+        table_end = HEADER.size + self.chunk_count * TABLE_ENTRY.size
+        if len(self._buffer) < table_end:
+            self.close()
+            raise ValueError("Encrypted container is truncated")
+
+        # Entries are (offset, stored length); each stored chunk is its ciphertext plus the tag
+        self.entries = [TABLE_ENTRY.unpack_from(self._buffer, HEADER.size + index * TABLE_ENTRY.size)
+                        for index in range(self.chunk_count)]
+
+        # Stored plaintext length of every chunk, and the codec it was compressed with
+        self.chunk_lengths = [length - TAG_SIZE for _, length in self.entries]
+        try:
+            self.codec = codec_from_flags(self.flags)
+        except ValueError:
+            self.close()
+            raise
+
+    def __len__(self):
+        return self.chunk_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Release the memory map and file"""
+        self._buffer = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def read_chunk(self, index, key):
+        """
+        Decrypt, verify and decompress one chunk
+
+        Args:
+            index: Chunk index
+            key: 32-byte AES key
+
+        Returns:
+            bytes: plaintext of the chunk
+        """
+        offset, length = self.entries[index]
+        sealed = self._buffer[offset:offset + length]
+        if length < TAG_SIZE or len(sealed) != length:
+            raise ValueError("Encrypted container is truncated")
+        ciphertext, tag = sealed[:-TAG_SIZE], sealed[-TAG_SIZE:]
+
+        # Raises ValueError if the chunk was tampered with
+        plaintext = _chunk_cipher(key, self.header, self.nonce_prefix, index).decrypt_and_verify(ciphertext, tag)
+        return decompress(plaintext, self.codec) if self.codec else plaintext
+
+    def iter_chunks(self, key):
+        """Decrypt all chunks in order, one at a time"""
+        for index in range(self.chunk_count):
+            yield self.read_chunk(index, key)
+
+    def read_all(self, key):
+        """Decrypt the whole container into memory"""
+        plaintext = b''.join(self.iter_chunks(key))
+        if len(plaintext) != self.plaintext_size:
+            raise ValueError("Decrypted size does not match the container header")
+        return plaintext
+
+
+def encrypt_bytes(plaintext, key, chunk_size=DEFAULT_CHUNK_SIZE, flags=0, workers=1, digest=None, compression=None,
+                  level=None):
+    """
+    Encrypt bytes into a container held in memory
+
+    Args:
+        plaintext: Bytes to encrypt
+        key: 32-byte AES key
+        chunk_size: Plaintext bytes per chunk
+        flags: Format flags stored in the header
+        workers: Number of threads compressing and encrypting chunks
+        digest: Optional hashlib object fed the container bytes
+        compression: Optional codec each chunk is compressed with (see compression.py)
+        level: Compression level (default: the codec's default)
+
+    Returns:
+        bytes: the container
+    """
+    lengths = chunk_lengths_for(len(plaintext), chunk_size)
+
+    def chunk(index):
+        start = index * chunk_size
+        return plaintext[start:start + chunk_size]
+
+    if compression:
+        # Compressed sizes are needed for the chunk table, so compress everything first
+        level = check_codec(compression, level)
+        stored = list(_map_chunks(lambda index: compress(chunk(index), compression, level), len(lengths), workers))
+        lengths = [len(frame) for frame in stored]
+        chunk = stored.__getitem__
+        flags |= codec_flags(compression)
+
+    buffer = io.BytesIO()
+    writer = ContainerWriter(buffer, key, lengths, chunk_size, flags, digest, len(plaintext))
+
+    # Chunks come back in order, so they can be appended as they finish
+    for sealed in _map_chunks(lambda index: writer.encrypt_chunk(index, chunk(index)), writer.chunk_count, workers):
+        writer.append_chunk(sealed)
+    writer.close()
+
+    return buffer.getvalue()
+
+
+def encrypt_chunks(plaintexts, output_path, key, flags=0, workers=1, digest=None, compression=None, level=None):
+    """
+    Encrypt a list of variable-size chunks into a container file
+
+    Args:
+        plaintexts: List of bytes, one per chunk
+        output_path: Path of the container to write
+        key: 32-byte AES key
+        flags: Format flags stored in the header
+        workers: Number of threads compressing and encrypting chunks
+        digest: Optional hashlib object fed the container bytes
+        compression: Optional codec each chunk is compressed with (see compression.py)
+        level: Compression level (default: the codec's default)
+
+    Returns:
+        output path
+    """
+    plaintext_size = sum(len(plaintext) for plaintext in plaintexts)
+
+    if compression:
+        level = check_codec(compression, level)
+        plaintexts = list(_map_chunks(lambda index: compress(plaintexts[index], compression, level),
+                                      len(plaintexts), workers))
+        flags |= codec_flags(compression)
+
+    with open(output_path, 'wb') as dst:
+        writer = ContainerWriter(dst, key, [len(plaintext) for plaintext in plaintexts], 0, flags, digest,
+                                 plaintext_size)
+
+        def encrypt(index):
+            return writer.encrypt_chunk(index, plaintexts[index])
+
+        for sealed in _map_chunks(encrypt, len(plaintexts), workers):
+            writer.append_chunk(sealed)
+        writer.close()
+
+    return output_path
+
+
+def encrypt_file(input_path, output_path, key, chunk_size=DEFAULT_CHUNK_SIZE, workers=1, plain_digest=None,
+                 cipher_digest=None, compression=None, level=None, flags=0):
+    """
+    Encrypt a file into a container, reading one chunk at a time
+
+    With several workers every thread reads its chunk from the input and
+    writes the sealed chunk straight to its precomputed offset in the
+    output, so chunks land out of order. Chunks are still digested in
+    order as their results come back.
+
+    Args:
+        input_path: Path to the file to encrypt
+        output_path: Path of the container to write
+        key: 32-byte AES key
+        chunk_size: Plaintext bytes per chunk
+        workers: Number of threads encrypting chunks
+        plain_digest: Optional hashlib object fed the plaintext
+        cipher_digest: Optional hashlib object fed the container bytes
+        compression: Optional codec each chunk is compressed with (see compression.py)
+        level: Compression level (default: the codec's default)
+        flags: Format flags stored in the header
+
+    Returns:
+        output path
+    """
+    if compression:
+        return _encrypt_file_compressed(input_path, output_path, key, chunk_size, workers, plain_digest,
+                                        cipher_digest, compression, check_codec(compression, level), flags)
+
+    size = os.path.getsize(input_path)
+
+    with open(input_path, 'rb') as src, open(output_path, 'wb') as dst:
+        writer = ContainerWriter(dst, key, chunk_lengths_for(size, chunk_size), chunk_size, flags, cipher_digest)
+
+        if workers <= 1 or not hasattr(os, 'pwrite'):
+            for _ in range(writer.chunk_count):
+                plaintext = src.read(chunk_size)
+                if plain_digest is not None:
+                    plain_digest.update(plaintext)
+                writer.write_chunk(plaintext)
+        else:
+            # Header and table must be on disk before positional writes
+            dst.flush()
+
+            def encrypt(index):
+                plaintext = os.pread(src.fileno(), chunk_size, index * chunk_size)
+                sealed = writer.encrypt_chunk(index, plaintext)
+                os.pwrite(dst.fileno(), sealed, writer.offsets[index])
+                return (plaintext if plain_digest is not None else None), sealed
+
+            for plaintext, sealed in _map_chunks(encrypt, writer.chunk_count, workers):
+                if plain_digest is not None:
+                    plain_digest.update(plaintext)
+                writer.append_chunk(sealed, written=True)
+
+            src.seek(size)
+            dst.seek(writer.end)
+
+        if src.read(1):
+            raise ValueError(f"{input_path} grew while it was being encrypted")
+        writer.close()
+
+    return output_path
+
+
+def _encrypt_file_compressed(input_path, output_path, key, chunk_size, workers, plain_digest, cipher_digest,
+                             compression, level, flags=0):
+    """
+    encrypt_file with compression
+
+    Chunks are compressed in parallel into a spool (in memory up to
+    COMPRESSION_SPOOL_SIZE, then a temporary file), because the chunk
+    table needs their compressed sizes before anything is encrypted.
+    """
+    size = os.path.getsize(input_path)
+    count = len(chunk_lengths_for(size, chunk_size))
+
+    with open(input_path, 'rb') as src, tempfile.SpooledTemporaryFile(COMPRESSION_SPOOL_SIZE) as spool:
+        if workers > 1 and hasattr(os, 'pread'):
+            def read(index):
+                return os.pread(src.fileno(), chunk_size, index * chunk_size)
+        else:
+            # One worker calls read in chunk order
+            workers = 1
+
+            def read(index):
+                return src.read(chunk_size)
+
+        def pack(index):
+            plaintext = read(index)
+            frame = compress(plaintext, compression, level)
+            return (plaintext if plain_digest is not None else None), len(plaintext), frame
+
+        lengths, total = [], 0
+        for plaintext, length, frame in _map_chunks(pack, count, workers):
+            if plain_digest is not None:
+                plain_digest.update(plaintext)
+            spool.write(frame)
+            lengths.append(len(frame))
+            total += length
+
+        src.seek(size)
+        if total != size or src.read(1):
+            raise ValueError(f"{input_path} changed while it was being encrypted")
+
+        spool.seek(0)
+        with open(output_path, 'wb') as dst:
+            writer = ContainerWriter(dst, key, lengths, chunk_size, flags | codec_flags(compression), cipher_digest,
+                                     size)
+            for length in lengths:
+                writer.write_chunk(spool.read(length))
+            writer.close()
+
+    return output_path
+
+
+def decrypt_file(input_path, dst, key, workers=1):
+    """
+    Decrypt a container into an open binary file
+
+    Args:
+        input_path: Path of the container
+        dst: Binary file opened for writing (positioned at the start)
+        key: 32-byte AES key
+        workers: Number of threads decrypting chunks
+
+    Returns:
+        int: number of plaintext bytes written
+    """
+    with ContainerReader(input_path) as reader:
+        if reader.codec or workers <= 1 or not hasattr(os, 'pwrite'):
+            # Sizes after decompression are unknown up front: chunks are decrypted and
+            # decompressed on the workers, then written in order as they come back
+            written = 0
+            for chunk in _map_chunks(lambda index: reader.read_chunk(index, key), reader.chunk_count, workers):
+                dst.write(chunk)
+                written += len(chunk)
+        else:
+            # Plaintext offsets follow from the chunk lengths
+            offsets = [0]
+            for length in reader.chunk_lengths:
+                offsets.append(offsets[-1] + length)
+            dst.flush()
+            start = dst.tell()
+
+            def decrypt(index):
+                chunk = reader.read_chunk(index, key)
+                os.pwrite(dst.fileno(), chunk, start + offsets[index])
+                return len(chunk)
+
+            written = sum(_map_chunks(decrypt, reader.chunk_count, workers))
+            dst.seek(start + written)
+
+        if written != reader.plaintext_size:
+            raise ValueError("Decrypted size does not match the container header")
+
+    return written
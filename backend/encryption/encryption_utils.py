@@ -1,19 +1,149 @@
 import os
 import json
 import base64
+import struct
 import hashlib
+from collections import deque
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from .container import ENCRYPTION_METHOD, is_container
+from .merkle import LEAF_PREFIX, NODE_PREFIX
 
+# Digest algorithms. BLAKE2b is truncated to 32 bytes so its hashes fit the same
+# on-chain fields as SHA-256. A '-tree' suffix selects the chunked tree mode.
+HASH_ALGORITHMS = ('sha256', 'blake2b', 'sha256-tree', 'blake2b-tree')
+DEFAULT_HASH_ALGORITHM = os.getenv('HASH_ALGORITHM', 'sha256').lower()
 
-def generate_hash(data):
+# Leaf size of tree hashes; part of the algorithm, so changing it changes every tree hash
+TREE_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def _base_digest(algorithm):
+    """New hashlib object for a plain algorithm name"""
+    if algorithm == 'sha256':
+        return hashlib.sha256()
+    if algorithm == 'blake2b':
+        return hashlib.blake2b(digest_size=32)
+    raise ValueError(f"Unknown hash algorithm {algorithm}")
+
+
+class TreeDigest:
+    """
+    Chunked tree hash with a hashlib-style interface
+
+    The input is split into TREE_CHUNK_SIZE leaves which are hashed
+    independently, on several threads if requested (hashlib releases the
+    GIL), and the root is the hash of the chunk size and all leaf digests.
+    Leaves and root use the Merkle tree's domain separation prefixes.
+    """
+
+    def __init__(self, algorithm, workers=1, chunk_size=TREE_CHUNK_SIZE):
+        """
+        Initialize the digest
+
+        Args:
+            algorithm: Plain algorithm used for leaves and root (sha256 or blake2b)
+            workers: Number of threads hashing leaves
+            chunk_size: Bytes per leaf
+        """
+        _base_digest(algorithm)
+        self.algorithm = algorithm
+        self.name = f"{algorithm}-tree"
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._pieces = []           # input slices of the current leaf, hashed when it is full
+        self._filled = 0
+        self._leaves = []
+        self._pending = deque()
+        self._pool = None
+
+    def _hash_leaf(self, pieces):
+        """Digest of one leaf given as a list of slices"""
+        leaf = _base_digest(self.algorithm)
+        leaf.update(LEAF_PREFIX)
+        for piece in pieces:
+            leaf.update(piece)
+        return leaf.digest()
+
+    def _add_leaf(self, pieces):
+        """Hash a full leaf inline, or on the pool with at most a few leaves in flight"""
+        if self.workers <= 1:
+            self._leaves.append(self._hash_leaf(pieces))
+            return
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='tree-hash')
+        self._pending.append(self._pool.submit(self._hash_leaf, pieces))
+        if len(self._pending) > self.workers * 2:
+            self._leaves.append(self._pending.popleft().result())
+
+    def update(self, data):
+        """Feed more bytes"""
+        # Slices of read-only input are kept without copying until their leaf is hashed
+        view = memoryview(data)
+        if not view.readonly:
+            view = memoryview(bytes(view))
+
+        while len(view):
+            take = min(self.chunk_size - self._filled, len(view))
+            self._pieces.append(view[:take])
+            self._filled += take
+            view = view[take:]
+
+            if self._filled == self.chunk_size:
+                self._add_leaf(self._pieces)
+                self._pieces = []
+                self._filled = 0
+
+    def digest(self):
+        """Root digest of everything fed so far"""
+        while self._pending:
+            self._leaves.append(self._pending.popleft().result())
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+        # The trailing partial leaf is hashed without consuming it; empty input still has one leaf
+        leaves = list(self._leaves)
+        if self._pieces or not leaves:
+            leaves.append(self._hash_leaf(self._pieces))
+
+        root = _base_digest(self.algorithm)
+        root.update(NODE_PREFIX + struct.pack('>Q', self.chunk_size))
+        root.update(b''.join(leaves))
+        return root.digest()
+
+    def hexdigest(self):
+        """Hex root digest"""
+        return self.digest().hex()
+
+
+def new_digest(algorithm=DEFAULT_HASH_ALGORITHM, workers=1):
+    """
+    Create a hashlib-style digest object
+
+    Args:
+        algorithm: sha256, blake2b, or either with a '-tree' suffix for the chunked tree mode
+        workers: Threads hashing leaves in tree mode
+
+    Returns:
+        object with update(), digest() and hexdigest()
+    """
+    if algorithm.endswith('-tree'):
+        return TreeDigest(algorithm[:-len('-tree')], workers)
+    return _base_digest(algorithm)
+
+
+def generate_hash(data, algorithm=DEFAULT_HASH_ALGORITHM):
     """
-    Generate SHA-256 hash for data integrity checks
+    Generate a hash for data integrity checks
 
     Args:
         data: String, bytes, or dictionary
+        algorithm: Digest algorithm (see new_digest)
 
     Returns:
-        hex digest of SHA-256 hash
+        hex digest
     """
     # Convert to string if it's a dictionary
     if isinstance(data, dict):
@@ -24,11 +154,35 @@ def generate_hash(data):
         data = data.encode('utf-8')
 
     # Generate hash
-    hash_obj = hashlib.sha256(data)
+    hash_obj = new_digest(algorithm)
+    hash_obj.update(data)
     return hash_obj.hexdigest()
 
 
-def create_metadata(original_file, encrypted_file, hash_value):
+def generate_file_hash(path, chunk_size=1024 * 1024, algorithm=DEFAULT_HASH_ALGORITHM, workers=1):
+    """
+    Generate a hash of a file's raw bytes without loading it into memory
+
+    Args:
+        path: Path to the file
+        chunk_size: Bytes read per step
+        algorithm: Digest algorithm (see new_digest)
+        workers: Threads hashing leaves in tree mode
+
+    Returns:
+        hex digest
+    """
+    hash_obj = new_digest(algorithm, workers)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            hash_obj.update(block)
+
+    return hash_obj.hexdigest()
+
+
+def create_metadata(original_file, encrypted_file, hash_value, encryption_method=ENCRYPTION_METHOD, cipher_hash=None,
+                    hash_algorithm=DEFAULT_HASH_ALGORITHM, data_hash_type=None, compression=None,
+                    compression_level=None):
     """
     Create metadata for the encrypted file
 
@@ -36,18 +190,127 @@ def create_metadata(original_file, encrypted_file, hash_value):
         original_file: Path to the original data file
         encrypted_file: Path to the encrypted file
         hash_value: Hash of the original data
+        encryption_method: Cipher and layout used for the encrypted file
+        cipher_hash: Hash of the encrypted file, computed while it was written
+        hash_algorithm: Algorithm of hash_value and cipher_hash, so verification uses the same one
+        data_hash_type: How hash_value was computed when it is not hash_algorithm over the file
+            (e.g. the root of a record tree)
+        compression: Codec the data was compressed with before encryption, if any
+        compression_level: Level used with that codec
 
     Returns:
         metadata dictionary
     """
-    return {
+    metadata = {
         "original_filename": os.path.basename(original_file),
         "encrypted_filename": os.path.basename(encrypted_file),
         "encryption_timestamp": datetime.now().isoformat(),
         "data_hash": hash_value,
-        "encryption_method": "AES-256-CBC"
+        "hash_algorithm": hash_algorithm,
+        "encryption_method": encryption_method
     }
 
+    if data_hash_type and data_hash_type != hash_algorithm:
+        metadata["data_hash_type"] = data_hash_type
+
+    if compression:
+        metadata["compression"] = compression
+        metadata["compression_level"] = compression_level
+
+    if cipher_hash:
+        # Size and modification time tell later readers whether the cached hash still applies
+        stat = os.stat(encrypted_file)
+        metadata["cipher_hash"] = cipher_hash
+        metadata["encrypted_size"] = stat.st_size
+        metadata["encrypted_mtime_ns"] = stat.st_mtime_ns
+
+    return metadata
+
+
+class HashAlgorithmUnknown(Exception):
+    """The metadata of an encrypted file is missing, so its hash algorithm is unknown"""
+
+
+def _load_file_metadata(encrypted_file, metadata_file=None):
+    """Metadata describing an encrypted file (metadata_file, <file>.meta or <name>.meta), or None"""
+    candidates = [metadata_file, encrypted_file + '.meta', os.path.splitext(encrypted_file)[0] + '.meta']
+
+    for path in candidates:
+        if not path or not os.path.exists(path):
+            continue
+        try:
+            with open(path, 'r') as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            continue
+
+        if isinstance(metadata, dict) and metadata.get("encrypted_filename") == os.path.basename(encrypted_file):
+            return metadata
+
+    return None
+
+
+def load_cipher_hash(encrypted_file, metadata_file=None):
+    """
+    Cipher hash cached in the metadata of an encrypted file
+
+    Looks at metadata_file, then <encrypted_file>.meta and <name>.meta next
+    to it. The hash is only returned while the encrypted file still has the
+    size and modification time recorded with it.
+
+    Args:
+        encrypted_file: Path to the encrypted file
+        metadata_file: Path to its metadata file, if known
+
+    Returns:
+        tuple: (hex digest, hash algorithm), or None if there is no valid cached hash
+    """
+    metadata = _load_file_metadata(encrypted_file, metadata_file)
+    stat = os.stat(encrypted_file)
+
+    if (metadata and metadata.get("cipher_hash")
+            and metadata.get("encrypted_size") == stat.st_size
+            and metadata.get("encrypted_mtime_ns") == stat.st_mtime_ns):
+        # Metadata written before hash_algorithm was recorded always used SHA-256
+        return metadata["cipher_hash"], metadata.get("hash_algorithm", 'sha256')
+
+    return None
+
+
+def resolve_cipher_hash(encrypted_file, metadata_file=None, workers=1):
+    """
+    Cipher hash of an encrypted file, computed with the algorithm it was encrypted with
+
+    The cached hash is used while valid. Otherwise the file is hashed
+    again with the algorithm recorded in its metadata; files that are not
+    containers predate selectable algorithms and always used SHA-256.
+
+    Args:
+        encrypted_file: Path to the encrypted file
+        metadata_file: Path to its metadata file, if known
+        workers: Threads hashing leaves in tree mode
+
+    Returns:
+        tuple: (hex digest, hash algorithm)
+
+    Raises:
+        HashAlgorithmUnknown: a container has no metadata, so its algorithm can't be told
+    """
+    cached = load_cipher_hash(encrypted_file, metadata_file)
+    if cached:
+        return cached
+
+    metadata = _load_file_metadata(encrypted_file, metadata_file)
+    if metadata:
+        algorithm = metadata.get("hash_algorithm", 'sha256')
+    elif not is_container(encrypted_file):
+        algorithm = 'sha256'
+    else:
+        raise HashAlgorithmUnknown(
+            f"Metadata of {os.path.basename(encrypted_file)} is missing, cannot determine its hash algorithm")
+
+    return generate_file_hash(encrypted_file, algorithm=algorithm, workers=workers), algorithm
+
 
 def save_metadata(metadata, output_path):
     """
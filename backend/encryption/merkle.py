@@ -0,0 +1,111 @@
+import hashlib
+
+
+# Domain separation prefixes so a leaf can never be mistaken for an inner node
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+def hash_leaf(value):
+    """
+    Hash a leaf value
+
+    Args:
+        value: Hex digest string or bytes
+
+    Returns:
+        bytes: leaf hash
+    """
+    if isinstance(value, str):
+        value = bytes.fromhex(value)
+    return hashlib.sha256(LEAF_PREFIX + value).digest()
+
+
+def hash_node(left, right):
+    """Hash two child nodes into their parent"""
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+class MerkleTree:
+    """
+    Binary SHA-256 Merkle tree over a list of hex digests
+
+    When a level has an odd number of nodes, the last node is carried up
+    unchanged to the next level.
+    """
+
+    def __init__(self, leaves):
+        """
+        Build the tree
+
+        Args:
+            leaves: List of hex digest strings (or bytes)
+        """
+        if not leaves:
+            raise ValueError("Cannot build a Merkle tree without leaves")
+
+        self.levels = [[hash_leaf(leaf) for leaf in leaves]]
+
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            parents = [hash_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2 == 1:
+                parents.append(level[-1])
+            self.levels.append(parents)
+
+    @property
+    def root(self):
+        """Hex root of the tree"""
+        return self.levels[-1][0].hex()
+
+    def __len__(self):
+        return len(self.levels[0])
+
+    def get_proof(self, index):
+        """
+        Get the inclusion proof for a leaf
+
+        Args:
+            index: Position of the leaf
+
+        Returns:
+            list: [{'position': 'left'|'right', 'hash': hex}] from leaf to root
+        """
+        if index < 0 or index >= len(self):
+            raise IndexError(f"Leaf index {index} out of range")
+
+        proof = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                proof.append({
+                    'position': 'left' if sibling < index else 'right',
+                    'hash': level[sibling].hex()
+                })
+            index //= 2
+
+        return proof
+
+
+def verify_proof(leaf, proof, root):
+    """
+    Verify a Merkle inclusion proof
+
+    Args:
+        leaf: Hex digest of the leaf value
+        proof: Proof as returned by MerkleTree.get_proof
+        root: Expected hex root
+
+    Returns:
+        bool: True if the leaf is included under the root
+    """
+    node = hash_leaf(leaf)
+
+    for step in proof:
+        sibling = bytes.fromhex(step['hash'])
+        if step['position'] == 'left':
+            node = hash_node(sibling, node)
+        else:
+            node = hash_node(node, sibling)
+
+    return node.hex() == root.lower().replace('0x', '', 1)
@@ -0,0 +1,224 @@
+import json
+import base64
+from Crypto.Random import get_random_bytes
+from .container import FLAG_RECORDS, ContainerReader, encrypt_chunks
+
+# Records per encrypted group: reading one record decrypts only its group
+DEFAULT_GROUP_SIZE = 32
+
+# Field identifying a record (the address dataset's primary key)
+DEFAULT_ID_FIELD = 'OBJECTID'
+
+
+def _id_key(record_id):
+    """Normalize a record ID so 17, 17.0 and '17' find the same record"""
+    if isinstance(record_id, float) and record_id.is_integer():
+        record_id = int(record_id)
+    return str(record_id)
+
+
+def resolve_record_ids(records, id_field):
+    """
+    IDs used to index records
+
+    Args:
+        records: List of record dictionaries
+        id_field: Preferred ID field
+
+    Returns:
+        tuple: (id_field, list of IDs), with id_field None when row positions are used
+    """
+    record_ids = [record.get(id_field) for record in records]
+    if records and None not in record_ids and len({_id_key(rid) for rid in record_ids}) == len(record_ids):
+        return id_field, record_ids
+
+    # Fall back to row positions when the ID field is missing or not unique
+    if records:
+        print(f"Warning: '{id_field}' is missing or not unique, indexing records by row position")
+    return None, list(range(len(records)))
+
+
+def encrypt_records(document, output_path, key=None, id_field=DEFAULT_ID_FIELD, group_size=DEFAULT_GROUP_SIZE,
+                    workers=1, digest=None, compression=None, compression_level=None):
+    """
+    Encrypt a {"metadata", "data": [...]} document record group by record group
+
+    Chunk 0 of the container holds the encrypted record index (document
+    metadata plus the IDs in each group); chunk i + 1 holds group i as a
+    JSON list. The container's chunk table gives the offset of every
+    group, so single records can be decrypted without touching the rest.
+
+    Args:
+        document: Dictionary with 'data' (list of records) and optional 'metadata'
+        output_path: Path of the container to write
+        key: 32-byte key or base64 encoded key (default: a new random key)
+        id_field: Unique record field used as the record ID (row positions are used otherwise)
+        group_size: Records per encrypted group
+        workers: Number of threads encrypting groups
+        digest: Optional hashlib object fed the container bytes as they are written
+        compression: Optional codec each group is compressed with (see compression.py)
+        compression_level: Compression level (default: the codec's default)
+
+    Returns:
+        tuple: (output_path, encryption_key)
+    """
+    # Decode key if needed, or generate a new one
+    if isinstance(key, str):
+        key = base64.b64decode(key)
+    key = key or get_random_bytes(32)
+
+    records = document.get('data', [])
+    groups = [records[start:start + group_size] for start in range(0, len(records), group_size)]
+
+    id_field, record_ids = resolve_record_ids(records, id_field)
+    ids = [record_ids[start:start + group_size] for start in range(0, len(records), group_size)]
+
+    return write_record_groups(document.get('metadata', {}), id_field, groups, ids, output_path, key, workers,
+                               digest, compression, compression_level)
+
+
+def write_record_groups(metadata, id_field, groups, ids, output_path, key, workers=1, digest=None, compression=None,
+                        compression_level=None):
+    """
+    Write already grouped records to a record container
+
+    Args:
+        metadata: Document metadata stored in the index
+        id_field: Name of the ID field, or None for row positions
+        groups: List of record lists, one per group
+        ids: List of ID lists matching groups
+        output_path: Path of the container to write
+        key: 32-byte AES key
+        workers: Number of threads encrypting groups
+        digest: Optional hashlib object fed the container bytes as they are written
+        compression: Optional codec each group is compressed with (see compression.py)
+        compression_level: Compression level (default: the codec's default)
+
+    Returns:
+        tuple: (output_path, encryption_key)
+    """
+    index = {
+        'metadata': metadata,
+        'id_field': id_field,
+        'groups': ids
+    }
+
+    plaintexts = [json.dumps(index).encode('utf-8')]
+    plaintexts.extend(json.dumps(group).encode('utf-8') for group in groups)
+    encrypt_chunks(plaintexts, output_path, key, FLAG_RECORDS, workers, digest, compression, compression_level)
+
+    return output_path, base64.b64encode(key).decode('utf-8')
+
+
+class RecordReader:
+    """
+    Random access to the records of a container written by encrypt_records
+
+    The record index is decrypted once when the reader is opened; after
+    that each lookup decrypts only the groups holding the requested IDs.
+    """
+
+    def __init__(self, input_path, key):
+        """
+        Open a record container
+
+        Args:
+            input_path: Path of the container
+            key: 32-byte key or base64 encoded key
+        """
+        if isinstance(key, str):
+            key = base64.b64decode(key)
+        self.key = key
+        self.container = ContainerReader(input_path)
+
+        if not self.container.flags & FLAG_RECORDS:
+            self.container.close()
+            raise ValueError(f"{input_path} was not written by encrypt_records")
+
+        index = json.loads(self.container.read_chunk(0, key))
+        self.metadata = index['metadata']
+        self.id_field = index['id_field']
+        self.groups = index['groups']
+        self._group_of = {_id_key(record_id): group
+                          for group, group_ids in enumerate(self.groups) for record_id in group_ids}
+
+    def __len__(self):
+        return len(self._group_of)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Close the container"""
+        self.container.close()
+
+    def read_group(self, group):
+        """Decrypt one record group"""
+        return json.loads(self.container.read_chunk(group + 1, self.key))
+
+    def get(self, ids):
+        """
+        Decrypt the records with the given IDs
+
+        Args:
+            ids: Record IDs (values of the ID field, or row positions)
+
+        Returns:
+            list: records in the order of ids
+        """
+        missing = [record_id for record_id in ids if _id_key(record_id) not in self._group_of]
+        if missing:
+            raise KeyError(f"Unknown record IDs: {missing[:10]}")
+
+        # Decrypt each needed group once
+        decrypted = {}
+        records = []
+        for record_id in ids:
+            group = self._group_of[_id_key(record_id)]
+            if group not in decrypted:
+                decrypted[group] = dict(zip((_id_key(gid) for gid in self.groups[group]), self.read_group(group)))
+            records.append(decrypted[group][_id_key(record_id)])
+
+        return records
+
+    def all(self):
+        """
+        Decrypt every record
+
+        Returns:
+            dict: the original {"metadata", "data"} document
+        """
+        data = []
+        for group in range(len(self.groups)):
+            data.extend(self.read_group(group))
+        return {'metadata': self.metadata, 'data': data}
+
+
+def decrypt_records(input_path, key, ids=None):
+    """
+    Decrypt selected records of a container written by encrypt_records
+
+    Args:
+        input_path: Path of the container
+        key: 32-byte key or base64 encoded key
+        ids: Record IDs to decrypt (default: all records)
+
+    Returns:
+        list: the decrypted records
+    """
+    with RecordReader(input_path, key) as reader:
+        if ids is None:
+            return reader.all()['data']
+        return reader.get(ids)
+
+
+def is_record_file(path):
+    """Check whether a file was written by encrypt_records"""
+    try:
+        with ContainerReader(path) as reader:
+            return bool(reader.flags & FLAG_RECORDS)
+    except ValueError:
+        return False
@@ -0,0 +1,152 @@
+import json
+import hashlib
+from .merkle import MerkleTree, verify_proof
+from .record_encryption import DEFAULT_ID_FIELD, _id_key, resolve_record_ids
+
+# Value recorded as data_hash_type in the metadata when data_hash is a record tree root
+DATA_HASH_TYPE = 'record-merkle-sha256'
+
+RECORD_TREE_VERSION = 1
+
+
+def canonical_record(record):
+    """Canonical JSON bytes of a record: sorted keys, no whitespace"""
+    return json.dumps(record, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def record_leaf(record_id, record):
+    """
+    Leaf digest of one record
+
+    The record ID is hashed together with the record, so a proof for one
+    ID cannot be replayed for a record stored under another.
+
+    Args:
+        record_id: Value of the ID field, or the row position
+        record: Record dictionary
+
+    Returns:
+        hex digest
+    """
+    return hashlib.sha256(canonical_record([_id_key(record_id), record])).hexdigest()
+
+
+def record_tree_path(encrypted_path):
+    """Path of the record leaf digests written next to an encrypted dataset"""
+    return encrypted_path + '.merkle'
+
+
+class RecordTree:
+    """
+    Merkle tree over the records of a {"metadata", "data"} document
+
+    One leaf per record, in document order, keyed by the ID field (row
+    positions when it is missing or not unique). Any single record can be
+    proven against the root with O(log n) hashes.
+    """
+
+    def __init__(self, records=None, id_field=DEFAULT_ID_FIELD, ids=None, leaves=None):
+        """
+        Build the tree from records, or from already computed ids and leaves
+
+        Args:
+            records: List of record dictionaries
+            id_field: Unique record field used as the record ID
+            ids: Record IDs matching leaves (with leaves, instead of records)
+            leaves: Hex leaf digests (with ids, instead of records)
+        """
+        if leaves is None:
+            records = records or []
+            self.id_field, ids = resolve_record_ids(records, id_field)
+            leaves = [record_leaf(record_id, record) for record_id, record in zip(ids, records)]
+        else:
+            self.id_field = id_field
+
+        self.ids = list(ids)
+        self.leaves = list(leaves)
+        self._position = {_id_key(record_id): index for index, record_id in enumerate(self.ids)}
+
+        # An empty dataset has no tree; its root is the digest of nothing
+        self.tree = MerkleTree(self.leaves) if self.leaves else None
+
+    @property
+    def root(self):
+        """Hex root of the tree"""
+        return self.tree.root if self.tree else hashlib.sha256(b'').hexdigest()
+
+    def __len__(self):
+        return len(self.leaves)
+
+    def prove_record(self, record_id):
+        """
+        Inclusion proof for one record
+
+        Args:
+            record_id: Value of the ID field (the row position if the tree is keyed by position)
+
+        Returns:
+            dict: record_id, leaf_index, proof and root, to be checked with verify_record
+        """
+        key = _id_key(record_id)
+        if key not in self._position:
+            raise KeyError(f"Unknown record ID: {record_id}")
+
+        index = self._position[key]
+        return {
+            'record_id': self.ids[index],
+            'leaf_index': index,
+            'proof': self.tree.get_proof(index),
+            'root': self.root
+        }
+
+    def save(self, path):
+        """
+        Save the leaf digests, so proofs can be produced without decrypting the dataset
+
+        The file holds record IDs and digests only, no record contents.
+        """
+        with open(path, 'w') as f:
+            json.dump({
+                'version': RECORD_TREE_VERSION,
+                'id_field': self.id_field,
+                'root': self.root,
+                'ids': self.ids,
+                'leaves': self.leaves
+            }, f)
+
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Load a tree saved with save, checking that it still matches its root"""
+        with open(path, 'r') as f:
+            saved = json.load(f)
+
+        if saved.get('version') != RECORD_TREE_VERSION:
+            raise ValueError(f"Unsupported record tree version {saved.get('version')}")
+
+        tree = cls(id_field=saved['id_field'], ids=saved['ids'], leaves=saved['leaves'])
+        if tree.root != saved['root']:
+            raise ValueError(f"Record tree {path} does not match its root")
+        return tree
+
+
+def verify_record(record, proof, root, record_id):
+    """
+    Verify that a record is part of a dataset under the expected ID
+
+    The leaf is recomputed with the ID the caller asked for, not the one
+    the proof names, so a proof for one record can't be shown for another.
+
+    Args:
+        record: The record dictionary as received
+        proof: Proof returned by RecordTree.prove_record
+        root: Trusted root (the data_hash from the dataset's metadata)
+        record_id: ID the record was requested under
+
+    Returns:
+        bool: True if the record is included under the root unchanged, under record_id
+    """
+    if _id_key(proof['record_id']) != _id_key(record_id):
+        return False
+    return verify_proof(record_leaf(record_id, record), proof['proof'], root)
@@ -1,9 +1,26 @@
 import os
+import json
+import time
 import base64
+import hashlib
+import threading
+from functools import lru_cache
+from collections import OrderedDict
 from Crypto.PublicKey import RSA
 from Crypto.Cipher import PKCS1_OAEP
 from Crypto.Hash import SHA256
 
+# Directory holding the persistent keyring (default key pair and recipient public keys)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+KEYRING_DIR = os.environ.get('KEYRING_DIR', os.path.join(BASE_DIR, 'keyring'))
+
+# Name of the key pair used when no recipient is given
+DEFAULT_RECIPIENT = 'default'
+
+# Unwrapped data keys kept in memory, and for how long (seconds)
+DATA_KEY_CACHE_SIZE = int(os.environ.get('DATA_KEY_CACHE_SIZE', 1024))
+DATA_KEY_CACHE_TTL = float(os.environ.get('DATA_KEY_CACHE_TTL', 300))
+
 
 class RSACipher:
     """
@@ -18,6 +35,10 @@ class RSACipher:
         self.private_key = None
         self.public_key = None
 
+        # Imported keys and OAEP ciphers, built on first use and reset when the keys change
+        self._encryptor = None
+        self._decryptor = None
+
     def generate_key_pair(self):
         """
         Generate a new RSA key pair
@@ -31,6 +52,8 @@ class RSACipher:
         # Extract private and public keys
         self.private_key = key.export_key().decode('utf-8')
         self.public_key = key.publickey().export_key().decode('utf-8')
+        self._encryptor = PKCS1_OAEP.new(key.publickey(), hashAlgo=SHA256)
+        self._decryptor = PKCS1_OAEP.new(key, hashAlgo=SHA256)
 
         return self.private_key, self.public_key
 
@@ -48,6 +71,7 @@ class RSACipher:
                 with open(private_key, 'r') as f:
                     private_key = f.read()
             self.private_key = private_key
+            self._decryptor = None
 
         # Load public key if provided
         if public_key:
@@ -55,17 +79,21 @@ class RSACipher:
                 with open(public_key, 'r') as f:
                     public_key = f.read()
             self.public_key = public_key
+            self._encryptor = None
 
     def save_keys(self, private_key_path=None, public_key_path=None):
         """
         Save RSA keys to files
 
         Args:
-            private_key_path: Path to save private key
+            private_key_path: Path to save private key (written with 0600 permissions)
             public_key_path: Path to save public key
         """
         if private_key_path and self.private_key:
-            with open(private_key_path, 'w') as f:
+            # Created owner-only rather than chmod-ed after the key was already written
+            fd = os.open(private_key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                os.fchmod(f.fileno(), 0o600)
                 f.write(self.private_key)
 
         if public_key_path and self.public_key:
@@ -89,14 +117,12 @@ class RSACipher:
         if isinstance(data, str):
             data = data.encode('utf-8')
 
-        # Import the public key
-        key = RSA.import_key(self.public_key)
-
-        # Create cipher
-        cipher = PKCS1_OAEP.new(key, hashAlgo=SHA256)
+        # Import the public key and create the cipher once
+        if self._encryptor is None:
+            self._encryptor = PKCS1_OAEP.new(RSA.import_key(self.public_key), hashAlgo=SHA256)
 
         # Encrypt data
-        encrypted = cipher.encrypt(data)
+        encrypted = self._encryptor.encrypt(data)
 
         # Return base64 encoded encrypted data
         return base64.b64encode(encrypted).decode('utf-8')
@@ -117,44 +143,375 @@ class RSACipher:
         # Decode base64 data
         encrypted = base64.b64decode(encrypted_data)
 
-        # Import the private key
-        key = RSA.import_key(self.private_key)
-
-        # Create cipher
-        cipher = PKCS1_OAEP.new(key, hashAlgo=SHA256)
+        # Import the private key and create the cipher once
+        if self._decryptor is None:
+            self._decryptor = PKCS1_OAEP.new(RSA.import_key(self.private_key), hashAlgo=SHA256)
 
         # Decrypt data
-        decrypted = cipher.decrypt(encrypted)
+        decrypted = self._decryptor.decrypt(encrypted)
 
         return decrypted
 
 
+class KeyRing:
+    """
+    Persistent set of RSA keys used to wrap AES data keys
+
+    Key files are read and imported once per process and the resulting
+    ciphers are reused, so wrapping a key costs one RSA public-key
+    operation and unwrapping one private-key operation. The default key
+    pair is generated on first use and stored in the keyring directory
+    instead of being regenerated for every file.
+
+    Layout: <name>.pub.pem for every recipient, plus <name>.pem for key
+    pairs whose private key is held locally.
+    """
+
+    def __init__(self, path=KEYRING_DIR, key_size=2048):
+        """
+        Initialize the keyring
+
+        Args:
+            path: Directory holding the key files
+            key_size: RSA key size for generated key pairs
+        """
+        self.path = path
+        self.key_size = key_size
+        self._ciphers = {}
+        self._lock = threading.Lock()
+
+    def _paths(self, name):
+        """Private and public key file paths of a recipient"""
+        return os.path.join(self.path, f"{name}.pem"), os.path.join(self.path, f"{name}.pub.pem")
+
+    def get(self, name=DEFAULT_RECIPIENT):
+        """
+        Cached RSACipher of a recipient, loaded from disk on first use
+
+        The default key pair is generated if it doesn't exist yet.
+
+        Args:
+            name: Recipient name
+
+        Returns:
+            RSACipher
+        """
+        with self._lock:
+            rsa = self._ciphers.get(name)
+            if rsa is not None:
+                return rsa
+
+            private_path, public_path = self._paths(name)
+            rsa = RSACipher(self.key_size)
+
+            if os.path.exists(public_path):
+                rsa.load_keys(private_key=private_path if os.path.exists(private_path) else None,
+                              public_key=public_path)
+            elif name == DEFAULT_RECIPIENT:
+                # Generate the default key pair once and keep it
+                os.makedirs(self.path, mode=0o700, exist_ok=True)
+                rsa.generate_key_pair()
+                rsa.save_keys(private_path, public_path)
+            else:
+                raise KeyError(f"No key for recipient '{name}' in {self.path}")
+
+            self._ciphers[name] = rsa
+            return rsa
+
+    def add_recipient(self, name, public_key, private_key=None):
+        """
+        Store a recipient's key in the keyring
+
+        Args:
+            name: Recipient name
+            public_key: PEM string or path to the public key file
+            private_key: PEM string or path to the private key file, if held locally
+        """
+        rsa = RSACipher(self.key_size)
+        rsa.load_keys(private_key=private_key, public_key=public_key)
+
+        os.makedirs(self.path, mode=0o700, exist_ok=True)
+        private_path, public_path = self._paths(name)
+        rsa.save_keys(private_path if private_key else None, public_path)
+
+        with self._lock:
+            self._ciphers[name] = rsa
+
+    def find(self, public_key):
+        """
+        Name of the recipient with a given public key
+
+        Args:
+            public_key: PEM encoded RSA public key
+
+        Returns:
+            str: recipient name, or None if the key is not in the keyring
+        """
+        wanted = RSA.import_key(public_key)
+        if not os.path.isdir(self.path):
+            return None
+
+        for filename in sorted(os.listdir(self.path)):
+            if filename.endswith('.pub.pem'):
+                name = filename[:-len('.pub.pem')]
+                key = RSA.import_key(self.get(name).public_key)
+                if (key.n, key.e) == (wanted.n, wanted.e):
+                    return name
+        return None
+
+    def wrap_keys(self, aes_keys, recipient=DEFAULT_RECIPIENT):
+        """
+        Encrypt AES keys for a recipient
+
+        Args:
+            aes_keys: List of AES keys (bytes or base64 strings)
+            recipient: Recipient name
+
+        Returns:
+            list: base64 encoded wrapped keys
+        """
+        rsa = self.get(recipient)
+        return [rsa.encrypt(base64.b64decode(key) if isinstance(key, str) else key) for key in aes_keys]
+
+    def unwrap_keys(self, wrapped_keys, recipient=DEFAULT_RECIPIENT):
+        """
+        Decrypt AES keys wrapped for a recipient whose private key is in the keyring
+
+        Args:
+            wrapped_keys: List of base64 encoded wrapped keys
+            recipient: Recipient name
+
+        Returns:
+            list: AES keys as bytes
+        """
+        rsa = self.get(recipient)
+        return [rsa.decrypt(wrapped) for wrapped in wrapped_keys]
+
+
+class DataKeyCache:
+    """
+    Bounded, time-limited cache of unwrapped AES data keys
+
+    Unwrapping costs an RSA private-key operation, so keys of recently
+    decrypted datasets are kept for DATA_KEY_CACHE_TTL seconds. Entries
+    remember the wrapped key they came from, so a data ID that was
+    re-encrypted under a new key is unwrapped again.
+    """
+
+    def __init__(self, max_entries=DATA_KEY_CACHE_SIZE, ttl=DATA_KEY_CACHE_TTL):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum number of keys kept (least recently used are evicted)
+            ttl: Seconds a key stays valid
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()     # data id -> (wrapped key, AES key, expiry)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, data_id, wrapped_key):
+        """
+        Look up the AES key of a data ID
+
+        Returns:
+            bytes: the AES key, or None if it is missing, expired or for another wrapped key
+        """
+        with self._lock:
+            entry = self._entries.get(data_id)
+            if entry is None or entry[0] != wrapped_key or entry[2] < time.time():
+                self._entries.pop(data_id, None)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(data_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, data_id, wrapped_key, aes_key):
+        """Store an unwrapped key"""
+        with self._lock:
+            self._entries[data_id] = (wrapped_key, aes_key, time.time() + self.ttl)
+            self._entries.move_to_end(data_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Forget every key"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Cache counters
+
+        Returns:
+            dict: entries, hits, misses
+        """
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+_keyring = None
+_keyring_lock = threading.Lock()
+_data_key_cache = DataKeyCache()
+
+
+def get_keyring():
+    """
+    Shared keyring of the process
+
+    Returns:
+        KeyRing: keyring at KEYRING_DIR
+    """
+    global _keyring
+    with _keyring_lock:
+        if _keyring is None:
+            _keyring = KeyRing()
+        return _keyring
+
+
 def encrypt_aes_key(aes_key, rsa_public_key=None):
     """
     Encrypt an AES key using RSA
 
+    Without a public key the keyring's default key pair is used, so the
+    pair is generated once rather than on every call. The private key is
+    never returned: it is shared by every dataset wrapped for the default
+    recipient and stays in the keyring.
+
     Args:
         aes_key: Base64 encoded AES key or bytes
         rsa_public_key: PEM encoded RSA public key
 
     Returns:
-        base64 encoded encrypted AES key
+        tuple: (base64 encoded encrypted AES key, public key PEM)
     """
     # Decode AES key if it's base64 encoded
     if isinstance(aes_key, str):
         aes_key = base64.b64decode(aes_key)
 
-    # Create RSA cipher
-    rsa = RSACipher()
-
     if rsa_public_key:
         # Use provided public key
+        rsa = RSACipher()
         rsa.load_keys(public_key=rsa_public_key)
     else:
-        # Generate new key pair if no public key provided
-        rsa.generate_key_pair()
+        # Use the cached default key pair
+        rsa = get_keyring().get()
 
     # Encrypt the AES key
     encrypted_key = rsa.encrypt(aes_key)
 
-    return encrypted_key, rsa.public_key, rsa.private_key
\ No newline at end of file
+    return encrypted_key, rsa.public_key
+
+
+@lru_cache(maxsize=32)
+def _private_key_cipher(private_key):
+    """RSACipher for a PEM private key, imported once per process"""
+    rsa = RSACipher()
+    rsa.load_keys(private_key=private_key)
+    return rsa
+
+
+def unwrap_aes_key(key_data, data_id=None, keyring=None):
+    """
+    Decrypt the AES key of an RSA key file
+
+    The private key comes from the key file when it carries one (older
+    files) or from the keyring otherwise. Unwrapped keys are cached by
+    data ID, so repeated decrypts of a dataset skip the RSA operation.
+
+    Args:
+        key_data: Key file contents with encrypted_aes_key and rsa_public_key or recipient
+        data_id: ID of the dataset (default: digest of the wrapped key)
+        keyring: KeyRing holding the private key (default: get_keyring())
+
+    Returns:
+        bytes: the AES key
+    """
+    wrapped_key = key_data['encrypted_aes_key']
+    cache_id = data_id or hashlib.sha256(wrapped_key.encode('utf-8')).hexdigest()
+
+    aes_key = _data_key_cache.get(cache_id, wrapped_key)
+    if aes_key is not None:
+        return aes_key
+
+    if key_data.get('rsa_private_key'):
+        rsa = _private_key_cipher(key_data['rsa_private_key'])
+    else:
+        keyring = keyring or get_keyring()
+        recipient = key_data.get('recipient') or keyring.find(key_data['rsa_public_key'])
+        if recipient is None:
+            raise KeyError(f"No private key in {keyring.path} for this key file")
+        rsa = keyring.get(recipient)
+
+    aes_key = rsa.decrypt(wrapped_key)
+    _data_key_cache.set(cache_id, wrapped_key, aes_key)
+    return aes_key
+
+
+def save_key_file(aes_key, key_path, use_rsa=False):
+    """
+    Write the key file of an encrypted dataset
+
+    Args:
+        aes_key: Base64 encoded AES key
+        key_path: Path of the key file
+        use_rsa: Wrap the key with the default keyring key pair instead of storing it as is
+
+    Returns:
+        key path
+    """
+    if not use_rsa:
+        # Plain AES key (in production, store this securely!)
+        with open(key_path, 'w') as f:
+            f.write(aes_key)
+        return key_path
+
+    # Save the wrapped key; the private key stays in the keyring
+    encrypted_key, public_key = encrypt_aes_key(aes_key)
+    key_data = {
+        "encrypted_aes_key": encrypted_key,
+        "rsa_public_key": public_key,
+        "recipient": DEFAULT_RECIPIENT
+    }
+    with open(key_path, 'w') as f:
+        json.dump(key_data, f, indent=2)
+    return key_path
+
+
+def load_key_file(key_path, data_id=None):
+    """
+    Read the AES key of an encrypted dataset from its key file
+
+    Plain key files hold the base64 key. RSA key files (JSON) are unwrapped
+    with unwrap_aes_key, so a long-lived process reading the same dataset
+    again skips the RSA operation.
+
+    Args:
+        key_path: Path of the key file
+        data_id: ID of the dataset, used as the data key cache entry
+
+    Returns:
+        AES key (base64 string for plain key files, bytes for RSA key files)
+    """
+    with open(key_path, 'r') as f:
+        content = f.read()
+
+    # Check if it's a JSON (RSA-encrypted key)
+    try:
+        key_data = json.loads(content)
+    except json.JSONDecodeError:
+        key_data = None
+
+    if isinstance(key_data, dict):
+        return unwrap_aes_key(key_data, data_id)
+    return content.strip()
+
+
+def data_key_cache_stats():
+    """Counters of the unwrapped data key cache"""
+    return _data_key_cache.stats()
@@ -0,0 +1,239 @@
+import json
+import math
+import base64
+from Crypto.Random import get_random_bytes
+from .container import FLAG_RECORDS, ContainerReader
+from .record_encryption import DEFAULT_ID_FIELD, resolve_record_ids, write_record_groups
+
+# Geohash precision of a tile: 6 characters is a cell of about 1.2 km x 0.6 km
+DEFAULT_PRECISION = 6
+
+# Dense tiles are split into groups of at most this many records
+MAX_TILE_RECORDS = 256
+
+# Column names accepted for coordinates (the address dataset uses lat/long)
+LAT_FIELDS = ('lat', 'latitude')
+LON_FIELDS = ('long', 'lon', 'longitude')
+
+# Tile of records without usable coordinates; never returned by bounding-box queries.
+# (0, 0) counts as missing: the address data uses it as a placeholder for 8870 rows
+UNLOCATED_TILE = ''
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+TILE_INDEX_VERSION = 1
+
+
+def geohash_encode(lat, lon, precision=DEFAULT_PRECISION):
+    """
+    Geohash of a point
+
+    Args:
+        lat: Latitude in degrees
+        lon: Longitude in degrees
+        precision: Number of characters
+
+    Returns:
+        str: the geohash
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+
+    # Interleave longitude and latitude bisections, 5 bits per character
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        if coordinate >= middle:
+            value = (value << 1) | 1
+            interval[0] = middle
+        else:
+            value <<= 1
+            interval[1] = middle
+        even = not even
+
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+
+    return ''.join(chars)
+
+
+def geohash_bounds(geohash):
+    """
+    Bounding box of a geohash cell
+
+    Returns:
+        list: [min_lat, min_lon, max_lat, max_lon]
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        value = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            middle = (interval[0] + interval[1]) / 2
+            if (value >> shift) & 1:
+                interval[0] = middle
+            else:
+                interval[1] = middle
+            even = not even
+
+    return [lat_range[0], lon_range[0], lat_range[1], lon_range[1]]
+
+
+def _coordinate(record, fields):
+    """First usable coordinate of a record among the candidate fields, or None"""
+    for field in fields:
+        try:
+            value = float(record[field])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if not math.isnan(value):
+            return value
+    return None
+
+
+def _in_bbox(lat, lon, bbox):
+    """Whether a point lies inside [min_lat, min_lon, max_lat, max_lon]"""
+    return lat is not None and lon is not None and bbox[0] <= lat <= bbox[2] and bbox[1] <= lon <= bbox[3]
+
+
+def _intersects(a, b):
+    """Whether two [min_lat, min_lon, max_lat, max_lon] boxes overlap"""
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def tile_index_path(encrypted_path):
+    """Path of the cleartext tile index written next to a tiled container"""
+    return encrypted_path + '.tiles'
+
+
+def encrypt_tiles(document, output_path, key=None, precision=DEFAULT_PRECISION, id_field=DEFAULT_ID_FIELD,
+                  workers=1, digest=None, compression=None, compression_level=None):
+    """
+    Encrypt a {"metadata", "data": [...]} document partitioned into geohash tiles
+
+    Records are grouped by the geohash of their lat/long, each tile (or
+    part of a dense tile) is encrypted as its own record group, and a
+    cleartext tile index with the cell bounds of every tile is written to
+    tile_index_path(output_path). The container is a regular record
+    container, so decrypt_records and RecordReader work on it too; records
+    come back ordered by tile.
+
+    Args:
+        document: Dictionary with 'data' (list of records) and optional 'metadata'
+        output_path: Path of the container to write
+        key: 32-byte key or base64 encoded key (default: a new random key)
+        precision: Geohash characters per tile
+        id_field: Unique record field used as the record ID (row positions are used otherwise)
+        workers: Number of threads encrypting tiles
+        digest: Optional hashlib object fed the container bytes as they are written
+        compression: Optional codec each tile group is compressed with (see compression.py)
+        compression_level: Compression level (default: the codec's default)
+
+    Returns:
+        tuple: (output_path, encryption_key)
+    """
+    # Decode key if needed, or generate a new one
+    if isinstance(key, str):
+        key = base64.b64decode(key)
+    key = key or get_random_bytes(32)
+
+    records = document.get('data', [])
+    id_field, record_ids = resolve_record_ids(records, id_field)
+
+    # Bucket record positions by tile
+    tiles = {}
+    for position, record in enumerate(records):
+        lat = _coordinate(record, LAT_FIELDS)
+        lon = _coordinate(record, LON_FIELDS)
+        located = _in_bbox(lat, lon, [-90, -180, 90, 180]) and (lat, lon) != (0, 0)
+        tile = geohash_encode(lat, lon, precision) if located else UNLOCATED_TILE
+        tiles.setdefault(tile, []).append(position)
+
+    # Sorted geohashes keep neighbouring tiles next to each other in the file
+    groups, ids, tile_index = [], [], {}
+    for tile in sorted(tiles):
+        positions = tiles[tile]
+        entry = {
+            'groups': [],
+            'count': len(positions),
+            'bbox': geohash_bounds(tile) if tile != UNLOCATED_TILE else None
+        }
+        for start in range(0, len(positions), MAX_TILE_RECORDS):
+            part = positions[start:start + MAX_TILE_RECORDS]
+            entry['groups'].append(len(groups))
+            groups.append([records[position] for position in part])
+            ids.append([record_ids[position] for position in part])
+        tile_index[tile] = entry
+
+    write_record_groups(document.get('metadata', {}), id_field, groups, ids, output_path, key, workers, digest,
+                        compression, compression_level)
+
+    # The index is cleartext so viewport queries can pick tiles before touching the key
+    with open(tile_index_path(output_path), 'w') as f:
+        json.dump({'version': TILE_INDEX_VERSION, 'precision': precision, 'tiles': tile_index}, f)
+
+    return output_path, base64.b64encode(key).decode('utf-8')
+
+
+def load_tile_index(encrypted_path):
+    """
+    Load the cleartext tile index of a tiled container
+
+    Returns:
+        dict: version, precision and tiles (geohash -> groups, count, bbox)
+    """
+    with open(tile_index_path(encrypted_path), 'r') as f:
+        index = json.load(f)
+
+    if index.get('version') != TILE_INDEX_VERSION:
+        raise ValueError(f"Unsupported tile index version {index.get('version')}")
+    return index
+
+
+def query_bbox(encrypted_path, key, min_lat, min_lon, max_lat, max_lon, tile_index=None):
+    """
+    Decrypt the records inside a bounding box
+
+    Only tiles whose cell intersects the box are decrypted; their records
+    are then filtered to the exact box. The tile index itself is not
+    authenticated: a modified index can hide tiles but not alter records.
+
+    Args:
+        encrypted_path: Path of a container written by encrypt_tiles
+        key: 32-byte key or base64 encoded key
+        min_lat, min_lon, max_lat, max_lon: The bounding box in degrees
+        tile_index: Already loaded tile index (default: read from disk)
+
+    Returns:
+        dict: records inside the box and the number of record groups decrypted
+    """
+    if isinstance(key, str):
+        key = base64.b64decode(key)
+    tile_index = tile_index or load_tile_index(encrypted_path)
+    bbox = [min_lat, min_lon, max_lat, max_lon]
+
+    groups = [group for entry in tile_index['tiles'].values()
+              if entry['bbox'] is not None and _intersects(entry['bbox'], bbox)
+              for group in entry['groups']]
+
+    records = []
+    with ContainerReader(encrypted_path) as container:
+        if not container.flags & FLAG_RECORDS:
+            raise ValueError(f"{encrypted_path} was not written by encrypt_tiles")
+
+        # Group g is chunk g + 1; chunk 0 (the record index) is not needed here
+        for group in sorted(groups):
+            for record in json.loads(container.read_chunk(group + 1, key)):
+                if _in_bbox(_coordinate(record, LAT_FIELDS), _coordinate(record, LON_FIELDS), bbox):
+                    records.append(record)
+
+    return {'records': records, 'groups_decrypted': len(groups)}
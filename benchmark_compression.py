@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import tempfile
+import argparse
+import pandas as pd
+
+# Add the project root directory to the Python path
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR)
+
+from backend.data_processing.extract_data import convert_to_json
+from backend.encryption.aes_encryption import encrypt_and_hash, decrypt_file_stream
+from backend.encryption.compression import available_codecs
+
+
+def elapsed_ms(start):
+    """Milliseconds since start"""
+    return (time.perf_counter() - start) * 1000
+
+
+def benchmark(csv_path, workers):
+    """
+    Compare encrypted size and wall-clock time per compression codec
+
+    The CSV is encrypted as raw bytes, and as the indented JSON document
+    convert_to_json writes from it. Encryption time includes hashing (and
+    the record tree for JSON); decryption streams to a file.
+
+    Args:
+        csv_path: Path to the CSV sample
+        workers: Threads compressing and encrypting chunks
+    """
+    with tempfile.TemporaryDirectory() as path:
+        json_path = os.path.join(path, 'formatted_data.json')
+        convert_to_json(pd.read_csv(csv_path), json_path)
+
+        for source, layout in ((csv_path, 'raw'), (json_path, 'json')):
+            size = os.path.getsize(source)
+            print(f"{os.path.basename(source)} ({size / 1024:.0f} KB, {layout} layout, {workers} worker(s)):")
+
+            for codec in [None] + available_codecs():
+                encrypted = os.path.join(path, 'data.enc')
+
+                start = time.perf_counter()
+                result = encrypt_and_hash(source, encrypted, layout=layout, workers=workers, compression=codec)
+                encrypt_ms = elapsed_ms(start)
+
+                start = time.perf_counter()
+                decrypt_file_stream(encrypted, result['key'], os.path.join(path, 'data.dec'), workers)
+                decrypt_ms = elapsed_ms(start)
+
+                label = f"{codec} (level {result['compression_level']})" if codec else 'none'
+                print(f"  - {label:<16} {result['cipher_size'] / 1024:8.0f} KB  {size / result['cipher_size']:5.1f}x  "
+                      f"encrypt {encrypt_ms:6.0f} ms  decrypt {decrypt_ms:5.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark compression before encryption')
+    parser.add_argument('--input', default=os.path.join(BASE_DIR, 'datasets', 'processed_data.csv'),
+                        help='CSV sample to measure')
+    parser.add_argument('--workers', type=int, default=1, help='Threads compressing and encrypting chunks')
+
+    args = parser.parse_args()
+    benchmark(args.input, args.workers)
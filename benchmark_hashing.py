@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+import argparse
+
+# Add the project root directory to the Python path
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR)
+
+from backend.encryption.container import DEFAULT_WORKERS
+from backend.encryption.encryption_utils import HASH_ALGORITHMS, new_digest
+
+
+def gigabytes_per_second(size, elapsed):
+    """Throughput of size bytes hashed in elapsed seconds"""
+    return size / (1024 ** 3) / elapsed if elapsed > 0 else float('inf')
+
+
+def benchmark(size_mb, rounds, workers):
+    """
+    Compare the throughput of every digest algorithm on an in-memory buffer
+
+    Tree modes are measured with one worker and with the given number of
+    workers, since they only pull ahead when leaves are hashed in parallel.
+
+    Args:
+        size_mb: Size of the buffer in MB
+        rounds: Runs per algorithm; the fastest one is reported
+        workers: Threads hashing tree leaves
+    """
+    data = os.urandom(size_mb * 1024 * 1024)
+    view = memoryview(data)
+    step = 1024 * 1024
+
+    print(f"Hashing {size_mb} MB, best of {rounds} rounds ({os.cpu_count()} cores):")
+    for algorithm in HASH_ALGORITHMS:
+        for threads in ([1, workers] if algorithm.endswith('-tree') and workers > 1 else [1]):
+            best = None
+            for _ in range(rounds):
+                start = time.perf_counter()
+                digest = new_digest(algorithm, threads)
+                # Fed in 1 MB steps, like generate_file_hash and the container writer
+                for offset in range(0, len(data), step):
+                    digest.update(view[offset:offset + step])
+                digest.hexdigest()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+
+            label = f"{algorithm} ({threads} worker{'s' if threads > 1 else ''})"
+            print(f"  - {label:<28} {gigabytes_per_second(len(data), best):.2f} GB/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark digest algorithms used for data and cipher hashes')
+    parser.add_argument('--size', type=int, default=256, help='Buffer size in MB')
+    parser.add_argument('--rounds', type=int, default=3, help='Runs per algorithm')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Threads hashing tree leaves (default: {DEFAULT_WORKERS}, one per core)')
+
+    args = parser.parse_args()
+    benchmark(args.size, args.rounds, args.workers)
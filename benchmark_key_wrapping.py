@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+import tempfile
+import argparse
+from Crypto.PublicKey import RSA
+from Crypto.Cipher import PKCS1_OAEP
+from Crypto.Hash import SHA256
+from Crypto.Random import get_random_bytes
+
+# Add the project root directory to the Python path
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR)
+
+from backend.encryption.rsa_encryption import KeyRing
+
+
+def per_key_ms(start, count):
+    """Average milliseconds per key since start"""
+    return (time.perf_counter() - start) * 1000 / count
+
+
+def benchmark(count, legacy_count):
+    """
+    Compare per-key wrap/unwrap latency of the keyring with the previous approach
+
+    Previously encrypt_aes_key generated a new key pair per call and every
+    encrypt/decrypt re-imported the PEM text.
+
+    Args:
+        count: AES keys wrapped and unwrapped through the keyring
+        legacy_count: AES keys measured the old way (key generation is slow)
+    """
+    aes_keys = [get_random_bytes(32) for _ in range(count)]
+
+    with tempfile.TemporaryDirectory() as path:
+        keyring = KeyRing(path)
+
+        start = time.perf_counter()
+        keyring.get()
+        setup_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        wrapped = keyring.wrap_keys(aes_keys)
+        wrap_ms = per_key_ms(start, count)
+
+        start = time.perf_counter()
+        unwrapped = keyring.unwrap_keys(wrapped)
+        unwrap_ms = per_key_ms(start, count)
+
+        assert unwrapped == aes_keys
+
+        private_pem = keyring.get().private_key
+        public_pem = keyring.get().public_key
+
+    # Old path: a new key pair for every wrapped key
+    start = time.perf_counter()
+    for aes_key in aes_keys[:legacy_count]:
+        key = RSA.generate(2048)
+        PKCS1_OAEP.new(RSA.import_key(key.publickey().export_key()), hashAlgo=SHA256).encrypt(aes_key)
+    legacy_generate_ms = per_key_ms(start, legacy_count)
+
+    # Old path with a given key: PEM import on every call
+    start = time.perf_counter()
+    legacy_wrapped = [PKCS1_OAEP.new(RSA.import_key(public_pem), hashAlgo=SHA256).encrypt(aes_key)
+                      for aes_key in aes_keys]
+    legacy_wrap_ms = per_key_ms(start, count)
+
+    start = time.perf_counter()
+    for wrapped_key in legacy_wrapped:
+        PKCS1_OAEP.new(RSA.import_key(private_pem), hashAlgo=SHA256).decrypt(wrapped_key)
+    legacy_unwrap_ms = per_key_ms(start, count)
+
+    print(f"Key wrapping over {count} AES keys (RSA-2048, OAEP/SHA-256):")
+    print(f"  - Keyring setup (generate default pair once): {setup_ms:.1f} ms")
+    print(f"  - Keyring wrap:                               {wrap_ms:.3f} ms/key")
+    print(f"  - Keyring unwrap:                             {unwrap_ms:.3f} ms/key")
+    print(f"  - Previous wrap, new key pair per call:       {legacy_generate_ms:.1f} ms/key ({legacy_count} keys)")
+    print(f"  - Previous wrap, PEM import per call:         {legacy_wrap_ms:.3f} ms/key")
+    print(f"  - Previous unwrap, PEM import per call:       {legacy_unwrap_ms:.3f} ms/key")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark AES key wrapping with the RSA keyring')
+    parser.add_argument('--keys', type=int, default=500, help='Number of AES keys to wrap and unwrap')
+    parser.add_argument('--legacy-keys', type=int, default=5,
+                        help='Number of keys measured with per-call key generation')
+
+    args = parser.parse_args()
+    benchmark(args.keys, args.legacy_keys)
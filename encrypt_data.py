@@ -1,6 +1,7 @@
 import os
 import sys
 import json
+import time
 import base64
 import argparse
 
@@ -9,19 +10,34 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(BASE_DIR)
 
 # Import encryption modules
-from backend.encryption.aes_encryption import encrypt_json_file, decrypt_json_file
-from backend.encryption.rsa_encryption import encrypt_aes_key
-from backend.encryption.encryption_utils import generate_hash, create_metadata, save_metadata
-
-
-def encrypt_geospatial_data(input_file, output_dir=None, use_rsa=False):
+from backend.encryption.aes_encryption import (encrypt_and_hash, decrypt_json_file, decrypt_file_stream,
+                                               is_stream_file, ENCRYPTION_METHOD, DEFAULT_WORKERS)
+from backend.encryption.record_encryption import is_record_file, RecordReader
+from backend.encryption.spatial_encryption import query_bbox
+from backend.encryption.compression import available_codecs, check_codec
+from backend.encryption.rsa_encryption import save_key_file, load_key_file
+from backend.encryption.encryption_utils import (create_metadata, save_metadata, HASH_ALGORITHMS,
+                                                 DEFAULT_HASH_ALGORITHM)
+
+
+def encrypt_geospatial_data(input_file, output_dir=None, use_rsa=False, stream=False, workers=DEFAULT_WORKERS,
+                            records=False, tiles=False, hash_algorithm=DEFAULT_HASH_ALGORITHM, compression=None,
+                            compression_level=None, record_tree=None):
     """
     Encrypt geospatial data and save the results
 
     Args:
-        input_file: Path to the JSON data file
+        input_file: Path to the JSON data file (any file when streaming)
         output_dir: Directory to save encrypted files (default: same as input)
         use_rsa: Whether to use RSA to encrypt the AES key
+        stream: Encrypt the raw bytes in chunks with constant memory
+        workers: Number of threads encrypting chunks
+        records: Encrypt the records of a {"metadata", "data"} document in groups for selective decryption
+        tiles: Like records, but grouped by geohash tile of lat/long for bounding-box reads
+        hash_algorithm: Digest algorithm of the data and cipher hashes (sha256, blake2b, or either with -tree)
+        compression: Codec the data is compressed with before encryption (zlib, bz2, lzma, zstd)
+        compression_level: Compression level (default: the codec's default)
+        record_tree: Save a record tree for per-record proofs (default: only with records or tiles)
 
     Returns:
         tuple: (encrypted_file_path, key_path, metadata_path)
@@ -39,47 +55,59 @@ def encrypt_geospatial_data(input_file, output_dir=None, use_rsa=False):
     key_file = os.path.join(output_dir, f"{base_name}.key")
     metadata_file = os.path.join(output_dir, f"{base_name}.meta")
 
-    # Generate hash of original data
-    with open(input_file, 'r') as f:
-        original_data = json.load(f)
-    data_hash = generate_hash(original_data)
-
-    print(f"Encrypting {input_file}...")
+    print(f"Encrypting {input_file} with {workers} worker(s)...")
+
+    # Read the source once, hashing it and the container while encrypting
+    if stream:
+        layout = 'raw'
+    elif tiles:
+        # One group per geohash tile, plus a cleartext tile index
+        layout = 'tiles'
+    elif records:
+        # Record groups encrypted individually, with an index of which group holds each record
+        layout = 'records'
+    else:
+        layout = 'json'
 
-    # Encrypt the JSON file
-    encrypted_path, aes_key = encrypt_json_file(input_file, encrypted_file)
+    start = time.perf_counter()
+    result = encrypt_and_hash(input_file, encrypted_file, layout=layout, workers=workers,
+                              hash_algorithm=hash_algorithm, compression=compression,
+                              compression_level=compression_level, record_tree=record_tree)
+    aes_key = result['key']
+    elapsed = time.perf_counter() - start
 
     if use_rsa:
-        # Encrypt the AES key with RSA
         print("Using RSA to encrypt the AES key...")
-        encrypted_key, public_key, private_key = encrypt_aes_key(aes_key)
-
-        # Save keys
-        key_data = {
-            "encrypted_aes_key": encrypted_key,
-            "rsa_public_key": public_key,
-            "rsa_private_key": private_key  # In production, store this securely!
-        }
-        with open(key_file, 'w') as f:
-            json.dump(key_data, f, indent=2)
-    else:
-        # Save AES key directly (in production, store this securely!)
-        with open(key_file, 'w') as f:
-            f.write(aes_key)
+    save_key_file(aes_key, key_file, use_rsa)
 
     # Create and save metadata
-    metadata = create_metadata(input_file, encrypted_file, data_hash)
+    metadata = create_metadata(input_file, encrypted_file, result['data_hash'], ENCRYPTION_METHOD,
+                               result['cipher_hash'], hash_algorithm, result['data_hash_type'],
+                               result['compression'], result['compression_level'])
     save_metadata(metadata, metadata_file)
 
     print(f"Encryption complete:")
     print(f"  - Encrypted file: {encrypted_file}")
     print(f"  - Key file: {key_file}")
     print(f"  - Metadata: {metadata_file}")
+    print(f"  - Data hash ({result['data_hash_type']}): {result['data_hash']}")
+    print(f"  - Cipher hash: {result['cipher_hash']}")
+    if compression:
+        ratio = os.path.getsize(input_file) / max(result['cipher_size'], 1)
+        print(f"  - Compression: {compression} level {result['compression_level']}, {ratio:.1f}x smaller")
+    print(f"  - Throughput: {_throughput(input_file, elapsed)}")
 
     return encrypted_file, key_file, metadata_file
 
 
-def decrypt_geospatial_data(encrypted_file, key_file, output_file=None):
+def _throughput(path, elapsed):
+    """Format the size of a file processed in elapsed seconds as MB/s"""
+    megabytes = os.path.getsize(path) / (1024 * 1024)
+    return f"{megabytes / elapsed if elapsed > 0 else float('inf'):.1f} MB/s ({megabytes:.1f} MB in {elapsed:.2f}s)"
+
+
+def decrypt_geospatial_data(encrypted_file, key_file, output_file=None, workers=DEFAULT_WORKERS, ids=None,
+                            bbox=None, data_id=None):
     """
     Decrypt geospatial data
 
@@ -87,6 +115,10 @@ def decrypt_geospatial_data(encrypted_file, key_file, output_file=None):
         encrypted_file: Path to the encrypted file
         key_file: Path to the key file
         output_file: Path to save decrypted data (default: original filename)
+        workers: Number of threads decrypting chunks
+        ids: Record IDs to decrypt from a record-level file (default: all records)
+        bbox: (min_lat, min_lon, max_lat, max_lon) to decrypt only the records of a tiled file inside it
+        data_id: Dataset ID under which an RSA-unwrapped key is cached (default: the wrapped key's digest)
 
     Returns:
         tuple: (decrypted_file_path, decrypted_data)
@@ -98,24 +130,37 @@ def decrypt_geospatial_data(encrypted_file, key_file, output_file=None):
 
     print(f"Decrypting {encrypted_file}...")
 
-    # Read the key file
-    with open(key_file, 'r') as f:
-        content = f.read()
-
-        # Check if it's a JSON (RSA-encrypted key)
-        try:
-            key_data = json.loads(content)
-            # TODO: Implement RSA decryption of the AES key
-            raise NotImplementedError("RSA key decryption not implemented in this script")
-        except json.JSONDecodeError:
-            # Plain AES key
-            key = content
+    # Read the key file; RSA-wrapped keys are unwrapped with the cached private key
+    key = load_key_file(key_file, data_id)
 
     # Decrypt the file
-    decrypted_path, decrypted_data = decrypt_json_file(encrypted_file, key, output_file)
+    start = time.perf_counter()
+    if is_stream_file(encrypted_file):
+        # Streamed files hold raw bytes, which are written out as they are verified
+        decrypted_path = decrypt_file_stream(encrypted_file, key, output_file, workers)
+        decrypted_data = None
+    elif bbox is not None:
+        # Only the tiles intersecting the box are decrypted
+        result = query_bbox(encrypted_file, key, *bbox)
+        print(f"  - {len(result['records'])} records from {result['groups_decrypted']} tile group(s)")
+        decrypted_data = {'data': result['records']}
+        with open(output_file, 'w') as f:
+            json.dump(decrypted_data, f, indent=2)
+        decrypted_path = output_file
+    elif is_record_file(encrypted_file):
+        # Only the groups holding the requested records are decrypted
+        with RecordReader(encrypted_file, key) as reader:
+            decrypted_data = reader.all() if ids is None else {'metadata': reader.metadata, 'data': reader.get(ids)}
+        with open(output_file, 'w') as f:
+            json.dump(decrypted_data, f, indent=2)
+        decrypted_path = output_file
+    else:
+        decrypted_path, decrypted_data = decrypt_json_file(encrypted_file, key, output_file)
+    elapsed = time.perf_counter() - start
 
     print(f"Decryption complete:")
     print(f"  - Decrypted file: {decrypted_path}")
+    print(f"  - Throughput: {_throughput(encrypted_file, elapsed)}")
 
     return decrypted_path, decrypted_data
 
@@ -127,12 +172,44 @@ if __name__ == "__main__":
     parser.add_argument('--key', help='Key file path (for decryption)')
     parser.add_argument('--output', help='Output file/directory')
     parser.add_argument('--rsa', action='store_true', help='Use RSA to encrypt the AES key')
+    parser.add_argument('--stream', action='store_true',
+                        help='Encrypt in authenticated chunks with constant memory (for large files)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Threads encrypting/decrypting chunks (default: {DEFAULT_WORKERS}, one per core)')
+    parser.add_argument('--records', action='store_true',
+                        help='Encrypt records in groups so single records can be decrypted on their own')
+    parser.add_argument('--ids', help='Comma-separated record IDs to decrypt from a record-level file')
+    parser.add_argument('--tiles', action='store_true',
+                        help='Encrypt records partitioned by geohash tile of their lat/long')
+    parser.add_argument('--bbox', help='min_lat,min_lon,max_lat,max_lon to decrypt from a tiled file')
+    parser.add_argument('--data-id', help='Dataset ID used to cache the unwrapped key of an RSA key file')
+    parser.add_argument('--compress', choices=available_codecs(),
+                        help='Compress each chunk with this codec before encrypting it')
+    parser.add_argument('--level', type=int, help='Compression level (default: the codec\'s default)')
+    parser.add_argument('--record-tree', action='store_true', default=None,
+                        help='Save a record tree for per-record proofs (always done with --records or --tiles)')
+    parser.add_argument('--hash', choices=HASH_ALGORITHMS,
+                        default=DEFAULT_HASH_ALGORITHM,
+                        help=f'Digest algorithm recorded in the metadata (default: {DEFAULT_HASH_ALGORITHM})')
 
     args = parser.parse_args()
 
+    if args.level is not None:
+        if not args.compress:
+            parser.error("--level needs a codec (--compress)")
+        try:
+            check_codec(args.compress, args.level)
+        except ValueError as e:
+            parser.error(str(e))
+
     if args.mode == 'encrypt':
-        encrypt_geospatial_data(args.input, args.output, args.rsa)
+        encrypt_geospatial_data(args.input, args.output, args.rsa, args.stream, args.workers, args.records,
+                                args.tiles, args.hash, args.compress, args.level, args.record_tree)
     else:  # decrypt
         if not args.key:
             parser.error("Key file path (--key) is required for decryption")
-        decrypt_geospatial_data(args.input, args.key, args.output)
\ No newline at end of file
+        ids = args.ids.split(',') if args.ids else None
+        bbox = [float(value) for value in args.bbox.split(',')] if args.bbox else None
+        if bbox is not None and len(bbox) != 4:
+            parser.error("--bbox expects min_lat,min_lon,max_lat,max_lon")
+        decrypt_geospatial_data(args.input, args.key, args.output, args.workers, ids, bbox, args.data_id)
\ No newline at end of file
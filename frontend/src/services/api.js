@@ -21,6 +21,46 @@ const api = {
     });
   },
 
+  getRecordProofs: (fileName, ids) => {
+    return axios.post(`${API_URL}/data/records/proof`, {
+      file: fileName,
+      ids,
+    });
+  },
+
+  getAccessChallenge: (dataId) => {
+    return axios.get(`${API_URL}/data/challenge`, {
+      params: {
+        data_id: dataId,
+      },
+    });
+  },
+
+  getRecords: (fileName, ids, dataId, nonce, signature) => {
+    return axios.post(`${API_URL}/data/records`, {
+      file: fileName,
+      ids,
+      data_id: dataId,
+      nonce,
+      signature,
+    });
+  },
+
+  getRecordsInBbox: (fileName, dataId, nonce, signature, [minLat, minLon, maxLat, maxLon]) => {
+    return axios.get(`${API_URL}/data/bbox`, {
+      params: {
+        file: fileName,
+        data_id: dataId,
+        nonce,
+        signature,
+        min_lat: minLat,
+        min_lon: minLon,
+        max_lat: maxLat,
+        max_lon: maxLon,
+      },
+    });
+  },
+
   listFiles: () => {
     return axios.get(`${API_URL}/data/files`);
   },
@@ -59,6 +59,13 @@ class Web3Service {
     if (!this.initialized) await this.init();
     return this.accounts.length > 0 ? this.accounts[0] : null;
   }
+
+  // Sign a data access challenge (personal_sign) with the current account
+  async signMessage(message) {
+    const account = await this.getCurrentAccount();
+    if (!account) throw new Error('No account available to sign with');
+    return this.web3.eth.personal.sign(message, account, '');
+  }
 }
 
 export default new Web3Service();
\ No newline at end of file
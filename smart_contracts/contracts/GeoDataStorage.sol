@@ -24,13 +24,27 @@ contract GeoDataStorage {
     // Array to keep track of all data IDs
     string[] private dataIds;
 
+    // Index of data IDs per owner
+    mapping(address => string[]) private ownerDataIds;
+
     // Access control mapping
     mapping(address => mapping(string => bool)) private accessControl;
 
+    // Structure for a Merkle root anchoring many encrypted data hashes
+    struct MerkleAnchor {
+        uint256 leafCount;      // Number of hashes under the root
+        uint256 timestamp;      // Timestamp when the root was anchored
+        address submitter;      // Account that anchored the root
+    }
+
+    // Mapping from Merkle root to its anchor record
+    mapping(bytes32 => MerkleAnchor) private anchors;
+
     // Events
     event DataStored(string dataId, address indexed owner, uint256 timestamp);
     event AccessGranted(string dataId, address indexed grantee, address indexed grantor);
     event AccessRevoked(string dataId, address indexed revokee, address indexed revoker);
+    event RootAnchored(bytes32 indexed root, uint256 leafCount, address indexed submitter, uint256 timestamp);
 
     /**
      * @dev Constructor sets the contract owner
@@ -70,6 +84,39 @@ contract GeoDataStorage {
         string memory cipherHash,
         string memory metadataHash
     ) public {
+        _storeData(dataId, cipherHash, metadataHash);
+    }
+
+    /**
+     * @dev Store several encrypted data references in one transaction
+     * @param dataIdList Unique identifiers for the data
+     * @param cipherHashes Hashes of the encrypted data
+     * @param metadataHashes Hashes of the metadata
+     */
+    function storeDataBatch(
+        string[] calldata dataIdList,
+        string[] calldata cipherHashes,
+        string[] calldata metadataHashes
+    ) external {
+        require(
+            dataIdList.length == cipherHashes.length &&
+            dataIdList.length == metadataHashes.length,
+            "Array length mismatch"
+        );
+
+        for (uint256 i = 0; i < dataIdList.length; i++) {
+            _storeData(dataIdList[i], cipherHashes[i], metadataHashes[i]);
+        }
+    }
+
+    /**
+     * @dev Store a single encrypted data reference owned by the caller
+     */
+    function _storeData(
+        string memory dataId,
+        string memory cipherHash,
+        string memory metadataHash
+    ) internal {
         // Ensure data ID doesn't already exist
         require(!dataStore[dataId].exists, "Data ID already exists");
 
@@ -82,8 +129,9 @@ contract GeoDataStorage {
             exists: true
         });
 
-        // Add data ID to the array
+        // Add data ID to the array and the owner's index
         dataIds.push(dataId);
+        ownerDataIds[msg.sender].push(dataId);
 
         // Emit event
         emit DataStored(dataId, msg.sender, block.timestamp);
@@ -120,6 +168,54 @@ contract GeoDataStorage {
     function grantAccess(string memory dataId, address grantee)
         public
     {
+        _grantAccess(dataId, grantee);
+    }
+
+    /**
+     * @dev Grant access for several (dataId, grantee) pairs in one transaction
+     * @param dataIdList Unique identifiers for the data
+     * @param grantees Addresses to grant access to
+     */
+    function grantAccessBatch(string[] calldata dataIdList, address[] calldata grantees)
+        external
+    {
+        require(dataIdList.length == grantees.length, "Array length mismatch");
+
+        for (uint256 i = 0; i < dataIdList.length; i++) {
+            _grantAccess(dataIdList[i], grantees[i]);
+        }
+    }
+
+    /**
+     * @dev Revoke access to data for a specific address
+     * @param dataId Unique identifier for the data
+     * @param revokee Address to revoke access from
+     */
+    function revokeAccess(string memory dataId, address revokee)
+        public
+    {
+        _revokeAccess(dataId, revokee);
+    }
+
+    /**
+     * @dev Revoke access for several (dataId, revokee) pairs in one transaction
+     * @param dataIdList Unique identifiers for the data
+     * @param revokees Addresses to revoke access from
+     */
+    function revokeAccessBatch(string[] calldata dataIdList, address[] calldata revokees)
+        external
+    {
+        require(dataIdList.length == revokees.length, "Array length mismatch");
+
+        for (uint256 i = 0; i < dataIdList.length; i++) {
+            _revokeAccess(dataIdList[i], revokees[i]);
+        }
+    }
+
+    /**
+     * @dev Grant access to data owned by the caller
+     */
+    function _grantAccess(string memory dataId, address grantee) internal {
         // Ensure data exists and caller is the owner
         require(dataStore[dataId].exists, "Data not found");
         require(dataStore[dataId].owner == msg.sender, "Not authorized: caller is not the data owner");
@@ -132,13 +228,9 @@ contract GeoDataStorage {
     }
 
     /**
-     * @dev Revoke access to data for a specific address
-     * @param dataId Unique identifier for the data
-     * @param revokee Address to revoke access from
+     * @dev Revoke access to data owned by the caller
      */
-    function revokeAccess(string memory dataId, address revokee)
-        public
-    {
+    function _revokeAccess(string memory dataId, address revokee) internal {
         // Ensure data exists and caller is the owner
         require(dataStore[dataId].exists, "Data not found");
         require(dataStore[dataId].owner == msg.sender, "Not authorized: caller is not the data owner");
@@ -189,27 +281,87 @@ contract GeoDataStorage {
         view
         returns (string[] memory)
     {
-        // Count how many data IDs are owned by the caller
-        uint256 count = 0;
-        for (uint256 i = 0; i < dataIds.length; i++) {
-            if (dataStore[dataIds[i]].owner == msg.sender) {
-                count++;
-            }
+        return ownerDataIds[msg.sender];
+    }
+
+    /**
+     * @dev Get the total number of data IDs
+     * @return number of data IDs
+     */
+    function getDataIdCount()
+        public
+        view
+        returns (uint256)
+    {
+        return dataIds.length;
+    }
+
+    /**
+     * @dev Get a page of data IDs
+     * @param offset Index of the first data ID to return
+     * @param limit Maximum number of data IDs to return
+     * @return array of at most limit data IDs
+     */
+    function getDataIdsPaginated(uint256 offset, uint256 limit)
+        public
+        view
+        returns (string[] memory)
+    {
+        return _slice(dataIds, offset, limit);
+    }
+
+    /**
+     * @dev Get the number of data IDs owned by an address
+     * @param dataOwner Address of the owner
+     * @return number of data IDs owned by the address
+     */
+    function getOwnerDataIdCount(address dataOwner)
+        public
+        view
+        returns (uint256)
+    {
+        return ownerDataIds[dataOwner].length;
+    }
+
+    /**
+     * @dev Get a page of data IDs owned by an address
+     * @param dataOwner Address of the owner
+     * @param offset Index of the first data ID to return
+     * @param limit Maximum number of data IDs to return
+     * @return array of at most limit data IDs
+     */
+    function getOwnerDataIds(address dataOwner, uint256 offset, uint256 limit)
+        public
+        view
+        returns (string[] memory)
+    {
+        return _slice(ownerDataIds[dataOwner], offset, limit);
+    }
+
+    /**
+     * @dev Copy the range [offset, offset + limit) of a storage array into memory
+     */
+    function _slice(string[] storage source, uint256 offset, uint256 limit)
+        internal
+        view
+        returns (string[] memory)
+    {
+        if (offset >= source.length) {
+            return new string[](0);
         }
 
-        // Create array of the right size
-        string[] memory myDataIds = new string[](count);
+        // Clamp without computing offset + limit, which could overflow
+        uint256 end = source.length;
+        if (limit < source.length - offset) {
+            end = offset + limit;
+        }
 
-        // Fill the array
-        uint256 index = 0;
-        for (uint256 i = 0; i < dataIds.length; i++) {
-            if (dataStore[dataIds[i]].owner == msg.sender) {
-                myDataIds[index] = dataIds[i];
-                index++;
-            }
+        string[] memory page = new string[](end - offset);
+        for (uint256 i = offset; i < end; i++) {
+            page[i - offset] = source[i];
         }
 
-        return myDataIds;
+        return page;
     }
 
     /**
@@ -237,4 +389,38 @@ contract GeoDataStorage {
         // Emit event
         emit DataStored(dataId, msg.sender, block.timestamp);
     }
-}
\ No newline at end of file
+
+    /**
+     * @dev Anchor the Merkle root of a batch of encrypted data hashes
+     * @param root Merkle root of the batch
+     * @param leafCount Number of hashes in the batch
+     */
+    function anchorRoot(bytes32 root, uint256 leafCount) public {
+        // Ensure the root hasn't been anchored already
+        require(anchors[root].timestamp == 0, "Root already anchored");
+        require(leafCount > 0, "Empty batch");
+
+        anchors[root] = MerkleAnchor({
+            leafCount: leafCount,
+            timestamp: block.timestamp,
+            submitter: msg.sender
+        });
+
+        // Emit event
+        emit RootAnchored(root, leafCount, msg.sender, block.timestamp);
+    }
+
+    /**
+     * @dev Get the anchor record of a Merkle root
+     * @param root Merkle root to look up
+     * @return leafCount, timestamp, submitter (timestamp is 0 if the root is unknown)
+     */
+    function getAnchor(bytes32 root)
+        public
+        view
+        returns (uint256, uint256, address)
+    {
+        MerkleAnchor storage anchor = anchors[root];
+        return (anchor.leafCount, anchor.timestamp, anchor.submitter);
+    }
+}
@@ -0,0 +1,370 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+/**
+ * @title GeoDataStorageCompact
+ * @dev GeoDataStorage variant that stores data IDs and SHA-256 digests as bytes32
+ *      instead of hex strings. Each record fits in three storage slots and mapping
+ *      lookups hash a fixed 32-byte key instead of a dynamic string.
+ */
+contract GeoDataStorageCompact {
+    // Contract owner
+    address private owner;
+
+    // Structure for storing encrypted data reference
+    struct EncryptedData {
+        bytes32 cipherHash;     // SHA-256 of the encrypted data
+        bytes32 metadataHash;   // SHA-256 of the metadata
+        uint64 timestamp;       // Timestamp when data was stored (packed with owner)
+        address owner;          // Owner of this data entry (zero if the entry doesn't exist)
+    }
+
+    // Mapping from data ID to EncryptedData
+    mapping(bytes32 => EncryptedData) private dataStore;
+
+    // Array to keep track of all data IDs
+    bytes32[] private dataIds;
+
+    // Index of data IDs per owner
+    mapping(address => bytes32[]) private ownerDataIds;
+
+    // Access control mapping
+    mapping(address => mapping(bytes32 => bool)) private accessControl;
+
+    // Structure for a Merkle root anchoring many encrypted data hashes
+    struct MerkleAnchor {
+        uint256 leafCount;      // Number of hashes under the root
+        uint256 timestamp;      // Timestamp when the root was anchored
+        address submitter;      // Account that anchored the root
+    }
+
+    // Mapping from Merkle root to its anchor record
+    mapping(bytes32 => MerkleAnchor) private anchors;
+
+    // Events
+    event DataStored(bytes32 dataId, address indexed owner, uint256 timestamp);
+    event AccessGranted(bytes32 dataId, address indexed grantee, address indexed grantor);
+    event AccessRevoked(bytes32 dataId, address indexed revokee, address indexed revoker);
+    event RootAnchored(bytes32 indexed root, uint256 leafCount, address indexed submitter, uint256 timestamp);
+
+    /**
+     * @dev Constructor sets the contract owner
+     */
+    constructor() {
+        owner = msg.sender;
+    }
+
+    /**
+     * @dev Modifier to check if caller has access to the data
+     */
+    modifier hasAccess(bytes32 dataId) {
+        require(
+            msg.sender == dataStore[dataId].owner ||
+            accessControl[msg.sender][dataId] == true,
+            "Not authorized: caller does not have access"
+        );
+        _;
+    }
+
+    /**
+     * @dev Store encrypted data reference
+     * @param dataId Unique identifier for the data
+     * @param cipherHash SHA-256 of the encrypted data
+     * @param metadataHash SHA-256 of the metadata
+     */
+    function storeData(bytes32 dataId, bytes32 cipherHash, bytes32 metadataHash) public {
+        _storeData(dataId, cipherHash, metadataHash);
+    }
+
+    /**
+     * @dev Store several encrypted data references in one transaction
+     * @param dataIdList Unique identifiers for the data
+     * @param cipherHashes SHA-256 digests of the encrypted data
+     * @param metadataHashes SHA-256 digests of the metadata
+     */
+    function storeDataBatch(
+        bytes32[] calldata dataIdList,
+        bytes32[] calldata cipherHashes,
+        bytes32[] calldata metadataHashes
+    ) external {
+        require(
+            dataIdList.length == cipherHashes.length &&
+            dataIdList.length == metadataHashes.length,
+            "Array length mismatch"
+        );
+
+        for (uint256 i = 0; i < dataIdList.length; i++) {
+            _storeData(dataIdList[i], cipherHashes[i], metadataHashes[i]);
+        }
+    }
+
+    /**
+     * @dev Store a single encrypted data reference owned by the caller
+     */
+    function _storeData(bytes32 dataId, bytes32 cipherHash, bytes32 metadataHash) internal {
+        // Ensure data ID doesn't already exist
+        require(dataStore[dataId].owner == address(0), "Data ID already exists");
+
+        // Store the encrypted data reference
+        dataStore[dataId] = EncryptedData({
+            cipherHash: cipherHash,
+            metadataHash: metadataHash,
+            timestamp: uint64(block.timestamp),
+            owner: msg.sender
+        });
+
+        // Add data ID to the array and the owner's index
+        dataIds.push(dataId);
+        ownerDataIds[msg.sender].push(dataId);
+
+        // Emit event
+        emit DataStored(dataId, msg.sender, block.timestamp);
+    }
+
+    /**
+     * @dev Retrieve encrypted data reference
+     * @param dataId Unique identifier for the data
+     * @return cipherHash, metadataHash, timestamp, owner
+     */
+    function retrieveData(bytes32 dataId)
+        public
+        view
+        hasAccess(dataId)
+        returns (bytes32, bytes32, uint256, address)
+    {
+        EncryptedData storage data = dataStore[dataId];
+
+        // Ensure data exists
+        require(data.owner != address(0), "Data not found");
+
+        return (data.cipherHash, data.metadataHash, data.timestamp, data.owner);
+    }
+
+    /**
+     * @dev Grant access to data for a specific address
+     * @param dataId Unique identifier for the data
+     * @param grantee Address to grant access to
+     */
+    function grantAccess(bytes32 dataId, address grantee) public {
+        _grantAccess(dataId, grantee);
+    }
+
+    /**
+     * @dev Grant access for several (dataId, grantee) pairs in one transaction
+     * @param dataIdList Unique identifiers for the data
+     * @param grantees Addresses to grant access to
+     */
+    function grantAccessBatch(bytes32[] calldata dataIdList, address[] calldata grantees) external {
+        require(dataIdList.length == grantees.length, "Array length mismatch");
+
+        for (uint256 i = 0; i < dataIdList.length; i++) {
+            _grantAccess(dataIdList[i], grantees[i]);
+        }
+    }
+
+    /**
+     * @dev Revoke access to data for a specific address
+     * @param dataId Unique identifier for the data
+     * @param revokee Address to revoke access from
+     */
+    function revokeAccess(bytes32 dataId, address revokee) public {
+        _revokeAccess(dataId, revokee);
+    }
+
+    /**
+     * @dev Revoke access for several (dataId, revokee) pairs in one transaction
+     * @param dataIdList Unique identifiers for the data
+     * @param revokees Addresses to revoke access from
+     */
+    function revokeAccessBatch(bytes32[] calldata dataIdList, address[] calldata revokees) external {
+        require(dataIdList.length == revokees.length, "Array length mismatch");
+
+        for (uint256 i = 0; i < dataIdList.length; i++) {
+            _revokeAccess(dataIdList[i], revokees[i]);
+        }
+    }
+
+    /**
+     * @dev Grant access to data owned by the caller
+     */
+    function _grantAccess(bytes32 dataId, address grantee) internal {
+        // Ensure data exists and caller is the owner
+        address dataOwner = dataStore[dataId].owner;
+        require(dataOwner != address(0), "Data not found");
+        require(dataOwner == msg.sender, "Not authorized: caller is not the data owner");
+
+        // Grant access
+        accessControl[grantee][dataId] = true;
+
+        // Emit event
+        emit AccessGranted(dataId, grantee, msg.sender);
+    }
+
+    /**
+     * @dev Revoke access to data owned by the caller
+     */
+    function _revokeAccess(bytes32 dataId, address revokee) internal {
+        // Ensure data exists and caller is the owner
+        address dataOwner = dataStore[dataId].owner;
+        require(dataOwner != address(0), "Data not found");
+        require(dataOwner == msg.sender, "Not authorized: caller is not the data owner");
+
+        // Revoke access
+        accessControl[revokee][dataId] = false;
+
+        // Emit event
+        emit AccessRevoked(dataId, revokee, msg.sender);
+    }
+
+    /**
+     * @dev Check if address has access to data
+     * @param dataId Unique identifier for the data
+     * @param addr Address to check
+     * @return boolean indicating if address has access
+     */
+    function checkAccess(bytes32 dataId, address addr) public view returns (bool) {
+        address dataOwner = dataStore[dataId].owner;
+
+        // Ensure data exists
+        require(dataOwner != address(0), "Data not found");
+
+        // Check if address is the owner or has been granted access
+        return (dataOwner == addr || accessControl[addr][dataId]);
+    }
+
+    /**
+     * @dev Get all data IDs
+     * @return array of data IDs
+     */
+    function getAllDataIds() public view returns (bytes32[] memory) {
+        return dataIds;
+    }
+
+    /**
+     * @dev Get data IDs owned by the caller
+     * @return array of data IDs owned by the caller
+     */
+    function getMyDataIds() public view returns (bytes32[] memory) {
+        return ownerDataIds[msg.sender];
+    }
+
+    /**
+     * @dev Get the total number of data IDs
+     * @return number of data IDs
+     */
+    function getDataIdCount() public view returns (uint256) {
+        return dataIds.length;
+    }
+
+    /**
+     * @dev Get a page of data IDs
+     * @param offset Index of the first data ID to return
+     * @param limit Maximum number of data IDs to return
+     * @return array of at most limit data IDs
+     */
+    function getDataIdsPaginated(uint256 offset, uint256 limit) public view returns (bytes32[] memory) {
+        return _slice(dataIds, offset, limit);
+    }
+
+    /**
+     * @dev Get the number of data IDs owned by an address
+     * @param dataOwner Address of the owner
+     * @return number of data IDs owned by the address
+     */
+    function getOwnerDataIdCount(address dataOwner) public view returns (uint256) {
+        return ownerDataIds[dataOwner].length;
+    }
+
+    /**
+     * @dev Get a page of data IDs owned by an address
+     * @param dataOwner Address of the owner
+     * @param offset Index of the first data ID to return
+     * @param limit Maximum number of data IDs to return
+     * @return array of at most limit data IDs
+     */
+    function getOwnerDataIds(address dataOwner, uint256 offset, uint256 limit)
+        public
+        view
+        returns (bytes32[] memory)
+    {
+        return _slice(ownerDataIds[dataOwner], offset, limit);
+    }
+
+    /**
+     * @dev Copy the range [offset, offset + limit) of a storage array into memory
+     */
+    function _slice(bytes32[] storage source, uint256 offset, uint256 limit)
+        internal
+        view
+        returns (bytes32[] memory)
+    {
+        if (offset >= source.length) {
+            return new bytes32[](0);
+        }
+
+        // Clamp without computing offset + limit, which could overflow
+        uint256 end = source.length;
+        if (limit < source.length - offset) {
+            end = offset + limit;
+        }
+
+        bytes32[] memory page = new bytes32[](end - offset);
+        for (uint256 i = offset; i < end; i++) {
+            page[i - offset] = source[i];
+        }
+
+        return page;
+    }
+
+    /**
+     * @dev Update encrypted data reference
+     * @param dataId Unique identifier for the data
+     * @param cipherHash New SHA-256 of the encrypted data
+     * @param metadataHash New SHA-256 of the metadata
+     */
+    function updateData(bytes32 dataId, bytes32 cipherHash, bytes32 metadataHash) public {
+        EncryptedData storage data = dataStore[dataId];
+
+        // Ensure data exists and caller is the owner
+        require(data.owner != address(0), "Data not found");
+        require(data.owner == msg.sender, "Not authorized: caller is not the data owner");
+
+        // Update the encrypted data reference
+        data.cipherHash = cipherHash;
+        data.metadataHash = metadataHash;
+        data.timestamp = uint64(block.timestamp);
+
+        // Emit event
+        emit DataStored(dataId, msg.sender, block.timestamp);
+    }
+
+    /**
+     * @dev Anchor the Merkle root of a batch of encrypted data hashes
+     * @param root Merkle root of the batch
+     * @param leafCount Number of hashes in the batch
+     */
+    function anchorRoot(bytes32 root, uint256 leafCount) public {
+        // Ensure the root hasn't been anchored already
+        require(anchors[root].timestamp == 0, "Root already anchored");
+        require(leafCount > 0, "Empty batch");
+
+        anchors[root] = MerkleAnchor({
+            leafCount: leafCount,
+            timestamp: block.timestamp,
+            submitter: msg.sender
+        });
+
+        // Emit event
+        emit RootAnchored(root, leafCount, msg.sender, block.timestamp);
+    }
+
+    /**
+     * @dev Get the anchor record of a Merkle root
+     * @param root Merkle root to look up
+     * @return leafCount, timestamp, submitter (timestamp is 0 if the root is unknown)
+     */
+    function getAnchor(bytes32 root) public view returns (uint256, uint256, address) {
+        MerkleAnchor storage anchor = anchors[root];
+        return (anchor.leafCount, anchor.timestamp, anchor.submitter);
+    }
+}
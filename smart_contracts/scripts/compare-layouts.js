@@ -0,0 +1,105 @@
+// compare-layouts.js
+// Compares gas usage and call latency of the string-based GeoDataStorage contract
+// with the bytes32-based GeoDataStorageCompact contract.
+//
+// Usage: npx hardhat run scripts/compare-layouts.js [--network localhost]
+const hre = require("hardhat");
+const crypto = require("crypto");
+
+// Number of records stored per layout
+const RECORDS = parseInt(process.env.COMPARE_RECORDS || "50", 10);
+
+// 64-character hex SHA-256 digest, as produced by generate_hash in the backend
+const sha256Hex = (text) => crypto.createHash("sha256").update(text).digest("hex");
+
+// Data ID as produced by BlockchainService.generate_data_id (32 hex chars for strings)
+const makeRecord = (i) => ({
+  dataId: sha256Hex(`dataset_${i}.enc_${Date.now()}`),
+  cipherHash: sha256Hex(`cipher-${i}`),
+  metadataHash: sha256Hex(`meta-${i}`),
+});
+
+// Convert a record to the argument layout used by each contract
+const layouts = {
+  GeoDataStorage: (r) => [r.dataId.slice(0, 32), r.cipherHash, r.metadataHash],
+  GeoDataStorageCompact: (r) => ["0x" + r.dataId, "0x" + r.cipherHash, "0x" + r.metadataHash],
+};
+
+async function gasOf(txPromise) {
+  const receipt = await (await txPromise).wait();
+  return receipt.gasUsed.toNumber();
+}
+
+async function averageMs(count, fn) {
+  const start = process.hrtime.bigint();
+  for (let i = 0; i < count; i++) {
+    await fn(i);
+  }
+  return Number(process.hrtime.bigint() - start) / 1e6 / count;
+}
+
+async function measure(contractName, records, grantee) {
+  const Factory = await hre.ethers.getContractFactory(contractName);
+  const contract = await Factory.deploy();
+  await contract.deployed();
+
+  const args = records.map(layouts[contractName]);
+  const half = Math.floor(args.length / 2);
+
+  // Single storeData transactions
+  let storeGas = 0;
+  for (const [dataId, cipherHash, metadataHash] of args.slice(0, half)) {
+    storeGas += await gasOf(contract.storeData(dataId, cipherHash, metadataHash));
+  }
+
+  // One storeDataBatch transaction for the rest
+  const batch = args.slice(half);
+  const batchGas = await gasOf(contract.storeDataBatch(
+    batch.map((a) => a[0]), batch.map((a) => a[1]), batch.map((a) => a[2])
+  ));
+
+  const grantGas = await gasOf(contract.grantAccess(args[0][0], grantee));
+  const calldataBytes = (contract.interface.encodeFunctionData("storeData", args[0]).length - 2) / 2;
+
+  // Read latency through the JSON-RPC provider
+  const retrieveMs = await averageMs(args.length, (i) => contract.retrieveData(args[i][0]));
+  const checkMs = await averageMs(args.length, (i) => contract.checkAccess(args[i][0], grantee));
+  const listMs = await averageMs(10, () => contract.getDataIdsPaginated(0, args.length));
+
+  return {
+    contract: contractName,
+    "storeData gas": Math.round(storeGas / half),
+    "batch gas / record": Math.round(batchGas / batch.length),
+    "grantAccess gas": grantGas,
+    "storeData calldata bytes": calldataBytes,
+    "retrieveData ms": retrieveMs.toFixed(2),
+    "checkAccess ms": checkMs.toFixed(2),
+    "list page ms": listMs.toFixed(2),
+  };
+}
+
+async function main() {
+  const [, grantee] = await hre.ethers.getSigners();
+  const records = Array.from({ length: RECORDS }, (_, i) => makeRecord(i));
+
+  const results = [];
+  for (const contractName of Object.keys(layouts)) {
+    results.push(await measure(contractName, records, grantee.address));
+  }
+
+  console.log(`Layout comparison over ${RECORDS} records on network '${hre.network.name}':`);
+  console.table(results);
+
+  const [strings, compact] = results;
+  const saving = (key) => (100 * (1 - compact[key] / strings[key])).toFixed(1);
+  console.log(`storeData gas saved by bytes32 layout: ${saving("storeData gas")}%`);
+  console.log(`Batch gas per record saved by bytes32 layout: ${saving("batch gas / record")}%`);
+}
+
+// Execute the script
+main()
+  .then(() => process.exit(0))
+  .catch((error) => {
+    console.error(error);
+    process.exit(1);
+  });
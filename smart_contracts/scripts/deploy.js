@@ -1,8 +1,11 @@
 const { ethers } = require("hardhat");
 
 async function main() {
+  // GeoDataStorage (string layout) or GeoDataStorageCompact (bytes32 layout)
+  const contractName = process.env.CONTRACT_NAME || "GeoDataStorage";
+
   // Get the contract factory
-  const GeoDataStorage = await ethers.getContractFactory("GeoDataStorage");
+  const GeoDataStorage = await ethers.getContractFactory(contractName);
 
   // Deploy the contract
   const geoDataStorage = await GeoDataStorage.deploy();
@@ -10,7 +13,7 @@ async function main() {
   // Wait for deployment
   await geoDataStorage.deployed();
 
-  console.log("GeoDataStorage deployed to:", geoDataStorage.address);
+  console.log(`${contractName} deployed to:`, geoDataStorage.address);
 }
 
 // Execute the deployment
@@ -163,4 +163,123 @@ describe("GeoDataStorage", function () {
       expect(addr1Ids).to.include("addr1-data-1");
     });
   });
+
+  describe("Batch Operations", function () {
+    it("Should store a batch of data entries", async function () {
+      await geoDataStorage.storeDataBatch(
+        ["batch-1", "batch-2", "batch-3"],
+        ["cipher-1", "cipher-2", "cipher-3"],
+        ["meta-1", "meta-2", "meta-3"]
+      );
+
+      const allIds = await geoDataStorage.getAllDataIds();
+      expect(allIds.length).to.equal(3);
+
+      const result = await geoDataStorage.retrieveData("batch-2");
+      expect(result[0]).to.equal("cipher-2");
+      expect(result[1]).to.equal("meta-2");
+      expect(result[3]).to.equal(owner.address);
+    });
+
+    it("Should reject batches with mismatched array lengths", async function () {
+      await expect(
+        geoDataStorage.storeDataBatch(["batch-1", "batch-2"], ["cipher-1"], ["meta-1", "meta-2"])
+      ).to.be.revertedWith("Array length mismatch");
+    });
+
+    it("Should revert the whole batch if one ID already exists", async function () {
+      await geoDataStorage.storeData("batch-1", "cipher-1", "meta-1");
+
+      await expect(
+        geoDataStorage.storeDataBatch(["batch-2", "batch-1"], ["cipher-2", "cipher-1"], ["meta-2", "meta-1"])
+      ).to.be.revertedWith("Data ID already exists");
+
+      const allIds = await geoDataStorage.getAllDataIds();
+      expect(allIds.length).to.equal(1);
+    });
+
+    it("Should grant and revoke access in batches", async function () {
+      await geoDataStorage.storeDataBatch(["batch-1", "batch-2"], ["cipher-1", "cipher-2"], ["meta-1", "meta-2"]);
+
+      await geoDataStorage.grantAccessBatch(["batch-1", "batch-2", "batch-1"], [addr1.address, addr1.address, addr2.address]);
+
+      expect(await geoDataStorage.checkAccess("batch-1", addr1.address)).to.equal(true);
+      expect(await geoDataStorage.checkAccess("batch-2", addr1.address)).to.equal(true);
+      expect(await geoDataStorage.checkAccess("batch-1", addr2.address)).to.equal(true);
+
+      await geoDataStorage.revokeAccessBatch(["batch-1", "batch-2"], [addr1.address, addr1.address]);
+
+      expect(await geoDataStorage.checkAccess("batch-1", addr1.address)).to.equal(false);
+      expect(await geoDataStorage.checkAccess("batch-2", addr1.address)).to.equal(false);
+      expect(await geoDataStorage.checkAccess("batch-1", addr2.address)).to.equal(true);
+    });
+
+    it("Should not allow batch grants on data owned by someone else", async function () {
+      await geoDataStorage.storeData("batch-1", "cipher-1", "meta-1");
+
+      await expect(
+        geoDataStorage.connect(addr1).grantAccessBatch(["batch-1"], [addr2.address])
+      ).to.be.revertedWith("Not authorized: caller is not the data owner");
+    });
+  });
+
+  describe("Merkle Anchoring", function () {
+    const root = ethers.utils.keccak256(ethers.utils.toUtf8Bytes("batch-root"));
+
+    it("Should anchor a Merkle root", async function () {
+      await geoDataStorage.anchorRoot(root, 42);
+
+      const anchor = await geoDataStorage.getAnchor(root);
+      expect(anchor[0]).to.equal(42);
+      expect(anchor[1]).to.be.gt(0);
+      expect(anchor[2]).to.equal(owner.address);
+    });
+
+    it("Should not anchor the same root twice", async function () {
+      await geoDataStorage.anchorRoot(root, 42);
+
+      await expect(
+        geoDataStorage.connect(addr1).anchorRoot(root, 1)
+      ).to.be.revertedWith("Root already anchored");
+    });
+
+    it("Should return an empty anchor for unknown roots", async function () {
+      const anchor = await geoDataStorage.getAnchor(root);
+      expect(anchor[1]).to.equal(0);
+    });
+  });
+
+  describe("Pagination", function () {
+    beforeEach(async function () {
+      for (let i = 1; i <= 5; i++) {
+        await geoDataStorage.storeData(`owner-data-${i}`, `cipher-${i}`, `meta-${i}`);
+      }
+      await geoDataStorage.connect(addr1).storeData("addr1-data-1", "cipher-6", "meta-6");
+    });
+
+    it("Should return the data ID count", async function () {
+      expect(await geoDataStorage.getDataIdCount()).to.equal(6);
+      expect(await geoDataStorage.getOwnerDataIdCount(owner.address)).to.equal(5);
+      expect(await geoDataStorage.getOwnerDataIdCount(addr1.address)).to.equal(1);
+    });
+
+    it("Should return pages of data IDs", async function () {
+      const firstPage = await geoDataStorage.getDataIdsPaginated(0, 4);
+      expect(firstPage).to.deep.equal(["owner-data-1", "owner-data-2", "owner-data-3", "owner-data-4"]);
+
+      const lastPage = await geoDataStorage.getDataIdsPaginated(4, 4);
+      expect(lastPage).to.deep.equal(["owner-data-5", "addr1-data-1"]);
+
+      const pastEnd = await geoDataStorage.getDataIdsPaginated(10, 4);
+      expect(pastEnd.length).to.equal(0);
+    });
+
+    it("Should return pages of an owner's data IDs", async function () {
+      const page = await geoDataStorage.getOwnerDataIds(owner.address, 1, 2);
+      expect(page).to.deep.equal(["owner-data-2", "owner-data-3"]);
+
+      const addr1Page = await geoDataStorage.getOwnerDataIds(addr1.address, 0, 10);
+      expect(addr1Page).to.deep.equal(["addr1-data-1"]);
+    });
+  });
 });
\ No newline at end of file
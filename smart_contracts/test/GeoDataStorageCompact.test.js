@@ -0,0 +1,112 @@
+const { expect } = require("chai");
+const { ethers } = require("hardhat");
+
+// SHA-256-sized test values as bytes32
+const toBytes32 = (text) => ethers.utils.sha256(ethers.utils.toUtf8Bytes(text));
+
+describe("GeoDataStorageCompact", function () {
+  let GeoDataStorageCompact;
+  let geoDataStorage;
+  let owner;
+  let addr1;
+  let addr2;
+
+  const dataId = toBytes32("test-data-1");
+  const cipherHash = toBytes32("cipher-1");
+  const metadataHash = toBytes32("meta-1");
+
+  beforeEach(async function () {
+    // Get signers
+    [owner, addr1, addr2] = await ethers.getSigners();
+
+    // Deploy the contract
+    GeoDataStorageCompact = await ethers.getContractFactory("GeoDataStorageCompact");
+    geoDataStorage = await GeoDataStorageCompact.deploy();
+    await geoDataStorage.deployed();
+  });
+
+  describe("Data Storage", function () {
+    it("Should store data with correct values", async function () {
+      await geoDataStorage.storeData(dataId, cipherHash, metadataHash);
+
+      const result = await geoDataStorage.retrieveData(dataId);
+
+      expect(result[0]).to.equal(cipherHash);
+      expect(result[1]).to.equal(metadataHash);
+      expect(result[2]).to.be.gt(0);
+      expect(result[3]).to.equal(owner.address);
+    });
+
+    it("Should not allow storing data with existing ID", async function () {
+      await geoDataStorage.storeData(dataId, cipherHash, metadataHash);
+
+      await expect(
+        geoDataStorage.storeData(dataId, cipherHash, metadataHash)
+      ).to.be.revertedWith("Data ID already exists");
+    });
+
+    it("Should store a batch of data entries", async function () {
+      const ids = [toBytes32("batch-1"), toBytes32("batch-2")];
+      await geoDataStorage.storeDataBatch(ids, [cipherHash, cipherHash], [metadataHash, metadataHash]);
+
+      expect(await geoDataStorage.getDataIdCount()).to.equal(2);
+      expect(await geoDataStorage.getDataIdsPaginated(0, 10)).to.deep.equal(ids);
+    });
+
+    it("Should update data correctly", async function () {
+      await geoDataStorage.storeData(dataId, cipherHash, metadataHash);
+
+      const newCipherHash = toBytes32("cipher-2");
+      await geoDataStorage.updateData(dataId, newCipherHash, metadataHash);
+
+      const result = await geoDataStorage.retrieveData(dataId);
+      expect(result[0]).to.equal(newCipherHash);
+    });
+  });
+
+  describe("Access Control", function () {
+    beforeEach(async function () {
+      await geoDataStorage.storeData(dataId, cipherHash, metadataHash);
+    });
+
+    it("Should not allow unauthorized access", async function () {
+      await expect(
+        geoDataStorage.connect(addr1).retrieveData(dataId)
+      ).to.be.revertedWith("Not authorized: caller does not have access");
+    });
+
+    it("Should grant and revoke access correctly", async function () {
+      await geoDataStorage.grantAccess(dataId, addr1.address);
+      expect(await geoDataStorage.checkAccess(dataId, addr1.address)).to.equal(true);
+
+      const result = await geoDataStorage.connect(addr1).retrieveData(dataId);
+      expect(result[0]).to.equal(cipherHash);
+
+      await geoDataStorage.revokeAccess(dataId, addr1.address);
+      expect(await geoDataStorage.checkAccess(dataId, addr1.address)).to.equal(false);
+    });
+
+    it("Should only let the data owner grant access", async function () {
+      await expect(
+        geoDataStorage.connect(addr1).grantAccess(dataId, addr2.address)
+      ).to.be.revertedWith("Not authorized: caller is not the data owner");
+    });
+
+    it("Should report missing data", async function () {
+      await expect(
+        geoDataStorage.checkAccess(toBytes32("missing"), addr1.address)
+      ).to.be.revertedWith("Data not found");
+    });
+  });
+
+  describe("Data Management", function () {
+    it("Should retrieve owner's data IDs", async function () {
+      await geoDataStorage.storeData(dataId, cipherHash, metadataHash);
+      await geoDataStorage.connect(addr1).storeData(toBytes32("addr1-data-1"), cipherHash, metadataHash);
+
+      expect(await geoDataStorage.getMyDataIds()).to.deep.equal([dataId]);
+      expect(await geoDataStorage.getOwnerDataIdCount(addr1.address)).to.equal(1);
+      expect(await geoDataStorage.getOwnerDataIds(addr1.address, 0, 10)).to.deep.equal([toBytes32("addr1-data-1")]);
+    });
+  });
+});
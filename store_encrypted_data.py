@@ -10,7 +10,7 @@ BASE_DIR = Path(__file__).resolve().parent
 sys.path.append(str(BASE_DIR))
 
 # Import modules
-from backend.encryption.aes_encryption import encrypt_json_file
+from backend.encryption.aes_encryption import encrypt_and_hash
 from backend.encryption.encryption_utils import generate_hash
 from backend.blockchain.blockchain_service import BlockchainService
 
@@ -35,15 +35,16 @@ def store_on_blockchain(input_file, use_rsa=False):
     print(f"Encrypting {input_file}...")
 
     try:
-        # 1. Encrypt the file
-        encrypted_path, aes_key = encrypt_json_file(input_file, encrypted_file)
+        # 1. Encrypt the file, hashing the ciphertext as it is written
+        result = encrypt_and_hash(input_file, encrypted_file)
+        encrypted_path, aes_key = result['encrypted_file'], result['key']
 
         # 2. Save the key (in a real-world scenario, store this securely)
         with open(key_file, 'w') as f:
             f.write(aes_key)
 
         # 3. Generate hashes for blockchain storage
-        cipher_hash = generate_hash(open(encrypted_path, 'rb').read())
+        cipher_hash = result['cipher_hash']
         metadata_hash = generate_hash({
             "original_file": os.path.basename(input_file),
             "encrypted_file": os.path.basename(encrypted_path),
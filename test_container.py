@@ -0,0 +1,198 @@
+import os
+import json
+import base64
+import pytest
+from backend.encryption.aes_encryption import encrypt_and_hash, decrypt_file_stream, AESCipher
+from backend.encryption.compression import available_codecs, check_codec, compress, decompress
+from backend.encryption.container import (HEADER, TABLE_ENTRY, FLAG_JSON, FLAG_RECORDS, ContainerReader,
+                                          encrypt_bytes)
+from backend.encryption.encryption_utils import HASH_ALGORITHMS, TreeDigest, generate_file_hash, new_digest
+from backend.encryption.record_encryption import RecordReader, decrypt_records
+from backend.encryption.record_integrity import RecordTree, record_tree_path, verify_record
+from backend.encryption.spatial_encryption import query_bbox
+
+KEY = bytes(range(32))
+CHUNK_SIZE = 4096
+
+RECORDS = [{'OBJECTID': i, 'lat': 40 + (i % 20) * 0.5, 'long': -100 + (i // 20) * 0.5, 'name': f'site {i}'}
+           for i in range(1, 201)]
+DOCUMENT = {'metadata': {'source': 'test'}, 'data': RECORDS}
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'points.json'
+    path.write_text(json.dumps(DOCUMENT))
+    return str(path)
+
+
+def decrypt(encrypted_file, key, tmp_path):
+    output_path = decrypt_file_stream(encrypted_file, key, str(tmp_path / 'out.dec'), workers=2)
+    with open(output_path, 'rb') as f:
+        return f.read()
+
+
+def tamper(path, offset, value=None):
+    """Overwrite one byte of a file (flip its lowest bit by default)"""
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        byte = f.read(1)[0]
+        f.seek(offset)
+        f.write(bytes([byte ^ 1 if value is None else value]))
+
+
+@pytest.mark.parametrize('layout', ['json', 'raw'])
+@pytest.mark.parametrize('codec', [None] + available_codecs())
+def test_stream_round_trip(source, tmp_path, layout, codec):
+    result = encrypt_and_hash(source, str(tmp_path / 'points.enc'), KEY, layout=layout, workers=2,
+                              chunk_size=CHUNK_SIZE, compression=codec)
+
+    with open(source, 'rb') as f:
+        assert decrypt(result['encrypted_file'], result['key'], tmp_path) == f.read()
+
+    with ContainerReader(result['encrypted_file']) as reader:
+        assert bool(reader.flags & FLAG_JSON) == (layout == 'json')
+        assert reader.codec == codec
+        assert reader.chunk_count > 1
+
+
+@pytest.mark.parametrize('algorithm', HASH_ALGORITHMS)
+def test_digests_match_the_files(source, tmp_path, algorithm):
+    result = encrypt_and_hash(source, str(tmp_path / 'points.enc'), KEY, layout='raw', workers=2,
+                              chunk_size=CHUNK_SIZE, hash_algorithm=algorithm)
+
+    assert result['hash_algorithm'] == algorithm
+    assert result['data_hash'] == generate_file_hash(source, algorithm=algorithm)
+    assert result['cipher_hash'] == generate_file_hash(result['encrypted_file'], algorithm=algorithm)
+
+
+@pytest.mark.parametrize('algorithm', ['sha256', 'blake2b'])
+def test_tree_digest_ignores_update_boundaries_and_workers(algorithm):
+    data = os.urandom(10000)
+
+    one_shot = TreeDigest(algorithm, workers=1, chunk_size=1024)
+    one_shot.update(data)
+
+    pieces = TreeDigest(algorithm, workers=4, chunk_size=1024)
+    for start in range(0, len(data), 333):
+        pieces.update(data[start:start + 333])
+
+    assert pieces.hexdigest() == one_shot.hexdigest()
+    assert one_shot.hexdigest() != new_digest(algorithm).hexdigest()
+
+
+def test_json_layout_builds_record_tree_on_request(source, tmp_path):
+    plain = encrypt_and_hash(source, str(tmp_path / 'plain.enc'), KEY, layout='json')
+    assert not os.path.exists(record_tree_path(plain['encrypted_file']))
+
+    result = encrypt_and_hash(source, str(tmp_path / 'points.enc'), KEY, layout='json', record_tree=True)
+    tree = RecordTree.load(record_tree_path(result['encrypted_file']))
+
+    assert result['data_hash'] == tree.root
+    assert verify_record(RECORDS[9], tree.prove_record(10), result['data_hash'], 10)
+
+
+@pytest.mark.parametrize('codec', [None] + available_codecs())
+def test_records_layout_reads_selected_records(source, tmp_path, codec):
+    result = encrypt_and_hash(source, str(tmp_path / 'points.enc'), KEY, layout='records', compression=codec)
+
+    with RecordReader(result['encrypted_file'], result['key']) as reader:
+        assert reader.get([150, 3]) == [RECORDS[149], RECORDS[2]]
+        assert reader.all() == DOCUMENT
+
+    with pytest.raises(KeyError):
+        decrypt_records(result['encrypted_file'], result['key'], [999])
+
+
+def test_tiles_layout_queries_bbox(source, tmp_path):
+    result = encrypt_and_hash(source, str(tmp_path / 'points.enc'), KEY, layout='tiles')
+    found = query_bbox(result['encrypted_file'], result['key'], 40, -100, 41, -99)
+
+    expected = [record for record in RECORDS if 40 <= record['lat'] <= 41 and -100 <= record['long'] <= -99]
+    assert sorted(found['records'], key=lambda record: record['OBJECTID']) == expected
+    assert decrypt_records(result['encrypted_file'], result['key'], [1]) == [RECORDS[0]]
+
+
+def test_cipher_round_trips_documents():
+    cipher = AESCipher(KEY)
+
+    assert cipher.decrypt_data(cipher.encrypt_data(DOCUMENT)) == DOCUMENT
+    assert cipher.decrypt_data(cipher.encrypt_data(b'\x00\xffraw')) == b'\x00\xffraw'
+
+
+@pytest.fixture(params=['json', 'records'])
+def container(request, source, tmp_path):
+    result = encrypt_and_hash(source, str(tmp_path / 'points.enc'), KEY, layout=request.param,
+                              chunk_size=CHUNK_SIZE)
+    return result['encrypted_file']
+
+
+def read_every_chunk(path):
+    with ContainerReader(path) as reader:
+        return [reader.read_chunk(index, KEY) for index in range(reader.chunk_count)]
+
+
+def test_flipped_ciphertext_byte_fails(container):
+    with ContainerReader(container) as reader:
+        offset, length = reader.entries[1]
+    tamper(container, offset + length // 2)
+
+    with pytest.raises(ValueError, match='MAC check failed'):
+        read_every_chunk(container)
+
+
+def test_reordered_chunks_fail(container):
+    # Swap the table entries of chunks 0 and 1, so each is read at the other's position
+    with open(container, 'r+b') as f:
+        f.seek(HEADER.size)
+        first, second = f.read(TABLE_ENTRY.size), f.read(TABLE_ENTRY.size)
+        f.seek(HEADER.size)
+        f.write(second + first)
+
+    with pytest.raises(ValueError, match='MAC check failed'):
+        read_every_chunk(container)
+
+
+def test_edited_header_fails(container):
+    # Flip a bit of the plaintext size; the header is authenticated with every chunk
+    tamper(container, HEADER.size - 9)
+
+    with pytest.raises(ValueError, match='MAC check failed'):
+        read_every_chunk(container)
+
+
+def test_wrong_key_fails(container):
+    with ContainerReader(container) as reader:
+        with pytest.raises(ValueError, match='MAC check failed'):
+            reader.read_chunk(0, bytes(32))
+
+
+def test_record_flag_edit_fails(tmp_path):
+    # Marking a plain container as a record container must not be accepted either
+    path = tmp_path / 'plain.enc'
+    path.write_bytes(encrypt_bytes(json.dumps(DOCUMENT).encode('utf-8'), KEY, flags=FLAG_JSON))
+    data = bytearray(path.read_bytes())
+    flags_offset = 6
+    data[flags_offset:flags_offset + 2] = (FLAG_JSON | FLAG_RECORDS).to_bytes(2, 'big')
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(ValueError, match='MAC check failed'):
+        RecordReader(str(path), base64.b64encode(KEY).decode('utf-8'))
+
+
+@pytest.mark.parametrize('codec', available_codecs())
+def test_compression_round_trip(codec):
+    data = json.dumps(DOCUMENT).encode('utf-8')
+    packed = compress(data, codec)
+
+    assert len(packed) < len(data)
+    assert decompress(packed, codec) == data
+
+
+def test_compression_levels_are_checked():
+    assert check_codec('zlib') == 6
+    assert check_codec('bz2', 1) == 1
+
+    for codec, level in [('zlib', 10), ('bz2', 0), ('lzma', 'fast'), ('gzip', None)]:
+        with pytest.raises(ValueError):
+            check_codec(codec, level)
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+from eth_account import Account
+from eth_account.messages import encode_defunct
+from fastapi.testclient import TestClient
+
+from backend.api.main import app
+import backend.api.routes.data_routes as data_routes
+from backend.encryption.encryption_utils import load_cipher_hash
+
+DATA_ID = 'geo-1'
+BBOX = {'min_lat': 49.0, 'min_lon': 7.0, 'max_lat': 51.0, 'max_lon': 9.0}
+
+owner = Account.create()
+stranger = Account.create()
+
+
+class FakeBlockchainService:
+    """Contract view calls answered for one dataset owned by `owner`"""
+
+    def __init__(self, file_path):
+        self.cipher_hash = '0x' + load_cipher_hash(file_path)[0]
+
+    def check_access(self, data_id, address):
+        if data_id != DATA_ID:
+            raise Exception("Data not found")
+        return address == owner.address
+
+    def retrieve_encrypted_data(self, data_id):
+        return (self.cipher_hash,)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # The routes read and write datasets under the working directory
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'datasets').mkdir()
+    records = [{'OBJECTID': i, 'lat': 50 + i * 0.01, 'long': 8 + i * 0.01} for i in range(20)]
+    (tmp_path / 'datasets' / 'points.json').write_text(json.dumps({'metadata': {}, 'data': records}))
+
+    client = TestClient(app)
+    response = client.post('/api/data/encrypt', json={'file': 'points.json', 'tiles': True})
+    assert response.status_code == 200
+
+    service = FakeBlockchainService(str(tmp_path / 'datasets' / 'points.json.enc'))
+    monkeypatch.setattr(data_routes, 'get_blockchain_service', lambda: service)
+    return client
+
+
+def sign_challenge(client, account, data_id=DATA_ID, signed_data_id=None):
+    """Fetch a challenge and sign it (optionally for another data ID)"""
+    nonce = client.get('/api/data/challenge', params={'data_id': data_id}).json()['nonce']
+    message = data_routes.challenge_message(signed_data_id or data_id, nonce)
+    return nonce, account.sign_message(encode_defunct(text=message)).signature.hex()
+
+
+def get_bbox(client, nonce, signature, data_id=DATA_ID):
+    params = dict(BBOX, file='points.json.enc', data_id=data_id, nonce=nonce, signature=signature)
+    return client.get('/api/data/bbox', params=params)
+
+
+def test_bbox_for_signer_with_access(client):
+    response = get_bbox(client, *sign_challenge(client, owner))
+
+    assert response.status_code == 200
+    assert response.json()['count'] == 20
+
+
+def test_bbox_rejects_address_without_access(client):
+    response = get_bbox(client, *sign_challenge(client, stranger))
+
+    assert response.status_code == 403
+
+
+def test_bbox_rejects_signature_of_another_message(client):
+    # Signed by the owner, but for a different data ID than the challenge was issued for
+    response = get_bbox(client, *sign_challenge(client, owner, signed_data_id='geo-2'))
+
+    assert response.status_code == 403
+
+
+def test_bbox_rejects_replayed_challenge(client):
+    nonce, signature = sign_challenge(client, owner)
+    assert get_bbox(client, nonce, signature).status_code == 200
+
+    assert get_bbox(client, nonce, signature).status_code == 403
+
+
+def test_bbox_rejects_malformed_signature(client):
+    nonce, _ = sign_challenge(client, owner)
+
+    assert get_bbox(client, nonce, '0x1234').status_code == 403
+
+
+def test_bbox_without_metadata_is_conflict(client, tmp_path):
+    # Without its metadata the container's hash algorithm can't be told, so it isn't guessed
+    (tmp_path / 'datasets' / 'points.json.enc.meta').unlink()
+
+    response = get_bbox(client, *sign_challenge(client, owner))
+
+    assert response.status_code == 409
@@ -0,0 +1,98 @@
+import threading
+from backend.blockchain.nonce_manager import NonceManager, is_nonce_error
+
+ADDRESS = '0x' + '11' * 20
+
+
+class FakeEth:
+    """Node stand-in whose pending transaction count is set by the test"""
+
+    def __init__(self, pending_count):
+        self.pending_count = pending_count
+
+    def get_transaction_count(self, address, block_identifier):
+        assert block_identifier == 'pending'
+        return self.pending_count
+
+
+class FakeWeb3:
+    def __init__(self, pending_count=0):
+        self.eth = FakeEth(pending_count)
+
+
+def test_parallel_allocations_are_unique():
+    manager = NonceManager(FakeWeb3(pending_count=7), ADDRESS)
+    nonces = []
+    nonces_lock = threading.Lock()
+    start = threading.Barrier(16)
+
+    def allocate_many():
+        start.wait()
+        for _ in range(50):
+            nonce = manager.allocate()
+            with nonces_lock:
+                nonces.append(nonce)
+
+    threads = [threading.Thread(target=allocate_many) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(nonces) == len(set(nonces)) == 800
+    assert sorted(nonces) == list(range(7, 807))
+
+
+def test_released_nonce_is_reused():
+    manager = NonceManager(FakeWeb3(pending_count=3), ADDRESS)
+    first, second, third = manager.allocate(), manager.allocate(), manager.allocate()
+
+    # A gap in the middle is filled before new nonces are handed out
+    manager.release(second)
+    assert manager.allocate() == second
+    assert manager.allocate() == third + 1
+
+    # The newest nonce is simply given back to the counter
+    manager.release(third + 1)
+    assert manager.allocate() == third + 1
+    assert first == 3
+
+
+def test_resync_skips_broadcast_nonces():
+    broadcast = set()
+    web3 = FakeWeb3(pending_count=10)
+    manager = NonceManager(web3, ADDRESS, broadcast_nonces=lambda: broadcast)
+
+    nonces = [manager.allocate() for _ in range(5)]   # 10..14
+    for nonce in nonces:
+        manager.confirm(nonce)
+    broadcast.update(nonces)
+
+    # Nonce 11 was dropped by the node; 12..14 wait behind it, so the pending count stops at 11
+    broadcast.discard(11)
+    web3.eth.pending_count = 11
+    manager.resync()
+
+    # Only the real gap is reused; queued broadcast nonces are never sent again
+    assert manager.allocate() == 11
+    assert manager.allocate() == 15
+
+
+def test_resync_drops_nonces_the_node_already_used():
+    web3 = FakeWeb3(pending_count=0)
+    manager = NonceManager(web3, ADDRESS)
+    first = manager.allocate()
+    manager.allocate()
+    manager.release(first)
+
+    # Another process sent transactions from the same account
+    web3.eth.pending_count = 4
+    manager.resync()
+
+    assert manager.allocate() == 4
+
+
+def test_nonce_errors_are_recognized():
+    assert is_nonce_error(ValueError({'message': 'nonce too low'}))
+    assert is_nonce_error(Exception('Replacement transaction underpriced'))
+    assert not is_nonce_error(Exception('insufficient funds for gas'))
@@ -0,0 +1,45 @@
+from backend.encryption.record_integrity import RecordTree, verify_record
+
+RECORDS = [{'OBJECTID': i, 'lat': 50 + i * 0.01, 'long': 8 + i * 0.01} for i in range(1, 8)]
+
+
+def test_record_verifies_under_its_id():
+    tree = RecordTree(RECORDS)
+
+    for record in RECORDS:
+        proof = tree.prove_record(record['OBJECTID'])
+        assert verify_record(record, proof, tree.root, record['OBJECTID'])
+
+
+def test_ids_match_across_number_and_string_forms():
+    tree = RecordTree(RECORDS)
+    proof = tree.prove_record('3')
+
+    assert verify_record(RECORDS[2], proof, tree.root, 3.0)
+
+
+def test_proof_replayed_for_another_id_fails():
+    tree = RecordTree(RECORDS)
+    proof = tree.prove_record(2)
+
+    # The proof names record 2; shown as the answer for record 5 it must not verify
+    assert not verify_record(RECORDS[1], proof, tree.root, 5)
+
+    # Nor when the proof's claimed ID is rewritten to match the request
+    assert not verify_record(RECORDS[1], dict(proof, record_id=5), tree.root, 5)
+
+
+def test_modified_record_fails():
+    tree = RecordTree(RECORDS)
+    proof = tree.prove_record(4)
+
+    assert not verify_record(dict(RECORDS[3], lat=0.0), proof, tree.root, 4)
+
+
+def test_saved_tree_proves_the_same_root(tmp_path):
+    tree = RecordTree(RECORDS)
+    path = tree.save(str(tmp_path / 'points.enc.merkle'))
+    loaded = RecordTree.load(path)
+
+    assert loaded.root == tree.root
+    assert verify_record(RECORDS[6], loaded.prove_record(7), tree.root, 7)